@@ -0,0 +1,212 @@
+"""
+V2.0 Admission Control and Request Deadlines
+Bounds concurrent and queued requests, rejecting the excess quickly, and
+lets callers attach a deadline that aborts work between pipeline phases
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+class AdmissionRejected(Exception):
+    """Request refused before any work was done"""
+
+    def __init__(self, reason: str, status: int, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.status = status
+        self.retry_after = retry_after
+
+class DeadlineExceeded(Exception):
+    """Request deadline passed; raised between pipeline phases"""
+
+    def __init__(self, phase: str):
+        super().__init__(f"Deadline exceeded before {phase}")
+        self.phase = phase
+
+class Deadline:
+    """Absolute expiry time for one request"""
+
+    __slots__ = ('budget_ms', 'expires_at')
+
+    def __init__(self, budget_ms: float):
+        self.budget_ms = budget_ms
+        self.expires_at = time.perf_counter() + budget_ms / 1000
+
+    @classmethod
+    def from_budget(cls, budget_ms, default_ms: float = 0) -> Optional['Deadline']:
+        """Deadline for a client budget in milliseconds (None, 0 or invalid: default, 0 = none)"""
+        try:
+            budget_ms = float(budget_ms) if budget_ms not in (None, '') else default_ms
+        except (TypeError, ValueError):
+            budget_ms = default_ms
+        return cls(budget_ms) if budget_ms and budget_ms > 0 else None
+
+    def remaining_ms(self) -> float:
+        """Milliseconds left (negative once expired)"""
+        return (self.expires_at - time.perf_counter()) * 1000
+
+    def expired(self) -> bool:
+        """Whether the deadline has passed"""
+        return time.perf_counter() >= self.expires_at
+
+    def check(self, phase: str) -> None:
+        """Raise DeadlineExceeded if the deadline passed before `phase` starts"""
+        if time.perf_counter() >= self.expires_at:
+            raise DeadlineExceeded(phase)
+
+class _Waiter:
+    """A queued request; granted is set under the controller lock"""
+
+    __slots__ = ('granted', 'event', 'future', 'loop')
+
+    def __init__(self, event=None, future=None, loop=None):
+        self.granted = False
+        self.event = event
+        self.future = future
+        self.loop = loop
+
+    def wake(self) -> None:
+        """Signal the waiting thread or coroutine"""
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(True)
+
+class AdmissionController:
+    """
+    Bounded in-flight requests with a bounded FIFO wait queue
+
+    Up to max_in_flight requests run at once and up to max_queue wait for a
+    slot. A request arriving at a full queue is rejected at once with 429;
+    one that waits longer than queue_timeout_ms is rejected with 503. Both
+    carry a Retry-After hint. Works from threads (acquire) and from asyncio
+    handlers (acquire_async); freed slots are handed directly to the oldest
+    waiter. A max_in_flight of 0 admits everything and only keeps counters.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int = 0,
+                 queue_timeout_ms: float = 1000, retry_after_seconds: float = 1):
+        self.max_in_flight = max(0, max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = max(0.0, queue_timeout_ms) / 1000
+        self.retry_after = retry_after_seconds
+        self._lock = threading.Lock()
+        self._waiters = deque()
+        self._in_flight = 0
+
+        self._counters = {
+            'admitted': 0,
+            'queued': 0,
+            'rejected_queue_full': 0,
+            'rejected_queue_timeout': 0,
+            'deadline_exceeded': 0,
+            'peak_in_flight': 0,
+            'peak_queue_depth': 0
+        }
+
+    def acquire(self, deadline: Optional[Deadline] = None) -> None:
+        """Take a slot, waiting in the queue if needed (blocking)"""
+        waiter = self._enter(lambda: _Waiter(event=threading.Event()))
+        if waiter is None:
+            return
+
+        waiter.event.wait(self._wait_timeout(deadline))
+        self._settle(waiter, deadline)
+
+    async def acquire_async(self, deadline: Optional[Deadline] = None) -> None:
+        """Take a slot, waiting in the queue if needed (awaitable)"""
+        loop = asyncio.get_running_loop()
+        waiter = self._enter(lambda: _Waiter(future=loop.create_future(), loop=loop))
+        if waiter is None:
+            return
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self._wait_timeout(deadline))
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # Client went away while queued: give back a slot granted meanwhile
+            with self._lock:
+                if waiter.granted:
+                    self._release_locked()
+                else:
+                    self._waiters.remove(waiter)
+            raise
+        self._settle(waiter, deadline)
+
+    def release(self) -> None:
+        """Return a slot, handing it to the oldest waiter if any"""
+        with self._lock:
+            self._release_locked()
+
+    def record_deadline_exceeded(self) -> None:
+        """Count a request aborted by its deadline"""
+        with self._lock:
+            self._counters['deadline_exceeded'] += 1
+
+    def stats(self) -> Dict:
+        """Limits, current depth and cumulative counters"""
+        with self._lock:
+            return {
+                'max_in_flight': self.max_in_flight,
+                'max_queue': self.max_queue,
+                'queue_timeout_ms': self.queue_timeout * 1000,
+                'in_flight': self._in_flight,
+                'queue_depth': len(self._waiters),
+                **self._counters
+            }
+
+    def _wait_timeout(self, deadline: Optional[Deadline]) -> float:
+        """Queue wait in seconds, never past the request deadline"""
+        if deadline is None:
+            return self.queue_timeout
+        return max(0.0, min(self.queue_timeout, deadline.remaining_ms() / 1000))
+
+    def _release_locked(self) -> None:
+        """Hand the slot to the oldest waiter, or free it (lock held)"""
+        if self._waiters:
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+            waiter.wake()
+        else:
+            self._in_flight -= 1
+
+    def _enter(self, make_waiter) -> Optional[_Waiter]:
+        """Admit immediately (None), enqueue (waiter) or reject"""
+        with self._lock:
+            if not self.max_in_flight or self._in_flight < self.max_in_flight:
+                self._in_flight += 1
+                self._counters['admitted'] += 1
+                self._counters['peak_in_flight'] = max(self._counters['peak_in_flight'], self._in_flight)
+                return None
+
+            if len(self._waiters) >= self.max_queue:
+                self._counters['rejected_queue_full'] += 1
+                raise AdmissionRejected("Server busy: request queue is full", 429, self.retry_after)
+
+            waiter = make_waiter()
+            self._waiters.append(waiter)
+            self._counters['queued'] += 1
+            self._counters['peak_queue_depth'] = max(self._counters['peak_queue_depth'], len(self._waiters))
+            return waiter
+
+    def _settle(self, waiter: _Waiter, deadline: Optional[Deadline]) -> None:
+        """After waiting: keep a granted slot or leave the queue and reject"""
+        with self._lock:
+            if waiter.granted:
+                self._counters['admitted'] += 1
+                return
+
+            self._waiters.remove(waiter)
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded('admission')
+            self._counters['rejected_queue_timeout'] += 1
+
+        raise AdmissionRejected("Server busy: timed out waiting for capacity", 503, self.retry_after)
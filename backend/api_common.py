@@ -0,0 +1,170 @@
+"""
+V2.0 API Request Handling
+Request validation and response payloads shared by the Flask (app.py) and
+ASGI (asgi_app.py) servers, so both expose the same contracts
+"""
+
+import hmac
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from admission import AdmissionRejected, Deadline, DeadlineExceeded
+from threads import current_thread_budget
+
+# Query length limits for /recommend
+MIN_QUERY_LENGTH = 3
+MAX_QUERY_LENGTH = 5000
+
+# Client time budget in milliseconds (a "deadline_ms" body field also works)
+DEADLINE_HEADER = 'X-Request-Deadline-Ms'
+
+class RequestError(Exception):
+    """Invalid client request, reported as {"error": message} with the given status"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+def parse_recommend_request(data) -> Tuple[str, int]:
+    """Validate a /recommend body and return (query, top_k)"""
+    if not data:
+        raise RequestError("Request body must be JSON")
+
+    if not isinstance(data, dict) or 'query' not in data:
+        raise RequestError("Missing 'query' field in request body")
+
+    query = data.get('query', '')
+    if not isinstance(query, str):
+        raise RequestError("Query must be a string")
+    query = query.strip()
+
+    if not query or len(query) < MIN_QUERY_LENGTH:
+        raise RequestError(f"Query must be at least {MIN_QUERY_LENGTH} characters")
+
+    if len(query) > MAX_QUERY_LENGTH:
+        raise RequestError(f"Query exceeds maximum length ({MAX_QUERY_LENGTH} characters)")
+
+    # Out-of-range or malformed k falls back to 10
+    try:
+        top_k = int(data.get('top_k', 10))
+        if top_k < 5 or top_k > 10:
+            top_k = 10
+    except (ValueError, TypeError):
+        top_k = 10
+
+    return query, top_k
+
+def parse_batch_request(data, max_queries: int) -> Tuple[list, object, bool]:
+    """Validate a /batch_recommend body and return (queries, top_k, stream)"""
+    if not data or not isinstance(data, dict) or 'queries' not in data:
+        raise RequestError("Missing 'queries' field")
+
+    queries = data.get('queries', [])
+    top_k = data.get('top_k', 10)
+    stream = bool(data.get('stream', False))
+
+    if not isinstance(queries, list):
+        raise RequestError("'queries' must be a list")
+
+    if len(queries) == 0:
+        raise RequestError("Queries list is empty")
+
+    if len(queries) > max_queries:
+        raise RequestError(f"Maximum {max_queries} queries allowed")
+
+    return queries, top_k, stream
+
+def request_deadline(header_value: Optional[str], data, default_ms: float) -> Optional[Deadline]:
+    """Deadline from the X-Request-Deadline-Ms header or a "deadline_ms" body field"""
+    budget_ms = header_value
+    if budget_ms in (None, '') and isinstance(data, dict):
+        budget_ms = data.get('deadline_ms')
+    return Deadline.from_budget(budget_ms, default_ms)
+
+def iter_batch_results(engine, queries: list, top_k, chunk_size: int,
+                       deadline: Optional[Deadline] = None) -> Iterator[List[Dict]]:
+    """
+    Yield lists of per-query result entries, one vectorized chunk at a time
+
+    Each chunk of chunk_size queries costs one encode and one FAISS
+    search. Entries carry their position in the original request. Raises
+    DeadlineExceeded when the deadline passes before a chunk completes.
+    """
+    for start in range(0, len(queries), chunk_size):
+        if deadline is not None:
+            deadline.check('encode')
+        chunk = queries[start:start + chunk_size]
+
+        # Report malformed entries instead of silently returning nothing
+        valid_offsets = [
+            offset for offset, query in enumerate(chunk)
+            if isinstance(query, str) and query.strip()
+        ]
+        recommendations = engine.get_recommendations_batch(
+            [chunk[offset] for offset in valid_offsets], k=top_k, deadline=deadline
+        )
+        recommendations_by_offset = dict(zip(valid_offsets, recommendations))
+
+        entries = []
+        for offset, query in enumerate(chunk):
+            entry = {'index': start + offset, 'query': query}
+            if offset in recommendations_by_offset:
+                entry['recommendations'] = recommendations_by_offset[offset]
+            else:
+                entry['error'] = "Query must be a non-empty string"
+            entries.append(entry)
+
+        yield entries
+
+def health_payload(engine, reloader=None, batcher=None, admission=None) -> Dict:
+    """Body of GET /health"""
+    return {
+        "status": "healthy",
+        "message": "V2.0 Assessment Recommendation API is running",
+        "version": "2.0",
+        "timestamp": datetime.now().isoformat(),
+        "recommender_initialized": engine is not None,
+        "caches": engine.cache_stats() if engine is not None else None,
+        "threads": current_thread_budget() if engine is not None else None,
+        "artifacts": reloader.status() if reloader is not None else None,
+        "micro_batching": batcher.stats() if batcher is not None else None,
+        "admission": admission.stats() if admission is not None else None
+    }
+
+def recommend_payload(query: str, recommendations: List[Dict]) -> Dict:
+    """Body of a successful POST /recommend"""
+    return {
+        "query": query,
+        "recommendations": recommendations,
+        "count": len(recommendations),
+        "timestamp": datetime.now().isoformat()
+    }
+
+def batch_payload(results: List[Dict]) -> Dict:
+    """Body of a successful non-streaming POST /batch_recommend"""
+    return {
+        "results": results,
+        "count": len(results),
+        "timestamp": datetime.now().isoformat()
+    }
+
+def rejection_response(error: AdmissionRejected) -> Tuple[Dict, int, Dict]:
+    """Body, status and headers for a request refused by admission control"""
+    return (
+        {"error": error.reason, "retry_after": error.retry_after},
+        error.status,
+        {"Retry-After": str(int(max(1, round(error.retry_after))))}
+    )
+
+def deadline_payload(error: DeadlineExceeded) -> Dict:
+    """Body of a 504 for a request whose deadline passed"""
+    return {"error": "Deadline exceeded", "phase": error.phase}
+
+def admin_token_error(configured: Optional[str], provided: Optional[str]) -> Optional[RequestError]:
+    """Error for a rejected admin request, or None when the token matches"""
+    if configured is None:
+        return RequestError("Admin endpoints are disabled (set ADMIN_TOKEN)", 403)
+    if not hmac.compare_digest(provided or '', configured):
+        return RequestError("Invalid admin token", 401)
+    return None
@@ -3,54 +3,129 @@ V2.0 Flask API Server - Complete Professional Production Version
 REST API for assessment recommendations
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 from recommender import AssessmentRecommender
+from reloader import ArtifactReloader
+from batcher import MicroBatcher
+from admission import AdmissionController, AdmissionRejected, DeadlineExceeded
+from api_common import (
+    DEADLINE_HEADER, RequestError, admin_token_error, batch_payload,
+    deadline_payload, health_payload, iter_batch_results, parse_batch_request,
+    parse_recommend_request, recommend_payload, rejection_response,
+    request_deadline
+)
+from metrics import REGISTRY, observe_request, service_collector
+from tracing import TRACE_HEADER, TRACE_ID_HEADER, clear_trace, span, start_trace
+from log_config import (
+    begin_request, configure_logging, log_access, log_error, logging_status, note,
+    request_fields, update_logging
+)
+import config
 import os
+import json
 import logging
+import time
 from dotenv import load_dotenv
-from datetime import datetime
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging (queued, so request threads never block on log I/O)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)
 
-# Global recommender instance
+# Global recommender instance (replaced atomically on hot reload)
 recommender = None
 
-def initialize_recommender():
-    """Initialize recommender on startup"""
+# Batch processing limits
+MAX_BATCH_QUERIES = config.MAX_BATCH_QUERIES
+BATCH_CHUNK_SIZE = config.BATCH_CHUNK_SIZE
+
+def set_recommender(engine: AssessmentRecommender) -> None:
+    """Swap the serving recommender; handlers read the global once per request"""
     global recommender
+    recommender = engine
+
+reloader = ArtifactReloader(config.ARTIFACT_DIR, lambda: recommender, set_recommender)
+
+# Coalesces concurrent /recommend calls into batched encodes (None if disabled)
+batcher = MicroBatcher(
+    max_batch_size=config.MICRO_BATCH_MAX_SIZE,
+    max_wait_ms=config.MICRO_BATCH_MAX_WAIT_MS
+) if config.MICRO_BATCH_ENABLED else None
+
+# Bounds concurrent and queued recommendation requests (0 in-flight: counters only)
+admission = AdmissionController(
+    max_in_flight=config.ADMISSION_MAX_IN_FLIGHT,
+    max_queue=config.ADMISSION_MAX_QUEUE,
+    queue_timeout_ms=config.ADMISSION_QUEUE_TIMEOUT_MS,
+    retry_after_seconds=config.ADMISSION_RETRY_AFTER_SECONDS
+)
+
+# Routes eligible for sampled tracing
+TRACED_ENDPOINTS = {'get_recommendations', 'batch_recommendations'}
+
+def initialize_recommender(watch: bool = True):
+    """Initialize recommender on startup (watch=False leaves the artifact watcher to the caller)"""
     try:
         logger.info("🏆 Initializing V2.0 Recommender...")
-        recommender = AssessmentRecommender()
+        set_recommender(AssessmentRecommender(config.ARTIFACT_DIR))
         logger.info("✅ Recommender initialized successfully")
+        
+        # Cache, micro-batching and admission counters are read at scrape time
+        REGISTRY.register_collector(service_collector(lambda: recommender, batcher, admission),
+                                    name='service')
+        
+        if watch and config.ARTIFACT_WATCH_ENABLED:
+            reloader.start_watcher(config.ARTIFACT_WATCH_INTERVAL_SECONDS)
         return True
     except Exception as e:
         logger.error(f"❌ Failed to initialize recommender: {e}")
         return False
 
+@app.before_request
+def start_request_timer():
+    """Remember when the request started and decide whether to trace it"""
+    g.request_started = time.perf_counter()
+    begin_request()
+    
+    if request.endpoint in TRACED_ENDPOINTS:
+        g.trace = start_trace(f'{request.method} {request.path}', request.headers.get(TRACE_HEADER))
+        if g.trace is not None:
+            note(trace_id=g.trace.trace_id)
+    else:
+        clear_trace()
+
+@app.after_request
+def record_request_metrics(response):
+    """Count and time the request, write its access log line and close its trace"""
+    started = g.get('request_started')
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        elapsed = time.perf_counter() - started
+        observe_request(endpoint, request.method, response.status_code, elapsed)
+    
+    trace = g.get('trace')
+    if trace is not None:
+        trace.set(status=response.status_code, **request_fields())
+        response.headers[TRACE_ID_HEADER] = trace.trace_id
+        # Streams finish after this hook; the trace is written when the response closes
+        response.call_on_close(trace.finish)
+    
+    if started is not None:
+        log_access(request.method, request.path, response.status_code, elapsed * 1000)
+    return response
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     try:
-        return jsonify({
-            "status": "healthy",
-            "message": "V2.0 Assessment Recommendation API is running",
-            "version": "2.0",
-            "timestamp": datetime.now().isoformat(),
-            "recommender_initialized": recommender is not None
-        }), 200
+        return jsonify(health_payload(recommender, reloader, batcher, admission)), 200
     except Exception as e:
         return jsonify({
             "status": "error",
@@ -65,9 +140,13 @@ def get_recommendations():
     Request JSON:
     {
         "query": "Job description or search query",
-        "top_k": 10  (optional, default: 10)
+        "top_k": 10,  (optional, default: 10)
+        "deadline_ms": 200  (optional, or the X-Request-Deadline-Ms header)
     }
     
+    Returns 429/503 with Retry-After when admission control is saturated
+    and 504 when the deadline passes before the work completes.
+    
     Response JSON:
     {
         "query": "...",
@@ -83,78 +162,59 @@ def get_recommendations():
         "count": 10
     }
     """
+    admitted = False
     try:
-        # Check recommender is initialized
-        if recommender is None:
+        # Check recommender is initialized (held for the whole request)
+        engine = recommender
+        if engine is None:
             logger.error("❌ Recommender not initialized")
             return jsonify({
                 "error": "Recommender not initialized"
             }), 503
         
-        # Parse request
+        # Parse and validate request
         data = request.get_json()
+        deadline = request_deadline(request.headers.get(DEADLINE_HEADER), data,
+                                    config.REQUEST_DEFAULT_DEADLINE_MS)
+        query, top_k = parse_recommend_request(data)
+        note(query_length=len(query), top_k=top_k)
         
-        if not data:
-            return jsonify({
-                "error": "Request body must be JSON"
-            }), 400
-        
-        if 'query' not in data:
-            return jsonify({
-                "error": "Missing 'query' field in request body"
-            }), 400
-        
-        # Extract parameters
-        query = data.get('query', '').strip()
-        top_k = data.get('top_k', 10)
+        with span('admission'):
+            admission.acquire(deadline)
+        admitted = True
         
-        # Validate query
-        if not query or len(query) < 3:
-            return jsonify({
-                "error": "Query must be at least 3 characters"
-            }), 400
-        
-        if len(query) > 5000:
-            return jsonify({
-                "error": "Query exceeds maximum length (5000 characters)"
-            }), 400
-        
-        # Validate k
-        try:
-            top_k = int(top_k)
-            if top_k < 5 or top_k > 10:
-                top_k = 10
-        except (ValueError, TypeError):
-            top_k = 10
+        # Get recommendations
+        if batcher is not None:
+            # Batched phases run on the batcher thread and are not traced per request
+            with span('micro_batch'):
+                recommendations = batcher.recommend(engine, query, k=top_k, deadline=deadline)
+        else:
+            recommendations = engine.get_recommendations(query, k=top_k, deadline=deadline)
         
-        logger.info(f"📝 New recommendation request")
-        logger.info(f"   ├─ Query: {query[:50]}...")
-        logger.info(f"   └─ Requested k: {top_k}")
+        note(results=len(recommendations))
         
-        # Get recommendations
-        recommendations = recommender.get_recommendations(query, k=top_k)
+        return jsonify(recommend_payload(query, recommendations)), 200
         
-        # Build response
-        response = {
-            "query": query,
-            "recommendations": recommendations,
-            "count": len(recommendations),
-            "timestamp": datetime.now().isoformat()
-        }
+    except RequestError as e:
+        return jsonify({"error": e.message}), e.status
         
-        logger.info(f"✅ Generated {len(recommendations)} recommendations")
+    except AdmissionRejected as e:
+        return rejected(e)
         
-        return jsonify(response), 200
+    except DeadlineExceeded as e:
+        return deadline_exceeded(e)
         
     except Exception as e:
-        logger.error(f"❌ Error in /recommend: {e}")
-        import traceback
-        traceback.print_exc()
+        log_error(logger, "Error in /recommend", e)
         
         return jsonify({
             "error": "Internal server error",
             "message": str(e)
         }), 500
+        
+    finally:
+        if admitted:
+            admission.release()
 
 @app.route('/batch_recommend', methods=['POST'])
 def batch_recommendations():
@@ -164,58 +224,161 @@ def batch_recommendations():
     Request JSON:
     {
         "queries": ["Query 1", "Query 2", ...],
-        "top_k": 10
+        "top_k": 10,
+        "stream": false,  (optional, stream NDJSON lines per query)
+        "deadline_ms": 2000  (optional, or the X-Request-Deadline-Ms header)
     }
+    
+    Queries are processed in fixed-size vectorized chunks. With "stream"
+    set (or an "Accept: application/x-ndjson" header) each result is sent
+    as one JSON line as soon as its chunk finishes; a deadline passing
+    mid-stream ends it with an error line.
     """
+    admitted = False
     try:
-        if recommender is None:
+        engine = recommender
+        if engine is None:
             return jsonify({"error": "Recommender not initialized"}), 503
         
         data = request.get_json()
+        deadline = request_deadline(request.headers.get(DEADLINE_HEADER), data,
+                                    config.REQUEST_DEFAULT_DEADLINE_MS)
+        queries, top_k, stream = parse_batch_request(data, MAX_BATCH_QUERIES)
+        stream = stream or request.accept_mimetypes.best == 'application/x-ndjson'
+        note(queries=len(queries), top_k=top_k, stream=stream)
         
-        if not data or 'queries' not in data:
-            return jsonify({"error": "Missing 'queries' field"}), 400
+        with span('admission'):
+            admission.acquire(deadline)
+        admitted = True
         
-        queries = data.get('queries', [])
-        top_k = data.get('top_k', 10)
+        if stream:
+            def generate():
+                try:
+                    for entries in iter_batch_results(engine, queries, top_k, BATCH_CHUNK_SIZE, deadline):
+                        yield ''.join(json.dumps(entry) + '\n' for entry in entries)
+                except DeadlineExceeded as e:
+                    admission.record_deadline_exceeded()
+                    yield json.dumps(deadline_payload(e)) + '\n'
+            
+            response = Response(
+                stream_with_context(generate()),
+                mimetype='application/x-ndjson'
+            )
+            # The admission slot is held until the stream is closed
+            response.call_on_close(admission.release)
+            admitted = False
+            return response
         
-        if not isinstance(queries, list):
-            return jsonify({"error": "'queries' must be a list"}), 400
-        
-        if len(queries) == 0:
-            return jsonify({"error": "Queries list is empty"}), 400
+        results = []
+        for entries in iter_batch_results(engine, queries, top_k, BATCH_CHUNK_SIZE, deadline):
+            results.extend(entries)
         
-        if len(queries) > 100:
-            return jsonify({"error": "Maximum 100 queries allowed"}), 400
+        return jsonify(batch_payload(results)), 200
         
-        logger.info(f"📝 Batch request for {len(queries)} queries")
+    except RequestError as e:
+        return jsonify({"error": e.message}), e.status
         
-        results = []
-        for i, query in enumerate(queries):
-            try:
-                recommendations = recommender.get_recommendations(query, k=top_k)
-                results.append({
-                    'query': query,
-                    'recommendations': recommendations
-                })
-            except Exception as e:
-                logger.error(f"Error processing query {i+1}: {e}")
-                results.append({
-                    'query': query,
-                    'error': str(e)
-                })
-        
-        logger.info(f"✅ Processed {len(results)} queries in batch")
+    except AdmissionRejected as e:
+        return rejected(e)
         
-        return jsonify({
-            "results": results,
-            "count": len(results),
-            "timestamp": datetime.now().isoformat()
-        }), 200
+    except DeadlineExceeded as e:
+        return deadline_exceeded(e)
         
     except Exception as e:
-        logger.error(f"❌ Batch error: {e}")
+        log_error(logger, "Batch error", e)
         return jsonify({"error": str(e)}), 500
+        
+    finally:
+        if admitted:
+            admission.release()
+
+def rejected(error: AdmissionRejected):
+    """429/503 response with Retry-After for a request refused by admission control"""
+    body, status, headers = rejection_response(error)
+    note(rejected=error.reason)
+    return jsonify(body), status, headers
+
+def deadline_exceeded(error: DeadlineExceeded):
+    """504 response for a request whose deadline passed"""
+    admission.record_deadline_exceeded()
+    note(deadline_phase=error.phase)
+    return jsonify(deadline_payload(error)), 504
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """
+    Load the current artifact bundle and swap it in without downtime
+    
+    Requires the "X-Admin-Token" header to match ADMIN_TOKEN.
+    
+    Request JSON (optional):
+    {
+        "force": false,  (reload even if the version is unchanged)
+        "wait": true     (false returns 202 and reloads in the background)
+    }
+    
+    The response names the worker ("pid") that reloaded. With several
+    workers ("broadcast": true), the others reload within
+    ARTIFACT_WATCH_INTERVAL_SECONDS; check each one's /health.
+    """
+    error = admin_token_error(config.ADMIN_TOKEN, request.headers.get('X-Admin-Token'))
+    if error is not None:
+        return jsonify({"error": error.message}), error.status
+    
+    data = request.get_json(silent=True) or {}
+    force = bool(data.get('force', False))
+    
+    # This worker reloads itself; other workers follow through their watchers
+    broadcast = reloader.request_reload(force=force) if (config.WEB_CONCURRENCY or 1) > 1 else False
+    
+    if not data.get('wait', True):
+        started = reloader.reload_async(force=force)
+        return jsonify({"started": started, "pid": os.getpid(), "broadcast": broadcast,
+                        "artifacts": reloader.status()}), 202 if started else 409
+    
+    result = reloader.reload(force=force)
+    status_code = 500 if 'error' in result else 200
+    return jsonify({**result, "pid": os.getpid(), "broadcast": broadcast,
+                    "artifacts": reloader.status()}), status_code
+
+@app.route('/admin/logging', methods=['GET', 'POST'])
+def admin_logging():
+    """
+    Show or change logging settings of this worker at runtime
+    
+    Requires the "X-Admin-Token" header to match ADMIN_TOKEN.
+    
+    Request JSON (POST, all fields optional):
+    {
+        "level": "WARNING",               (root log level)
+        "loggers": {"recommender": "DEBUG"},
+        "access_log": true,
+        "error_traces_per_minute": 10     (0 = never log tracebacks)
+    }
+    """
+    error = admin_token_error(config.ADMIN_TOKEN, request.headers.get('X-Admin-Token'))
+    if error is not None:
+        return jsonify({"error": error.message}), error.status
+    
+    if request.method == 'GET':
+        return jsonify(logging_status()), 200
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    
+    try:
+        return jsonify(update_logging(data)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text-format metrics of this worker process"""
+    if not config.METRICS_ENABLED:
+        return jsonify({"error": "Endpoint not found"}), 404
+    
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 @app.errorhandler(404)
 def not_found(error):
@@ -234,17 +397,19 @@ if __name__ == '__main__':
     
     # Initialize recommender
     if initialize_recommender():
-        logger.info("\n🚀 Starting Flask server...")
-        logger.info("   ├─ Host: 0.0.0.0")
-        logger.info("   ├─ Port: 5000")
-        logger.info("   ├─ Debug: True")
-        logger.info("   └─ URL: http://127.0.0.1:5000")
+        logger.info("\n🚀 Starting Flask development server...")
+        logger.info(f"   ├─ Host: {config.HOST}")
+        logger.info(f"   ├─ Port: {config.PORT}")
+        logger.info(f"   ├─ Debug: {config.FLASK_DEBUG}")
+        logger.info(f"   └─ URL: http://127.0.0.1:{config.PORT}")
         
+        # Production: gunicorn -c gunicorn.conf.py wsgi:app (or asgi_app.py)
         app.run(
-            host='0.0.0.0',
-            port=5000,
-            debug=True,
-            use_reloader=True
+            host=config.HOST,
+            port=config.PORT,
+            debug=config.FLASK_DEBUG,
+            use_reloader=config.FLASK_DEBUG,
+            threaded=True
         )
     else:
         logger.error("❌ Cannot start server without recommender")
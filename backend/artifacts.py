@@ -0,0 +1,274 @@
+"""
+V2.0 Versioned Artifact Bundles
+Writes embeddings, index, metadata and index params into an immutable
+versioned directory with a manifest, and resolves the current bundle
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+import faiss
+
+from cache import artifact_fingerprint
+from index_builder import INDEX_PARAMS_FILE, save_index_params
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+CURRENT_FILE = 'CURRENT'
+EMBEDDINGS_FILE = 'embeddings.npy'
+INDEX_FILE = 'faiss_index.bin'
+METADATA_FILE = 'assessments_metadata.parquet'
+LEGACY_METADATA_FILE = 'assessments_metadata.csv'
+
+# Files of the pre-bundle flat layout, fingerprinted to detect changes
+LEGACY_ARTIFACT_FILES = (EMBEDDINGS_FILE, INDEX_FILE, LEGACY_METADATA_FILE, INDEX_PARAMS_FILE)
+
+# Files covered by manifest checksums (re-tuned params publish a new bundle)
+CHECKSUMMED_FILES = (EMBEDDINGS_FILE, INDEX_FILE, METADATA_FILE, INDEX_PARAMS_FILE)
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """Hex sha256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def write_bundle(processed_dir: str, embeddings: np.ndarray, index: faiss.Index,
+                 metadata_df: pd.DataFrame, index_params: Optional[Dict],
+                 model_name: str, keep: int = 3) -> str:
+    """
+    Write a new artifact bundle and make it current
+
+    The bundle is written to a temporary directory, renamed into place and
+    then published by atomically replacing the CURRENT pointer, so readers
+    never observe a partially written bundle.
+
+    Args:
+        processed_dir: Root directory holding the bundles
+        embeddings: Catalog embeddings, one row per assessment
+        index: Populated FAISS index over the embeddings
+        metadata_df: Assessment metadata, row-aligned with the index
+        index_params: Index spec and search params (see index_builder)
+        model_name: Encoder that produced the embeddings
+        keep: Number of bundles to retain, including the new one
+
+    Returns:
+        Path of the new bundle directory
+    """
+    if not (len(embeddings) == index.ntotal == len(metadata_df)):
+        raise ValueError(
+            f"Artifact row counts differ: embeddings={len(embeddings)}, "
+            f"index={index.ntotal}, metadata={len(metadata_df)}"
+        )
+
+    os.makedirs(processed_dir, exist_ok=True)
+    staging_dir = os.path.join(processed_dir, f'.staging-{os.getpid()}')
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    try:
+        np.save(os.path.join(staging_dir, EMBEDDINGS_FILE), embeddings)
+        faiss.write_index(index, os.path.join(staging_dir, INDEX_FILE))
+        metadata_df.to_parquet(os.path.join(staging_dir, METADATA_FILE), index=False)
+
+        index_params = index_params or {'index_spec': 'Flat', 'search_params': {}}
+        save_index_params(staging_dir, index_params)
+
+        manifest = {
+            'model_name': model_name,
+            'dimension': int(index.d),
+            'rows': int(index.ntotal),
+            'index_spec': index_params['index_spec'],
+            'metadata_columns': list(metadata_df.columns)
+        }
+        return _publish(processed_dir, staging_dir, manifest, keep)
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+def publish_index_params(processed_dir: str, index_params: Dict, keep: int = 3) -> str:
+    """
+    Publish the current bundle again with new index params
+
+    Bundles are immutable, so re-tuned search parameters go into a new
+    version: the other files are hard-linked (copied where links are not
+    supported), the manifest is re-hashed and CURRENT is swapped, so hot
+    reload applies the params like any other publish. A legacy flat layout
+    has no versions and gets index_params.json rewritten in place.
+
+    Returns:
+        Directory now holding the params
+    """
+    source_dir = resolve_bundle_dir(processed_dir)
+    manifest = load_manifest(source_dir)
+    if manifest is None:
+        save_index_params(source_dir, index_params)
+        return source_dir
+
+    staging_dir = os.path.join(processed_dir, f'.staging-{os.getpid()}')
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    try:
+        for filename in os.listdir(source_dir):
+            if filename in (MANIFEST_FILE, INDEX_PARAMS_FILE):
+                continue
+            source = os.path.join(source_dir, filename)
+            target = os.path.join(staging_dir, filename)
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+        save_index_params(staging_dir, index_params)
+
+        manifest = {
+            key: value for key, value in manifest.items()
+            if key not in ('version', 'created_at', 'sha256')
+        }
+        manifest['index_spec'] = index_params['index_spec']
+        manifest['parent_version'] = os.path.basename(source_dir)
+        return _publish(processed_dir, staging_dir, manifest, keep)
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+def _publish(processed_dir: str, staging_dir: str, manifest: Dict, keep: int) -> str:
+    """Checksum a staged bundle, move it into place and swap CURRENT to it"""
+    checksums = {
+        filename: file_sha256(os.path.join(staging_dir, filename))
+        for filename in CHECKSUMMED_FILES
+    }
+    content_hash = hashlib.sha256(
+        ''.join(checksums[filename] for filename in CHECKSUMMED_FILES).encode()
+    ).hexdigest()
+    version = f"{datetime.now():%Y%m%d-%H%M%S}-{content_hash[:8]}"
+
+    manifest = {
+        'version': version,
+        'created_at': datetime.now().isoformat(),
+        **manifest,
+        'sha256': checksums
+    }
+    with open(os.path.join(staging_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=4)
+
+    bundle_dir = os.path.join(processed_dir, version)
+    if os.path.exists(bundle_dir):
+        # Same content rebuilt within the same second: keep the existing bundle
+        shutil.rmtree(staging_dir)
+    else:
+        os.rename(staging_dir, bundle_dir)
+
+    # Publish: atomic pointer swap
+    pointer_tmp = os.path.join(processed_dir, f'{CURRENT_FILE}.tmp')
+    with open(pointer_tmp, 'w') as f:
+        f.write(version + '\n')
+    os.replace(pointer_tmp, os.path.join(processed_dir, CURRENT_FILE))
+
+    logger.info(f"✅ Published bundle {version} ({manifest['rows']} rows, {manifest['index_spec']})")
+
+    prune_bundles(processed_dir, keep)
+    return bundle_dir
+
+def list_bundles(processed_dir: str) -> List[str]:
+    """Bundle versions in processed_dir, oldest first"""
+    if not os.path.isdir(processed_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(processed_dir)
+        if os.path.isfile(os.path.join(processed_dir, name, MANIFEST_FILE))
+    )
+
+def prune_bundles(processed_dir: str, keep: int) -> None:
+    """Delete the oldest bundles beyond `keep`, never the current one"""
+    if keep <= 0:
+        return
+
+    current = current_bundle_version(processed_dir)
+    for version in list_bundles(processed_dir)[:-keep]:
+        if version != current:
+            shutil.rmtree(os.path.join(processed_dir, version), ignore_errors=True)
+            logger.info(f"🗑️ Removed old bundle {version}")
+
+def current_bundle_version(processed_dir: str) -> Optional[str]:
+    """Version named by the CURRENT pointer, or None for the legacy layout"""
+    try:
+        with open(os.path.join(processed_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def resolve_bundle_dir(processed_dir: str) -> str:
+    """Directory holding the current artifacts (processed_dir itself for legacy layouts)"""
+    version = current_bundle_version(processed_dir)
+    return os.path.join(processed_dir, version) if version else processed_dir
+
+def current_artifact_version(processed_dir: str) -> str:
+    """Cheap identifier of the artifacts currently on disk"""
+    return current_bundle_version(processed_dir) or artifact_fingerprint(processed_dir, LEGACY_ARTIFACT_FILES)
+
+def load_manifest(bundle_dir: str) -> Optional[Dict]:
+    """Read a bundle manifest, or None for legacy artifacts"""
+    path = os.path.join(bundle_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def load_metadata(bundle_dir: str) -> pd.DataFrame:
+    """Read bundle metadata (Parquet), falling back to the legacy CSV"""
+    parquet_path = os.path.join(bundle_dir, METADATA_FILE)
+    if os.path.exists(parquet_path):
+        return pd.read_parquet(parquet_path)
+    return pd.read_csv(os.path.join(bundle_dir, LEGACY_METADATA_FILE))
+
+def diff_catalog(old_metadata: pd.DataFrame, metadata_df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Diff rebuilt catalog metadata against a bundle's by URL and content hash
+
+    Existing assessments keep their item id and new ones get fresh ids
+    above the bundle's largest.
+
+    Returns:
+        added, changed: Boolean masks over the rows of metadata_df
+        removed: Boolean mask over the rows of old_metadata
+        old_rows: Row of each metadata_df row in old_metadata (-1 if added)
+        item_ids: Item id of each metadata_df row
+    """
+    old_row_by_url = pd.Series(np.arange(len(old_metadata)), index=old_metadata['url'])
+    old_rows = metadata_df['url'].map(old_row_by_url).fillna(-1).to_numpy(dtype=np.int64)
+    added = old_rows < 0
+    kept_rows = old_rows[~added]
+
+    changed = np.zeros(len(metadata_df), dtype=bool)
+    changed[~added] = (metadata_df['content_hash'].to_numpy()[~added]
+                       != old_metadata['content_hash'].to_numpy()[kept_rows])
+    removed = ~old_metadata['url'].isin(metadata_df['url']).to_numpy()
+
+    old_ids = old_metadata['item_id'].to_numpy(dtype=np.int64)
+    item_ids = np.empty(len(metadata_df), dtype=np.int64)
+    item_ids[~added] = old_ids[kept_rows]
+    item_ids[added] = old_ids.max(initial=-1) + 1 + np.arange(int(added.sum()))
+
+    return {
+        'added': added,
+        'changed': changed,
+        'removed': removed,
+        'old_rows': old_rows,
+        'item_ids': item_ids
+    }
+
+def verify_checksums(bundle_dir: str, manifest: Dict) -> None:
+    """Re-hash bundle files against the manifest (reads every byte; not done at startup)"""
+    for filename, expected in manifest['sha256'].items():
+        actual = file_sha256(os.path.join(bundle_dir, filename))
+        if actual != expected:
+            raise ValueError(f"Checksum mismatch for {filename} in {bundle_dir}")
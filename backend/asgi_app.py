@@ -0,0 +1,409 @@
+"""
+V2.0 ASGI API Server
+Async entry point with the same /health, /recommend and /batch_recommend
+contracts as app.py. Encoder and FAISS work runs on a bounded thread pool,
+so idle or slow connections only cost a coroutine each.
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000 --workers 2 --no-access-log
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+import config
+from admission import AdmissionController, AdmissionRejected, DeadlineExceeded
+from api_common import (
+    DEADLINE_HEADER, RequestError, admin_token_error, batch_payload,
+    deadline_payload, health_payload, iter_batch_results, parse_batch_request,
+    parse_recommend_request, recommend_payload, rejection_response,
+    request_deadline
+)
+from batcher import MicroBatcher
+from metrics import REGISTRY, observe_request, service_collector
+from tracing import TRACE_HEADER, TRACE_ID_HEADER, clear_trace, span, start_trace
+from log_config import (
+    begin_request, configure_logging, log_access, log_error, logging_status, note,
+    request_fields, update_logging
+)
+from recommender import AssessmentRecommender
+from reloader import ArtifactReloader
+
+# Configure logging (queued, so the event loop never blocks on log I/O)
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# Global recommender instance (replaced atomically on hot reload)
+recommender: Optional[AssessmentRecommender] = None
+
+def set_recommender(engine: AssessmentRecommender) -> None:
+    """Swap the serving recommender; handlers read the global once per request"""
+    global recommender
+    recommender = engine
+
+reloader = ArtifactReloader(config.ARTIFACT_DIR, lambda: recommender, set_recommender)
+
+batcher = MicroBatcher(
+    max_batch_size=config.MICRO_BATCH_MAX_SIZE,
+    max_wait_ms=config.MICRO_BATCH_MAX_WAIT_MS
+) if config.MICRO_BATCH_ENABLED else None
+
+admission = AdmissionController(
+    max_in_flight=config.ADMISSION_MAX_IN_FLIGHT,
+    max_queue=config.ADMISSION_MAX_QUEUE,
+    queue_timeout_ms=config.ADMISSION_QUEUE_TIMEOUT_MS,
+    retry_after_seconds=config.ADMISSION_RETRY_AFTER_SECONDS
+)
+
+# Encoder/FAISS work runs on the executor threads, so they are the request
+# threads sharing this worker's CPU budget (an explicit REQUEST_THREADS wins)
+if os.getenv('REQUEST_THREADS') is None:
+    config.REQUEST_THREADS = config.ASGI_EXECUTOR_THREADS
+
+# Bounded pool for blocking encoder/FAISS calls; the semaphore keeps work
+# from being queued in the pool, so a request cancelled while waiting for a
+# slot never runs
+executor = ThreadPoolExecutor(max_workers=config.ASGI_EXECUTOR_THREADS,
+                              thread_name_prefix='recommend')
+_slots: Optional[asyncio.Semaphore] = None
+
+# Paths eligible for sampled tracing
+TRACED_PATHS = {'/recommend', '/batch_recommend'}
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call on the bounded executor (in the caller's context, so traces follow)"""
+    async with _slots:
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(executor, functools.partial(context.run, func, *args, **kwargs))
+
+def error_response(error: RequestError) -> JSONResponse:
+    """JSON error body for a rejected request"""
+    return JSONResponse({"error": error.message}, status_code=error.status)
+
+def rejected(error: AdmissionRejected) -> JSONResponse:
+    """429/503 response with Retry-After for a request refused by admission control"""
+    body, status, headers = rejection_response(error)
+    note(rejected=error.reason)
+    return JSONResponse(body, status_code=status, headers=headers)
+
+def deadline_exceeded(error: DeadlineExceeded) -> JSONResponse:
+    """504 response for a request whose deadline passed"""
+    admission.record_deadline_exceeded()
+    note(deadline_phase=error.phase)
+    return JSONResponse(deadline_payload(error), status_code=504)
+
+class ReleasingResponse:
+    """Wraps a streaming response so its admission slot is freed when sending ends"""
+
+    def __init__(self, response, release):
+        self.response = response
+        self.release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.response(scope, receive, send)
+        finally:
+            self.release()
+
+class RequestMetrics:
+    """
+    ASGI middleware counting requests by route and status and timing them
+
+    Also writes the access log line and starts sampled traces for
+    recommendation routes; a trace is written once the response body
+    (including a stream) has been sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        begin_request()
+        trace = None
+        if scope['path'] in TRACED_PATHS:
+            headers = dict(scope['headers'])
+            forced = headers.get(TRACE_HEADER.lower().encode())
+            trace = start_trace(f"{scope['method']} {scope['path']}",
+                                forced.decode('latin-1') if forced is not None else None)
+            if trace is not None:
+                note(trace_id=trace.trace_id)
+        else:
+            clear_trace()
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                # The router records the matched endpoint in the shared scope
+                endpoint = ROUTE_PATHS.get(scope.get('endpoint'), 'unmatched')
+                elapsed = time.perf_counter() - started
+                observe_request(endpoint, scope['method'], message['status'], elapsed)
+                if trace is not None:
+                    trace.set(status=message['status'], **request_fields())
+                    message['headers'] = list(message.get('headers', [])) + [
+                        (TRACE_ID_HEADER.lower().encode(), trace.trace_id.encode())
+                    ]
+                log_access(scope['method'], scope['path'], message['status'], elapsed * 1000)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if trace is not None:
+                trace.finish()
+
+async def read_json(request: Request):
+    """Request body as JSON, or None when it is missing or malformed"""
+    try:
+        return await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+
+async def health_check(request: Request) -> JSONResponse:
+    """Health check endpoint"""
+    try:
+        return JSONResponse(health_payload(recommender, reloader, batcher, admission))
+    except Exception as e:
+        return JSONResponse({"status": "error", "message": str(e)}, status_code=500)
+
+async def get_recommendations(request: Request) -> JSONResponse:
+    """Get assessment recommendations (same contract as app.py /recommend)"""
+    admitted = False
+    try:
+        engine = recommender
+        if engine is None:
+            return JSONResponse({"error": "Recommender not initialized"}, status_code=503)
+
+        data = await read_json(request)
+        deadline = request_deadline(request.headers.get(DEADLINE_HEADER), data,
+                                    config.REQUEST_DEFAULT_DEADLINE_MS)
+        query, top_k = parse_recommend_request(data)
+        note(query_length=len(query), top_k=top_k)
+
+        with span('admission'):
+            await admission.acquire_async(deadline)
+        admitted = True
+
+        if batcher is not None:
+            # Waits on the batch without holding an executor thread
+            future = asyncio.wrap_future(batcher.submit(engine, query, k=top_k, deadline=deadline))
+            timeout = max(0.0, deadline.remaining_ms() / 1000) if deadline is not None else None
+            try:
+                with span('micro_batch'):
+                    recommendations = await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded('batch') from None
+        else:
+            recommendations = await run_blocking(engine.get_recommendations, query,
+                                                 k=top_k, deadline=deadline)
+
+        note(results=len(recommendations))
+        return JSONResponse(recommend_payload(query, recommendations))
+
+    except RequestError as e:
+        return error_response(e)
+
+    except AdmissionRejected as e:
+        return rejected(e)
+
+    except DeadlineExceeded as e:
+        return deadline_exceeded(e)
+
+    except Exception as e:
+        log_error(logger, "Error in /recommend", e)
+        return JSONResponse({"error": "Internal server error", "message": str(e)}, status_code=500)
+
+    finally:
+        if admitted:
+            admission.release()
+
+async def batch_recommendations(request: Request):
+    """Get recommendations for multiple queries (same contract as app.py /batch_recommend)"""
+    admitted = False
+    try:
+        engine = recommender
+        if engine is None:
+            return JSONResponse({"error": "Recommender not initialized"}, status_code=503)
+
+        data = await read_json(request)
+        deadline = request_deadline(request.headers.get(DEADLINE_HEADER), data,
+                                    config.REQUEST_DEFAULT_DEADLINE_MS)
+        queries, top_k, stream = parse_batch_request(data, config.MAX_BATCH_QUERIES)
+        stream = stream or 'application/x-ndjson' in request.headers.get('accept', '')
+        note(queries=len(queries), top_k=top_k, stream=stream)
+
+        with span('admission'):
+            await admission.acquire_async(deadline)
+        admitted = True
+
+        chunks = iter_batch_results(engine, queries, top_k, config.BATCH_CHUNK_SIZE, deadline)
+
+        if stream:
+            async def generate():
+                # One executor slot per chunk, so long batches interleave with other requests
+                try:
+                    while True:
+                        entries = await run_blocking(next, chunks, None)
+                        if entries is None:
+                            break
+                        yield ''.join(json.dumps(entry) + '\n' for entry in entries)
+                except DeadlineExceeded as e:
+                    admission.record_deadline_exceeded()
+                    yield json.dumps(deadline_payload(e)) + '\n'
+
+            response = StreamingResponse(generate(), media_type='application/x-ndjson')
+            admitted = False
+            return ReleasingResponse(response, admission.release)
+
+        results = []
+        while True:
+            entries = await run_blocking(next, chunks, None)
+            if entries is None:
+                break
+            results.extend(entries)
+
+        return JSONResponse(batch_payload(results))
+
+    except RequestError as e:
+        return error_response(e)
+
+    except AdmissionRejected as e:
+        return rejected(e)
+
+    except DeadlineExceeded as e:
+        return deadline_exceeded(e)
+
+    except Exception as e:
+        log_error(logger, "Batch error", e)
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+    finally:
+        if admitted:
+            admission.release()
+
+async def admin_reload(request: Request) -> JSONResponse:
+    """Load the current artifact bundle and swap it in without downtime"""
+    error = admin_token_error(config.ADMIN_TOKEN, request.headers.get('x-admin-token'))
+    if error is not None:
+        return error_response(error)
+
+    data = await read_json(request) or {}
+    force = bool(data.get('force', False))
+
+    # This worker reloads itself; other workers follow through their watchers
+    broadcast = reloader.request_reload(force=force) if (config.WEB_CONCURRENCY or 1) > 1 else False
+
+    if not data.get('wait', True):
+        started = reloader.reload_async(force=force)
+        return JSONResponse({"started": started, "pid": os.getpid(), "broadcast": broadcast,
+                             "artifacts": reloader.status()},
+                            status_code=202 if started else 409)
+
+    # Reloads run on the default executor, never on request slots
+    result = await asyncio.get_running_loop().run_in_executor(
+        None, functools.partial(reloader.reload, force=force)
+    )
+    return JSONResponse({**result, "pid": os.getpid(), "broadcast": broadcast,
+                         "artifacts": reloader.status()},
+                        status_code=500 if 'error' in result else 200)
+
+async def admin_logging(request: Request) -> JSONResponse:
+    """Show (GET) or change (POST) logging settings of this worker at runtime"""
+    error = admin_token_error(config.ADMIN_TOKEN, request.headers.get('x-admin-token'))
+    if error is not None:
+        return error_response(error)
+
+    if request.method == 'GET':
+        return JSONResponse(logging_status())
+
+    data = await read_json(request)
+    if not isinstance(data, dict):
+        return JSONResponse({"error": "Request body must be a JSON object"}, status_code=400)
+
+    try:
+        return JSONResponse(update_logging(data))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+async def metrics(request: Request) -> PlainTextResponse:
+    """Prometheus text-format metrics of this worker process"""
+    if not config.METRICS_ENABLED:
+        return JSONResponse({"error": "Endpoint not found"}, status_code=404)
+    return PlainTextResponse(REGISTRY.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+async def http_error(request: Request, exc: HTTPException) -> JSONResponse:
+    """Routing errors in the same JSON shape as app.py"""
+    if exc.status_code == 404:
+        return JSONResponse({"error": "Endpoint not found"}, status_code=404)
+    return JSONResponse({"error": exc.detail}, status_code=exc.status_code)
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette):
+    """Load the recommender off the event loop before accepting traffic"""
+    global _slots
+    _slots = asyncio.Semaphore(config.ASGI_EXECUTOR_THREADS)
+
+    if recommender is None:
+        logger.info("🏆 Initializing V2.0 Recommender...")
+        engine = await asyncio.get_running_loop().run_in_executor(
+            None, AssessmentRecommender, config.ARTIFACT_DIR
+        )
+        set_recommender(engine)
+        logger.info(f"✅ Recommender initialized ({config.ASGI_EXECUTOR_THREADS} executor threads)")
+
+    REGISTRY.register_collector(service_collector(lambda: recommender, batcher, admission),
+                                name='service')
+
+    # With several workers, each one watches for the reload requests of the others
+    if config.ARTIFACT_WATCH_ENABLED or (config.WEB_CONCURRENCY or 1) > 1:
+        reloader.start_watcher(config.ARTIFACT_WATCH_INTERVAL_SECONDS,
+                               follow_versions=config.ARTIFACT_WATCH_ENABLED)
+
+    yield
+
+    reloader.stop_watcher()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+app = Starlette(
+    routes=[
+        Route('/health', health_check, methods=['GET']),
+        Route('/recommend', get_recommendations, methods=['POST']),
+        Route('/batch_recommend', batch_recommendations, methods=['POST']),
+        Route('/admin/reload', admin_reload, methods=['POST']),
+        Route('/admin/logging', admin_logging, methods=['GET', 'POST']),
+        Route('/metrics', metrics, methods=['GET']),
+    ],
+    middleware=[
+        Middleware(RequestMetrics),
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
+    ],
+    exception_handlers={HTTPException: http_error},
+    lifespan=lifespan
+)
+
+# Route template per endpoint function, used as the metrics label
+ROUTE_PATHS = {route.endpoint: route.path for route in app.routes}
+
+if __name__ == '__main__':
+    import uvicorn
+
+    # asgi_app writes its own access log
+    uvicorn.run(app, host=config.HOST, port=config.PORT, access_log=False)
@@ -0,0 +1,156 @@
+"""
+V2.0 Micro-Batching Scheduler
+Coalesces concurrent single-query requests into one batched encode and
+FAISS search, flushing on a maximum batch size or a maximum wait
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import config
+from admission import Deadline, DeadlineExceeded
+from metrics import MICRO_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Recent flushes kept for percentile reporting
+STATS_WINDOW = 2048
+
+class _Pending:
+    """A queued query waiting for its batch"""
+
+    __slots__ = ('engine', 'query', 'k', 'deadline', 'future', 'enqueued_at')
+
+    def __init__(self, engine, query: str, k: int, deadline: Optional[Deadline]):
+        self.engine = engine
+        self.query = query
+        self.k = k
+        self.deadline = deadline
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+class MicroBatcher:
+    """
+    Queue single queries and serve them through get_recommendations_batch
+
+    A batch is flushed as soon as it holds max_batch_size queries or its
+    oldest query has waited max_wait_ms. Queries are grouped by recommender
+    instance and k, so hot-reloaded instances and different k values never
+    share a batch.
+    """
+
+    def __init__(self, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+        self._batches = 0
+        self._queries = 0
+        self._errors = 0
+        self._batch_sizes = deque(maxlen=STATS_WINDOW)
+        self._queue_delays_ms = deque(maxlen=STATS_WINDOW)
+
+    def submit(self, engine, query: str, k: int = 10,
+               deadline: Optional[Deadline] = None) -> Future:
+        """Queue a query; the future resolves to its recommendation list"""
+        self._ensure_worker()
+        pending = _Pending(engine, query, k, deadline)
+        self._queue.put(pending)
+        return pending.future
+
+    def recommend(self, engine, query: str, k: int = 10,
+                  deadline: Optional[Deadline] = None) -> List[Dict]:
+        """Queue a query and block until its batch has been served"""
+        future = self.submit(engine, query, k, deadline)
+        timeout = max(0.0, deadline.remaining_ms() / 1000) if deadline is not None else None
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            raise DeadlineExceeded('batch') from None
+
+    def stats(self) -> Dict:
+        """Batch size and queueing delay statistics over recent flushes"""
+        sizes = np.array(self._batch_sizes, dtype=np.float64)
+        delays = np.array(self._queue_delays_ms, dtype=np.float64)
+
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'batches': self._batches,
+            'queries': self._queries,
+            'errors': self._errors,
+            'queued': self._queue.qsize(),
+            'mean_batch_size': round(float(sizes.mean()), 2) if sizes.size else None,
+            'max_batch_size_seen': int(sizes.max()) if sizes.size else None,
+            'queue_delay_p50_ms': round(float(np.percentile(delays, 50)), 3) if delays.size else None,
+            'queue_delay_p99_ms': round(float(np.percentile(delays, 99)), 3) if delays.size else None
+        }
+
+    def _ensure_worker(self) -> None:
+        """Start the worker thread lazily (threads do not survive a fork)"""
+        if self._worker is not None and self._worker_pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._worker is None or self._worker_pid != os.getpid():
+                self._worker_pid = os.getpid()
+                self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        """Collect queued queries into batches and serve them"""
+        while True:
+            batch = [self._queue.get()]
+            flush_at = batch[0].enqueued_at + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = flush_at - time.perf_counter()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0
+                                 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._flush(batch)
+
+    def _flush(self, batch: List[_Pending]) -> None:
+        """Serve one batch, one get_recommendations_batch call per (engine, k) group"""
+        flushed_at = time.perf_counter()
+        self._batches += 1
+        self._queries += len(batch)
+        self._batch_sizes.append(len(batch))
+        self._queue_delays_ms.extend((flushed_at - p.enqueued_at) * 1000 for p in batch)
+        if config.METRICS_ENABLED:
+            MICRO_BATCH_SIZE.observe(len(batch))
+
+        groups = {}
+        for pending in batch:
+            # Callers whose deadline passed in the queue are not computed
+            if pending.deadline is not None and pending.deadline.expired():
+                pending.future.set_exception(DeadlineExceeded('encode'))
+                continue
+            groups.setdefault((id(pending.engine), pending.k), []).append(pending)
+
+        for (_, k), group in groups.items():
+            try:
+                results = group[0].engine.get_recommendations_batch([p.query for p in group], k=k)
+            except Exception as e:
+                self._errors += 1
+                logger.error("❌ Micro-batch of %d queries failed: %s", len(group), e)
+                for pending in group:
+                    pending.future.set_exception(e)
+                continue
+
+            for pending, result in zip(group, results):
+                pending.future.set_result(result)
@@ -0,0 +1,187 @@
+"""
+V2.0 In-Process Caches
+Bounded, thread-safe caches used on the recommendation hot path
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+import numpy as np
+
+def normalize_query(query: str, lowercase: bool = False) -> str:
+    """
+    Normalize a query for use as a cache key
+
+    Collapses whitespace, which the tokenizer splits on anyway. Lowercases
+    only with lowercase=True, i.e. when the encoder's tokenizer is uncased
+    (do_lower_case); for a cased model "Java" and "java" embed differently
+    and must not share an entry.
+    """
+    query = ' '.join(query.split())
+    return query.lower() if lowercase else query
+
+def artifact_fingerprint(data_dir: str, filenames: Sequence[str]) -> str:
+    """
+    Cheap version hash of artifact files based on name, size and mtime
+
+    Any rewrite of an artifact changes the fingerprint without having to
+    read the file contents. Missing files are part of the hash too.
+    """
+    digest = hashlib.sha256()
+    for filename in filenames:
+        try:
+            stat = os.stat(os.path.join(data_dir, filename))
+            digest.update(f'{filename}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+        except FileNotFoundError:
+            digest.update(f'{filename}:missing;'.encode())
+    return digest.hexdigest()[:16]
+
+class LRUCache:
+    """Thread-safe LRU cache with optional TTL and entry/byte limits"""
+
+    def __init__(self, max_entries: int = 10000, max_bytes: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None,
+                 sizeof: Optional[Callable[[Any], int]] = None):
+        """
+        Args:
+            max_entries: Maximum number of cached values
+            max_bytes: Maximum total size of cached values (None = unbounded)
+            ttl_seconds: Lifetime of an entry in seconds (None or 0 = no expiry)
+            sizeof: Function returning the size in bytes of a value
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds or None
+        self.sizeof = sizeof or (lambda value: 0)
+
+        # key -> (value, size_bytes, expires_at)
+        self._data: 'OrderedDict[Hashable, Tuple[Any, int, Optional[float]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default on a miss"""
+        with self._lock:
+            entry = self._data.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, _, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting least recently used entries as needed"""
+        size = self.sizeof(value)
+
+        # Values that can never fit are not cached at all
+        if self.max_entries <= 0 or (self.max_bytes is not None and size > self.max_bytes):
+            return
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+            self._data[key] = (value, size, expires_at)
+            self.current_bytes += size
+
+            while len(self._data) > self.max_entries or \
+                    (self.max_bytes is not None and self.current_bytes > self.max_bytes):
+                oldest_key = next(iter(self._data))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._data.clear()
+            self.current_bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        """Remove an entry; caller must hold the lock"""
+        _, size, _ = self._data.pop(key)
+        self.current_bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        """Return cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'bytes': self.current_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+class EmbeddingCache(LRUCache):
+    """LRU cache of query embeddings keyed by model name and normalized query"""
+
+    def __init__(self, max_entries: int = 50000, max_bytes: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None):
+        super().__init__(
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            ttl_seconds=ttl_seconds,
+            # Vector payload plus a rough allowance for key and bookkeeping
+            sizeof=lambda embedding: embedding.nbytes + 200
+        )
+
+    @staticmethod
+    def make_key(model_name: str, query: str, lowercase: bool = False) -> Tuple[str, str]:
+        """Build the cache key for a query encoded by model_name (lowercase: uncased tokenizer)"""
+        return (model_name, normalize_query(query, lowercase))
+
+    def put(self, key: Hashable, value: np.ndarray) -> None:
+        """Store a read-only copy so callers cannot mutate cached vectors"""
+        embedding = np.array(value, dtype=np.float32, copy=True)
+        embedding.setflags(write=False)
+        super().put(key, embedding)
+
+class ResultCache(LRUCache):
+    """
+    LRU cache of final recommendation lists
+
+    Keys include the artifact version, so results computed from an older
+    catalog can never be served for a newer one.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: Optional[float] = None):
+        super().__init__(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    @staticmethod
+    def make_key(artifact_version: str, query: str, k: int,
+                 lowercase: bool = False) -> Tuple[str, int, str]:
+        """Build the cache key for a query at a given k and artifact version (lowercase: uncased tokenizer)"""
+        return (artifact_version, k, normalize_query(query, lowercase))
+
+    def get_results(self, key: Hashable) -> Optional[List[Dict]]:
+        """Return a fresh copy of cached results, or None on a miss"""
+        cached = self.get(key)
+        if cached is None:
+            return None
+        return [dict(result) for result in cached]
+
+    def put_results(self, key: Hashable, results: List[Dict]) -> None:
+        """Store a private copy of results so callers cannot mutate the cache"""
+        self.put(key, tuple(dict(result) for result in results))
@@ -0,0 +1,111 @@
+"""
+V2.0 Columnar Catalog Store
+Array-backed assessment metadata for pandas-free candidate materialization
+"""
+
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+
+class Candidate:
+    """Lightweight candidate record produced from one FAISS hit"""
+
+    __slots__ = ('idx', 'name', 'url', 'test_type', 'type_code',
+                 'duration', 'base_score', 'final_score')
+
+    def __init__(self, idx: int, name: str, url: str, test_type: str, type_code: int,
+                 duration: int, base_score: float, final_score: float):
+        self.idx = idx
+        self.name = name
+        self.url = url
+        self.test_type = test_type
+        self.type_code = type_code
+        self.duration = duration
+        self.base_score = base_score
+        self.final_score = final_score
+
+    def __repr__(self) -> str:
+        return f"Candidate(idx={self.idx}, name={self.name!r}, score={self.base_score:.4f})"
+
+class CatalogStore:
+    """
+    Column arrays of assessment metadata indexed by FAISS row id
+
+    Strings are converted once at load time and held in object arrays, so
+    materializing candidates is a vectorized gather over result indices.
+    Test types are also interned as integer codes for diversity filtering.
+    Bundles updated incrementally carry stable item ids that no longer
+    match row positions; those are translated through a lookup array.
+    """
+
+    def __init__(self, names: np.ndarray, urls: np.ndarray,
+                 test_types: np.ndarray, durations: np.ndarray,
+                 item_ids: Optional[np.ndarray] = None):
+        self.names = np.asarray(names, dtype=object)
+        self.urls = np.asarray(urls, dtype=object)
+        self.test_types = np.asarray(test_types, dtype=object)
+        self.durations = np.asarray(durations, dtype=np.int64)
+
+        # Row of each item id, or None when ids are the row positions
+        self._id_rows = None
+        if item_ids is not None:
+            item_ids = np.asarray(item_ids, dtype=np.int64)
+            if not np.array_equal(item_ids, np.arange(len(item_ids))):
+                self._id_rows = np.full(int(item_ids.max()) + 1, -1, dtype=np.int64)
+                self._id_rows[item_ids] = np.arange(len(item_ids))
+
+        # Integer code per row plus the label for each code
+        labels, codes = np.unique(self.test_types.astype(str), return_inverse=True)
+        self.type_labels = [str(label) for label in labels]
+        self.type_codes = codes.astype(np.int32)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> 'CatalogStore':
+        """Build the store from an assessments metadata DataFrame"""
+        return cls(
+            names=np.array(df['name'].astype(str).tolist(), dtype=object),
+            urls=np.array(df['url'].astype(str).tolist(), dtype=object),
+            test_types=np.array(df['test_type'].astype(str).tolist(), dtype=object),
+            durations=df['duration'].fillna(0).astype(np.int64).to_numpy(),
+            item_ids=df['item_id'].to_numpy() if 'item_id' in df.columns else None
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def rows_for(self, ids: np.ndarray) -> np.ndarray:
+        """Row positions for FAISS ids (any shape), with -1 for unknown ids"""
+        ids = np.asarray(ids)
+        if self._id_rows is None:
+            return ids
+        valid = (ids >= 0) & (ids < len(self._id_rows))
+        return np.where(valid, self._id_rows[np.where(valid, ids, 0)], -1)
+
+    def type_codes_for(self, indices: np.ndarray) -> np.ndarray:
+        """Type codes for a matrix of FAISS indices, with -1 for empty slots"""
+        indices = self.rows_for(indices)
+        valid = (indices >= 0) & (indices < len(self.names))
+        return np.where(valid, self.type_codes[np.where(valid, indices, 0)], -1)
+
+    def gather(self, indices: np.ndarray, scores: np.ndarray) -> List[Candidate]:
+        """Materialize candidates for one row of FAISS indices and scores"""
+        indices = self.rows_for(indices)
+        scores = np.asarray(scores)
+
+        # FAISS pads missing results with -1
+        valid = (indices >= 0) & (indices < len(self.names))
+        rows = indices[valid]
+        row_scores = scores[valid].tolist()
+
+        return [
+            Candidate(idx, name, url, test_type, type_code, duration, score, score)
+            for idx, name, url, test_type, type_code, duration, score in zip(
+                rows.tolist(),
+                self.names[rows],
+                self.urls[rows],
+                self.test_types[rows],
+                self.type_codes[rows].tolist(),
+                self.durations[rows].tolist(),
+                row_scores
+            )
+        ]
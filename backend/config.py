@@ -0,0 +1,130 @@
+"""
+V2.0 Runtime Configuration
+Tunable settings read from environment variables (and .env when present)
+"""
+
+import os
+from typing import Optional
+from dotenv import load_dotenv
+
+# Load environment variables before reading any setting
+load_dotenv()
+
+def env_int(name: str, default: Optional[int]) -> Optional[int]:
+    """Read an integer setting; empty or missing values use the default"""
+    value = os.getenv(name, '').strip()
+    return int(value) if value else default
+
+def env_float(name: str, default: Optional[float]) -> Optional[float]:
+    """Read a float setting; empty or missing values use the default"""
+    value = os.getenv(name, '').strip()
+    return float(value) if value else default
+
+def env_bool(name: str, default: bool) -> bool:
+    """Read a boolean setting (1/true/yes/on); empty or missing values use the default"""
+    value = os.getenv(name, '').strip().lower()
+    return value in ('1', 'true', 'yes', 'on') if value else default
+
+# Batch processing limits for /batch_recommend
+MAX_BATCH_QUERIES = env_int('MAX_BATCH_QUERIES', 10000)
+BATCH_CHUNK_SIZE = env_int('BATCH_CHUNK_SIZE', 64)
+
+# Query embedding cache (0 entries disables it, TTL of 0 means no expiry)
+EMBEDDING_CACHE_ENTRIES = env_int('EMBEDDING_CACHE_ENTRIES', 50000)
+EMBEDDING_CACHE_MAX_BYTES = env_int('EMBEDDING_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+EMBEDDING_CACHE_TTL_SECONDS = env_float('EMBEDDING_CACHE_TTL_SECONDS', 0.0)
+
+# Full-response cache for recommendations (0 entries disables it)
+RESULT_CACHE_ENTRIES = env_int('RESULT_CACHE_ENTRIES', 10000)
+RESULT_CACHE_TTL_SECONDS = env_float('RESULT_CACHE_TTL_SECONDS', 0.0)
+
+# How often (seconds) artifact files on disk are checked for changes
+ARTIFACT_CHECK_INTERVAL_SECONDS = env_float('ARTIFACT_CHECK_INTERVAL_SECONDS', 2.0)
+
+# Semantic near-duplicate result cache (off by default)
+SEMANTIC_CACHE_ENABLED = env_bool('SEMANTIC_CACHE_ENABLED', False)
+SEMANTIC_CACHE_THRESHOLD = env_float('SEMANTIC_CACHE_THRESHOLD', 0.97)
+SEMANTIC_CACHE_ENTRIES = env_int('SEMANTIC_CACHE_ENTRIES', 5000)
+
+# Query encoder backend: 'torch', 'onnx' or 'onnx-int8' (see export_onnx.py)
+ENCODER_BACKEND = os.getenv('ENCODER_BACKEND', 'torch').strip().lower()
+ENCODER_MODEL_NAME = os.getenv('ENCODER_MODEL_NAME', 'all-MiniLM-L6-v2')
+ONNX_MODEL_DIR = os.getenv('ONNX_MODEL_DIR', '../data/models/all-MiniLM-L6-v2-onnx')
+
+# Memory-map artifacts (FAISS vectors, embeddings.npy) so workers share pages
+ARTIFACT_MMAP = env_bool('ARTIFACT_MMAP', True)
+
+# Re-hash bundle files against manifest checksums at load (reads every byte)
+ARTIFACT_VERIFY_CHECKSUMS = env_bool('ARTIFACT_VERIFY_CHECKSUMS', False)
+
+# Processed artifact directory served by the API
+ARTIFACT_DIR = os.getenv('ARTIFACT_DIR', '../data/processed')
+
+# Hot reload: poll ARTIFACT_DIR for new bundles (admin endpoint needs ADMIN_TOKEN)
+ARTIFACT_WATCH_ENABLED = env_bool('ARTIFACT_WATCH_ENABLED', False)
+ARTIFACT_WATCH_INTERVAL_SECONDS = env_float('ARTIFACT_WATCH_INTERVAL_SECONDS', 10.0)
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '').strip() or None
+
+# Micro-batching of concurrent /recommend calls (off by default)
+MICRO_BATCH_ENABLED = env_bool('MICRO_BATCH_ENABLED', False)
+MICRO_BATCH_MAX_SIZE = env_int('MICRO_BATCH_MAX_SIZE', 32)
+MICRO_BATCH_MAX_WAIT_MS = env_float('MICRO_BATCH_MAX_WAIT_MS', 5.0)
+
+# Server settings (the Flask debugger and reloader are for local development only)
+HOST = os.getenv('HOST', '0.0.0.0')
+PORT = env_int('PORT', 5000)
+FLASK_DEBUG = env_bool('FLASK_DEBUG', False)
+
+# ASGI server: threads running encoder/FAISS work (asgi_app.py)
+ASGI_EXECUTOR_THREADS = env_int('ASGI_EXECUTOR_THREADS', min(8, os.cpu_count() or 1))
+
+# Admission control for /recommend and /batch_recommend (0 in-flight disables it)
+ADMISSION_MAX_IN_FLIGHT = env_int('ADMISSION_MAX_IN_FLIGHT', 0)
+ADMISSION_MAX_QUEUE = env_int('ADMISSION_MAX_QUEUE', 64)
+ADMISSION_QUEUE_TIMEOUT_MS = env_float('ADMISSION_QUEUE_TIMEOUT_MS', 1000.0)
+ADMISSION_RETRY_AFTER_SECONDS = env_int('ADMISSION_RETRY_AFTER_SECONDS', 1)
+
+# Deadline applied when the client sends none (0 means no deadline)
+REQUEST_DEFAULT_DEADLINE_MS = env_float('REQUEST_DEFAULT_DEADLINE_MS', 0.0)
+
+# CPU thread budget per worker (unset values are derived from cores / WEB_CONCURRENCY,
+# shared between the REQUEST_THREADS that run encoder/FAISS work concurrently)
+WEB_CONCURRENCY = env_int('WEB_CONCURRENCY', None)
+# Unset: gunicorn "threads" (gunicorn.conf.py), ASGI_EXECUTOR_THREADS (asgi_app.py), else 1
+REQUEST_THREADS = env_int('REQUEST_THREADS', None)
+THREAD_BUDGET_CORES = env_int('THREAD_BUDGET_CORES', None)
+TORCH_NUM_THREADS = env_int('TORCH_NUM_THREADS', None)
+TORCH_INTEROP_THREADS = env_int('TORCH_INTEROP_THREADS', None)
+FAISS_OMP_THREADS = env_int('FAISS_OMP_THREADS', None)
+BLAS_NUM_THREADS = env_int('BLAS_NUM_THREADS', None)
+ONNX_INTRA_OP_THREADS = env_int('ONNX_INTRA_OP_THREADS', None)
+
+# Per-phase latency histograms and the /metrics endpoint
+METRICS_ENABLED = env_bool('METRICS_ENABLED', True)
+
+# Sampled request tracing (Chrome trace format; the X-Trace header forces a trace)
+TRACE_SAMPLE_RATE = env_float('TRACE_SAMPLE_RATE', 0.0)
+TRACE_FILE = os.getenv('TRACE_FILE', '../logs/traces.json')
+TRACE_MAX_BYTES = env_int('TRACE_MAX_BYTES', 50 * 1024 * 1024)
+TRACE_BACKUP_COUNT = env_int('TRACE_BACKUP_COUNT', 3)
+
+# Logging: level, bounded async queue, one-line access log, traceback rate limit
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_QUEUE_SIZE = env_int('LOG_QUEUE_SIZE', 10000)
+ACCESS_LOG_ENABLED = env_bool('ACCESS_LOG_ENABLED', True)
+ERROR_TRACE_PER_MINUTE = env_float('ERROR_TRACE_PER_MINUTE', 10.0)
+
+# Persistent embedding store used by artifact builds (empty path disables it)
+EMBEDDING_STORE_PATH = os.getenv('EMBEDDING_STORE_PATH', '../data/embedding_store.sqlite').strip() or None
+EMBEDDING_STORE_MAX_AGE_DAYS = env_float('EMBEDDING_STORE_MAX_AGE_DAYS', 30.0)
+
+# Training rows aggregated per chunk when building assessment profiles
+PROFILE_CHUNK_ROWS = env_int('PROFILE_CHUNK_ROWS', 100000)
+
+# Parquet copies of dataset workbook sheets, keyed by workbook hash (empty disables)
+DATASET_CACHE_DIR = os.getenv('DATASET_CACHE_DIR', '../data/cache').strip() or None
+
+# Sharded encoding pool for large embeddings_generator.py builds
+ENCODE_WORKERS = env_int('ENCODE_WORKERS', 1)
+ENCODE_SHARD_SIZE = env_int('ENCODE_SHARD_SIZE', 10000)
+ENCODE_WORK_DIR = os.getenv('ENCODE_WORK_DIR', '../data/encode_work')
@@ -0,0 +1,232 @@
+"""
+V2.0 Dataset Loader
+Serves Gen_AI-Dataset.xlsx sheets from Parquet copies keyed by the
+workbook's content hash, so only the first read after a change pays for
+parsing the spreadsheet
+"""
+
+import logging
+import os
+import re
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+
+import config
+from artifacts import file_sha256
+
+logger = logging.getLogger(__name__)
+
+DATASET_FILE = '../data/Gen_AI-Dataset.xlsx'
+DATASET_SHEETS = ('Train-Set', 'Test-Set')
+
+PARQUET_SUFFIX = '.parquet'
+# Marks a sheet of one workbook version that could not be converted
+FAILED_SUFFIX = '.failed'
+# Rows held in memory at a time while converting a sheet
+CONVERT_BATCH_ROWS = 50000
+
+# Workbook path -> (size, mtime, sha256), so one process hashes a file once
+_hashes: Dict[str, tuple] = {}
+
+def _workbook_hash(xlsx_path: str) -> str:
+    stat = os.stat(xlsx_path)
+    key = os.path.abspath(xlsx_path)
+    cached = _hashes.get(key)
+    if cached is None or cached[:2] != (stat.st_size, stat.st_mtime_ns):
+        cached = _hashes[key] = (stat.st_size, stat.st_mtime_ns, file_sha256(xlsx_path))
+    return cached[2]
+
+def _sheet_slug(sheet_name: str) -> str:
+    return ''.join(char if char.isalnum() else '_' for char in sheet_name.lower())
+
+def _cache_file(cache_dir: str, stem: str, sheet_name: str, digest: str, suffix: str = PARQUET_SUFFIX) -> str:
+    return os.path.join(cache_dir, f'{stem}-{_sheet_slug(sheet_name)}-{digest}{suffix}')
+
+def _sheet_rows(worksheet) -> Tuple[List[str], Iterator[list]]:
+    """
+    Column names and data rows of a read-only worksheet
+
+    Blank header cells are named like pd.read_excel names them, rows are
+    padded to the header width and trailing empty rows are dropped.
+    """
+    rows = worksheet.iter_rows(values_only=True)
+    header = list(next(rows, None) or ())
+    while header and header[-1] is None:
+        header.pop()
+
+    names, seen = [], {}
+    for position, value in enumerate(header):
+        name = f'Unnamed: {position}' if value is None else str(value)
+        seen[name] = seen.get(name, -1) + 1
+        names.append(f'{name}.{seen[name]}' if seen[name] else name)
+
+    def data() -> Iterator[list]:
+        width = len(names)
+        blank = 0
+        for row in rows:
+            row = list(row[:width])
+            if all(value is None for value in row):
+                blank += 1
+                continue
+            for _ in range(blank):
+                yield [None] * width
+            blank = 0
+            yield row + [None] * (width - len(row))
+
+    return names, data()
+
+def _batches(rows: Iterator[list], batch_rows: int) -> Iterator[List[list]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_rows:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _unify_types(column: str, current: pa.DataType, new: pa.DataType) -> pa.DataType:
+    if pa.types.is_null(new) or new == current:
+        return current
+    if pa.types.is_null(current):
+        return new
+    numeric = (pa.types.is_integer, pa.types.is_floating)
+    if any(check(current) for check in numeric) and any(check(new) for check in numeric):
+        return pa.float64()
+    raise TypeError(f"Column {column!r} mixes {current} and {new} values")
+
+def _write_sheet_parquet(worksheet, path: str, batch_rows: int = CONVERT_BATCH_ROWS) -> None:
+    """
+    Stream a read-only worksheet into a Parquet file, batch_rows rows at a time
+
+    A first pass infers one Arrow type per column (integers widen to
+    float, empty columns become float like in pd.read_excel), a second
+    writes the batches. Raises TypeError or ValueError for columns that
+    mix types Parquet cannot store together.
+    """
+    names, rows = _sheet_rows(worksheet)
+    types = [pa.null()] * len(names)
+    for batch in _batches(rows, batch_rows):
+        for position, values in enumerate(zip(*batch)):
+            inferred = pa.array(values, from_pandas=True).type
+            types[position] = _unify_types(names[position], types[position], inferred)
+    types = [pa.float64() if pa.types.is_null(dtype) else dtype for dtype in types]
+    schema = pa.schema(list(zip(names, types)))
+
+    _, rows = _sheet_rows(worksheet)
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in _batches(rows, batch_rows):
+            columns = [pa.array(values, type=dtype, from_pandas=True)
+                       for values, dtype in zip(zip(*batch), types)]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+
+def _prune_old_versions(cache_dir: str, stem: str, sheets: Sequence[str], digest: str) -> None:
+    """Remove cache files of this workbook's earlier versions, and nothing else"""
+    slugs = '|'.join(re.escape(_sheet_slug(name)) for name in sheets)
+    pattern = re.compile(rf'{re.escape(stem)}-(?:{slugs})-([0-9a-f]{{16}})'
+                         rf'(?:{re.escape(PARQUET_SUFFIX)}|{re.escape(FAILED_SUFFIX)})')
+    for filename in os.listdir(cache_dir):
+        match = pattern.fullmatch(filename)
+        if match and match.group(1) != digest:
+            os.remove(os.path.join(cache_dir, filename))
+
+def cached_sheet_path(xlsx_path: str, sheet_name: str,
+                      cache_dir: Optional[str] = config.DATASET_CACHE_DIR) -> Optional[str]:
+    """
+    Parquet copy of a sheet, converting the workbook on a cache miss
+
+    All known sheets of the workbook without a copy are converted together
+    on the first miss, streaming rows so memory stays bounded by one batch.
+    A sheet that cannot be stored as Parquet is recorded as failed for this
+    workbook version and not retried. Copies of older workbook versions are
+    removed. Returns None when caching is disabled or the sheet failed.
+    """
+    if not cache_dir:
+        return None
+
+    stem = os.path.splitext(os.path.basename(xlsx_path))[0]
+    digest = _workbook_hash(xlsx_path)[:16]
+    path = _cache_file(cache_dir, stem, sheet_name, digest)
+    if os.path.exists(path):
+        return path
+    if os.path.exists(_cache_file(cache_dir, stem, sheet_name, digest, FAILED_SUFFIX)):
+        return None
+
+    sheets = [sheet_name] + [name for name in DATASET_SHEETS if name != sheet_name]
+    pending = [name for name in sheets
+               if not os.path.exists(_cache_file(cache_dir, stem, name, digest))
+               and not os.path.exists(_cache_file(cache_dir, stem, name, digest, FAILED_SUFFIX))]
+    logger.info(f"📦 Converting {xlsx_path} to Parquet (one-time per workbook version)...")
+    os.makedirs(cache_dir, exist_ok=True)
+
+    workbook = load_workbook(xlsx_path, read_only=True, data_only=True)
+    try:
+        for name in pending:
+            if name not in workbook.sheetnames:
+                continue
+            target = _cache_file(cache_dir, stem, name, digest)
+            staging = f'{target}.{os.getpid()}.tmp'
+            try:
+                _write_sheet_parquet(workbook[name], staging)
+                os.replace(staging, target)
+            except (OSError, ValueError, TypeError, pa.ArrowException) as e:
+                # e.g. a column mixing numbers and text, which Parquet cannot type
+                logger.warning(f"⚠️ Could not cache sheet {name} as Parquet, reading it from the workbook: {e}")
+                if os.path.exists(staging):
+                    os.remove(staging)
+                with open(_cache_file(cache_dir, stem, name, digest, FAILED_SUFFIX), 'w') as f:
+                    f.write(f'{e}\n')
+    finally:
+        workbook.close()
+
+    _prune_old_versions(cache_dir, stem, sheets, digest)
+    return path if os.path.exists(path) else None
+
+def load_sheet(xlsx_path: str = DATASET_FILE, sheet_name: str = 'Train-Set',
+               columns: Optional[List[str]] = None,
+               cache_dir: Optional[str] = config.DATASET_CACHE_DIR) -> pd.DataFrame:
+    """A workbook sheet as a DataFrame (same result as pd.read_excel)"""
+    path = cached_sheet_path(xlsx_path, sheet_name, cache_dir)
+    if path is not None:
+        return pd.read_parquet(path, columns=columns)
+
+    df = pd.read_excel(xlsx_path, sheet_name=sheet_name)
+    return df[columns] if columns is not None else df
+
+def iter_sheet(xlsx_path: str = DATASET_FILE, sheet_name: str = 'Train-Set',
+               columns: Sequence[str] = ('Query', 'Assessment_url'), chunk_rows: int = 100000,
+               cache_dir: Optional[str] = config.DATASET_CACHE_DIR) -> Iterator[pd.DataFrame]:
+    """
+    Stream selected columns of a sheet in chunks of at most chunk_rows rows
+
+    Reads Parquet row batches from the cache, or streams rows from the
+    workbook when caching is off. Raises ValueError for missing columns.
+    """
+    columns = list(columns)
+    path = cached_sheet_path(xlsx_path, sheet_name, cache_dir)
+
+    if path is not None:
+        parquet = pq.ParquetFile(path)
+        missing = [column for column in columns if column not in parquet.schema_arrow.names]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+        return
+
+    workbook = load_workbook(xlsx_path, read_only=True, data_only=True)
+    try:
+        header, rows = _sheet_rows(workbook[sheet_name])
+        missing = [column for column in columns if column not in header]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+        positions = [header.index(column) for column in columns]
+        for batch in _batches(rows, chunk_rows):
+            yield pd.DataFrame([[row[position] for position in positions] for row in batch], columns=columns)
+    finally:
+        workbook.close()
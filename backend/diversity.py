@@ -0,0 +1,57 @@
+"""
+V2.0 Diversity Selection
+Index-based diversity filtering over ranked candidate type codes
+"""
+
+from typing import Optional
+import numpy as np
+
+def max_per_type(k: int) -> int:
+    """Maximum picks from one test type in the first pass (40% of k, at least 2)"""
+    return max(2, int(k * 0.4))
+
+def select_diverse(type_codes: np.ndarray, k: int, n_types: Optional[int] = None) -> np.ndarray:
+    """
+    Select up to k ranked positions per row, limiting picks per test type
+
+    Equivalent to walking each row in rank order and taking a candidate
+    while its type has fewer than max_per_type(k) picks, then filling any
+    remaining slots with the best skipped candidates in rank order.
+
+    Args:
+        type_codes: Integer type codes in rank order, shape (n,) or (rows, n).
+            Negative codes mark empty slots (e.g. FAISS -1 padding).
+        k: Number of positions to select per row
+        n_types: Number of distinct type codes (derived when omitted)
+
+    Returns:
+        Selected positions, shape (k,) or (rows, k), padded with -1 when a
+        row has fewer than k candidates
+    """
+    codes = np.asarray(type_codes)
+    single_row = codes.ndim == 1
+    codes = np.atleast_2d(codes)
+    rows, n = codes.shape
+
+    valid = codes >= 0
+    if n_types is None:
+        n_types = int(codes.max()) + 1 if valid.any() else 0
+
+    # Per-type counters: picks of each type seen so far along the row
+    safe_codes = np.where(valid, codes, 0)
+    one_hot = (safe_codes[:, :, None] == np.arange(max(n_types, 1))) & valid[:, :, None]
+    seen = np.cumsum(one_hot, axis=1, dtype=np.int32)
+    occurrence = np.take_along_axis(seen, safe_codes[:, :, None], axis=2)[:, :, 0] - 1
+
+    # First-pass picks come first, then skipped candidates, both in rank order
+    first_pass = valid & (occurrence < max_per_type(k))
+    positions = np.arange(n)
+    priority = np.where(first_pass, positions, np.where(valid, n + positions, 2 * n + positions))
+    order = np.argsort(priority, axis=1, kind='stable')[:, :k]
+
+    selected = np.where(np.take_along_axis(valid, order, axis=1), order, -1)
+    if selected.shape[1] < k:
+        padding = np.full((rows, k - selected.shape[1]), -1, dtype=selected.dtype)
+        selected = np.concatenate([selected, padding], axis=1)
+
+    return selected[0] if single_row else selected
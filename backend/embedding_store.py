@@ -0,0 +1,180 @@
+"""
+V2.0 Persistent Embedding Store
+Content-addressed on-disk cache of document embeddings, so artifact
+rebuilds only encode texts that are new or changed
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_CHUNK = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    model_name TEXT NOT NULL,
+    dimension INTEGER NOT NULL,
+    vector BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+def embedding_key(model_name: str, normalize: bool, text: str) -> str:
+    """Content address of an embedding: sha256 of model name, normalization flag and text"""
+    digest = hashlib.sha256()
+    digest.update(model_name.encode())
+    digest.update(b'\0normalized\0' if normalize else b'\0raw\0')
+    digest.update(text.encode())
+    return digest.hexdigest()
+
+class EmbeddingStore:
+    """
+    SQLite table of float32 embeddings keyed by embedding_key
+
+    encode() copies what the store has into the output array, encodes the
+    remaining distinct texts in one call and stores them. Entries record when a build
+    last used them; compact() drops entries no build has used recently.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+        self.last_stats: Optional[Dict] = None
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> 'EmbeddingStore':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def encode(self, texts: Sequence[str], encode_fn: Callable[[List[str]], np.ndarray],
+               model_name: str, normalize: bool) -> np.ndarray:
+        """
+        Embeddings for texts in input order
+
+        Args:
+            texts: Texts to embed
+            encode_fn: Encodes a list of texts into a (n, dim) array; only
+                called with texts missing from the store
+            model_name: Model identity, part of the key
+            normalize: Whether encode_fn L2-normalizes, part of the key
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        # Output rows of each distinct key, in order of first occurrence
+        rows: Dict[str, List[int]] = {}
+        for row, text in enumerate(texts):
+            rows.setdefault(embedding_key(model_name, normalize, text), []).append(row)
+
+        # Stored vectors are copied straight into the output, one query chunk
+        # at a time, so memory stays at one (len(texts), dim) array
+        embeddings = None
+        found = []
+        for key, embedding in self._iter_stored(list(rows), model_name):
+            if embeddings is None:
+                embeddings = np.empty((len(texts), embedding.size), dtype=np.float32)
+            if embedding.size == embeddings.shape[1]:
+                embeddings[rows[key]] = embedding
+                found.append(key)
+
+        # Encode each distinct missing text once
+        stored = set(found)
+        missing = [key for key in rows if key not in stored]
+
+        if missing:
+            encoded = np.asarray(encode_fn([texts[rows[key][0]] for key in missing]), dtype=np.float32)
+            if embeddings is None and len(missing) == len(texts):
+                # Nothing stored and every text distinct: the rows are already
+                # in input order, so a (memory-mapped) result is returned as is
+                embeddings = encoded
+            else:
+                if embeddings is None:
+                    embeddings = np.empty((len(texts), encoded.shape[1]), dtype=np.float32)
+                for key, embedding in zip(missing, encoded):
+                    embeddings[rows[key]] = embedding
+            self._put_many(model_name, zip(missing, encoded))
+
+        reused = len(found)
+        self._touch(found)
+
+        distinct = len(rows)
+        self.last_stats = {
+            'texts': len(texts),
+            'distinct': distinct,
+            'reused': reused,
+            'encoded': len(missing),
+            'reuse_ratio': round(reused / distinct, 4) if distinct else 0.0
+        }
+        logger.info(f"♻️ Embedding store: reused {reused}/{distinct} distinct texts "
+                    f"({self.last_stats['reuse_ratio']:.1%}), encoded {len(missing)}")
+        return embeddings
+
+    def compact(self, max_age_days: float) -> int:
+        """Delete entries not used by any build in max_age_days; returns the count removed"""
+        cutoff = time.time() - max_age_days * 86400
+        removed = self._conn.execute("DELETE FROM embeddings WHERE last_used < ?", (cutoff,)).rowcount
+        self._conn.commit()
+
+        if removed:
+            self._conn.execute("VACUUM")
+            logger.info(f"🧹 Embedding store: removed {removed} entries unused for {max_age_days:g} days")
+        return removed
+
+    def stats(self) -> Dict:
+        """Entry count and file size"""
+        entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {
+            'entries': entries,
+            'bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            'last_build': self.last_stats
+        }
+
+    def _iter_stored(self, keys: List[str], model_name: str) -> Iterator[Tuple[str, np.ndarray]]:
+        """(key, embedding) of the stored keys, fetched _QUERY_CHUNK keys at a time"""
+        for start in range(0, len(keys), _QUERY_CHUNK):
+            chunk = keys[start:start + _QUERY_CHUNK]
+            rows = self._conn.execute(
+                f"SELECT key, dimension, vector FROM embeddings "
+                f"WHERE model_name = ? AND key IN ({','.join('?' * len(chunk))})",
+                [model_name, *chunk]
+            ).fetchall()
+            for key, dimension, vector in rows:
+                embedding = np.frombuffer(vector, dtype=np.float32)
+                # A truncated or foreign row is re-encoded instead of trusted
+                if embedding.size == dimension:
+                    yield key, embedding
+
+    def _put_many(self, model_name: str, items) -> None:
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, model_name, dimension, vector, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            ((key, model_name, int(embedding.size), np.ascontiguousarray(embedding).tobytes(), now, now)
+             for key, embedding in items)
+        )
+        self._conn.commit()
+
+    def _touch(self, keys: List[str]) -> None:
+        if not keys:
+            return
+        now = time.time()
+        self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                               ((now, key) for key in keys))
+        self._conn.commit()
@@ -3,68 +3,135 @@ import numpy as np
 from sentence_transformers import SentenceTransformer
 import faiss
 import pickle
-from typing import List, Dict
+from typing import List, Dict, Optional
 import json
+import logging
+import config
+from index_builder import build_index
+from artifacts import write_bundle
+from embedding_store import EmbeddingStore
+from encode_pool import encode_sharded, load_tokenizer, remove_encoding_work
+
+logger = logging.getLogger(__name__)
 
 class EmbeddingsGenerator:
-    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2',
+                 embedding_store_path: Optional[str] = config.EMBEDDING_STORE_PATH,
+                 workers: int = config.ENCODE_WORKERS, shard_size: int = config.ENCODE_SHARD_SIZE,
+                 work_dir: str = config.ENCODE_WORK_DIR):
         """
         Initialize with sentence transformer model
         Options: 
         - 'all-MiniLM-L6-v2' (fast, good quality)
         - 'all-mpnet-base-v2' (slower, better quality)
+        
+        Texts already in the embedding store (if configured) are not re-encoded.
+        More than shard_size texts, or more than one worker, go through the
+        sharded encoding pool (see encode_pool).
         """
-        self.model = SentenceTransformer(model_name)
-        self.dimension = self.model.get_sentence_embedding_dimension()
+        self.model_name = model_name
+        self._model = None
+        self.embedding_store_path = embedding_store_path
+        self.workers = workers
+        self.shard_size = shard_size
+        self.work_dir = work_dir
+        self.index_params = None
+    
+    @property
+    def model(self) -> SentenceTransformer:
+        """Model for in-process encoding, loaded on first use (pool workers load their own)"""
+        if self._model is None:
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
+    
+    def build_texts(self, df: pd.DataFrame) -> List[str]:
+        """Text representation of each assessment, built column by column"""
+        def column(values: pd.Series) -> pd.Series:
+            # str() per value, as an f-string formats it (NaN -> 'nan')
+            return values.astype(object).map(str)
+        
+        skills = df['skills'].map(lambda value: ', '.join(value) if isinstance(value, list) else value)
+        texts = ('Assessment: ' + column(df['name'])
+                 + '\n            Description: ' + column(df['description'])
+                 + '\n            Skills: ' + column(skills)
+                 + '\n            Test Type: ' + column(df['test_type'])
+                 + '\n            Duration: ' + column(df['duration']) + ' minutes')
+        return texts.tolist()
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Encode and L2-normalize texts in-process, or through the sharded pool for large jobs"""
+        if self.workers <= 1 and len(texts) <= self.shard_size:
+            return self.model.encode(texts, show_progress_bar=True, normalize_embeddings=True)
+        
+        if self.workers > 1:
+            # Only the tokenizer is loaded here, to sort texts into shards
+            return encode_sharded(
+                texts, self.model_name, None, self.work_dir,
+                workers=self.workers, shard_size=self.shard_size, normalize=True,
+                tokenizer=load_tokenizer(self.model_name)
+            )
+        
+        return encode_sharded(
+            texts, self.model_name, self.model.get_sentence_embedding_dimension(), self.work_dir,
+            shard_size=self.shard_size, normalize=True,
+            encode_fn=lambda shard: self.model.encode(shard, show_progress_bar=False,
+                                                      normalize_embeddings=True),
+            tokenizer=getattr(self.model, 'tokenizer', None)
+        )
         
     def create_assessment_embeddings(self, df: pd.DataFrame) -> np.ndarray:
-        """Create embeddings for all assessments"""
+        """Create L2-normalized embeddings for all assessments"""
         
         # Combine multiple fields for rich representation
-        texts = []
-        for _, row in df.iterrows():
-            # Create comprehensive text representation
-            text = f"""
-            Assessment: {row['name']}
-            Description: {row['description']}
-            Skills: {', '.join(row['skills']) if isinstance(row['skills'], list) else row['skills']}
-            Test Type: {row['test_type']}
-            Duration: {row['duration']} minutes
-            """
-            texts.append(text.strip())
+        texts = self.build_texts(df)
+        
+        # Generate embeddings, reusing stored ones for unchanged texts
+        if not self.embedding_store_path:
+            return self._encode(texts)
         
-        # Generate embeddings
-        embeddings = self.model.encode(texts, show_progress_bar=True)
+        with EmbeddingStore(self.embedding_store_path) as store:
+            # The store logs how many embeddings it reused
+            embeddings = store.encode(texts, self._encode, self.model_name, normalize=True)
+            store.compact(config.EMBEDDING_STORE_MAX_AGE_DAYS)
         return embeddings
     
-    def build_faiss_index(self, embeddings: np.ndarray) -> faiss.Index:
-        """Build FAISS index for fast similarity search"""
+    def build_faiss_index(self, embeddings: np.ndarray, index_spec: str = 'Flat',
+                          search_params: Optional[Dict] = None) -> faiss.Index:
+        """
+        Build FAISS index for fast similarity search
         
-        # Normalize embeddings for cosine similarity
-        faiss.normalize_L2(embeddings)
+        index_spec selects Flat, IVF<nlist>,Flat, IVF<nlist>,PQ<m> or HNSW<M>;
+        the effective spec and search params are kept in self.index_params
+        """
         
-        # Create index
-        index = faiss.IndexFlatIP(self.dimension)  # Inner product = cosine similarity
-        index.add(embeddings)
+        # Embeddings are encoded normalized (cosine similarity); only other
+        # input is copied and normalized, leaving a memory-mapped array as it is
+        norms = np.einsum('ij,ij->i', embeddings, embeddings)
+        if not np.allclose(norms, 1, atol=1e-3):
+            embeddings = np.array(embeddings, dtype=np.float32)
+            faiss.normalize_L2(embeddings)
+        
+        # Create index (inner product = cosine similarity)
+        index, self.index_params = build_index(embeddings, index_spec, search_params)
         
         return index
     
     def save_artifacts(self, embeddings: np.ndarray, index: faiss.Index, 
                       df: pd.DataFrame, output_dir: str):
-        """Save all artifacts for later use"""
-        
-        # Save embeddings
-        np.save(f'{output_dir}/embeddings.npy', embeddings)
+        """Save all artifacts for later use as a new versioned bundle"""
         
-        # Save FAISS index
-        faiss.write_index(index, f'{output_dir}/faiss_index.bin')
+        # Embeddings, FAISS index, metadata and manifest in one bundle
+        bundle_dir = write_bundle(output_dir, embeddings, index, df,
+                                  self.index_params, self.model_name)
         
-        # Save assessment metadata
-        df.to_csv(f'{output_dir}/assessments_metadata.csv', index=False)
+        logger.info(f"💾 Saved artifacts to {bundle_dir}")
         
-        print(f"Saved artifacts to {output_dir}")
+        # Sharded encoding output is only needed until the bundle is published
+        remove_encoding_work(self.work_dir)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
     # Load crawled data
     df = pd.read_csv('../data/raw/shl_assessments.csv')
     
@@ -0,0 +1,256 @@
+"""
+V2.0 Sharded Encoding Pool
+Encodes large text collections in token-length-sorted shards across worker
+processes, writing each shard into a memory-mapped .npy file and
+recording it in a journal, so an interrupted build resumes where it stopped
+"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from threads import BLAS_ENV_VARS, available_cores
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_SUFFIX = '.journal'
+OUTPUT_PREFIX = 'embeddings-'
+
+# Texts per tokenizer call when measuring token lengths
+TOKENIZE_CHUNK = 10000
+
+# Model of this worker process, loaded once by _init_worker
+_worker_model = None
+
+@contextlib.contextmanager
+def _worker_environment(threads: int) -> Iterator[None]:
+    """
+    BLAS/OpenMP thread counts for spawned workers, restored afterwards
+
+    A spawned child has imported numpy before any initializer runs, so
+    the variables must already be in the environment it inherits.
+    """
+    saved = {name: os.environ.get(name) for name in BLAS_ENV_VARS}
+    for name in BLAS_ENV_VARS:
+        os.environ[name] = str(threads)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+def _init_worker(model_name: str, threads: int) -> None:
+    """Pool initializer: cap torch and any loaded BLAS pool, then load the model"""
+    global _worker_model
+
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=threads, user_api='blas')
+    except ImportError:
+        pass
+
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    from sentence_transformers import SentenceTransformer
+    _worker_model = SentenceTransformer(model_name, device='cpu')
+
+def _encode_shard(task: Tuple[int, List[str], int, bool]) -> Tuple[int, np.ndarray]:
+    shard_id, texts, batch_size, normalize = task
+    embeddings = _worker_model.encode(texts, batch_size=batch_size, show_progress_bar=False,
+                                      normalize_embeddings=normalize, convert_to_numpy=True)
+    return shard_id, np.asarray(embeddings, dtype=np.float32)
+
+def load_tokenizer(model_name: str):
+    """
+    Tokenizer of a Sentence-BERT model without its weights, or None
+
+    Bare names resolve under sentence-transformers/ first, as
+    SentenceTransformer resolves them.
+    """
+    try:
+        from transformers import AutoTokenizer
+    except ImportError:
+        return None
+
+    names = [model_name] if '/' in model_name else [f'sentence-transformers/{model_name}', model_name]
+    for name in names:
+        try:
+            return AutoTokenizer.from_pretrained(name)
+        except (OSError, ValueError):
+            continue
+    logger.warning(f"⚠️ No tokenizer found for {model_name}, sorting shards by character length")
+    return None
+
+def text_lengths(texts: Sequence[str], tokenizer=None) -> np.ndarray:
+    """Token count of each text (character count without a tokenizer)"""
+    if tokenizer is None:
+        return np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+
+    lengths = np.empty(len(texts), dtype=np.int64)
+    for start in range(0, len(texts), TOKENIZE_CHUNK):
+        chunk = list(texts[start:start + TOKENIZE_CHUNK])
+        input_ids = tokenizer(chunk, add_special_tokens=False)['input_ids']
+        lengths[start:start + len(chunk)] = [len(ids) for ids in input_ids]
+    return lengths
+
+def encoding_fingerprint(texts: Sequence[str], model_name: str, normalize: bool, shard_size: int,
+                         length_unit: str = 'tokens') -> str:
+    """Identity of an encoding job; a journal only resumes the same job"""
+    digest = hashlib.sha256()
+    digest.update(f'{model_name}\0{normalize}\0{shard_size}\0{length_unit}\0{len(texts)}\0'.encode())
+    for text in texts:
+        digest.update(text.encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def length_sorted_shards(texts: Sequence[str], shard_size: int, tokenizer=None) -> List[np.ndarray]:
+    """
+    Row indices split into shards of texts of similar token length
+
+    Longest first, the order SentenceTransformer uses within a call, so
+    each batch pads to a length close to that of its own texts.
+    """
+    order = np.argsort(-text_lengths(texts, tokenizer), kind='stable')
+    return [order[start:start + shard_size] for start in range(0, len(order), shard_size)]
+
+def _read_journal(path: str, fingerprint: str) -> set:
+    """Completed shard ids recorded for this job (empty for another job)"""
+    if not os.path.exists(path):
+        return set()
+
+    done = set()
+    with open(path) as f:
+        header = f.readline()
+        try:
+            if json.loads(header).get('fingerprint') != fingerprint:
+                return set()
+        except ValueError:
+            return set()
+        for line in f:
+            try:
+                done.add(int(json.loads(line)['shard']))
+            except (ValueError, KeyError):
+                # A line cut off by the crash: that shard is simply redone
+                continue
+    return done
+
+def encode_sharded(texts: Sequence[str], model_name: str, dimension: Optional[int], work_dir: str,
+                   workers: int = 1, shard_size: int = 10000, batch_size: int = 32,
+                   normalize: bool = False, encode_fn=None, tokenizer=None) -> np.ndarray:
+    """
+    Encode texts into a (len(texts), dimension) float32 array
+
+    Args:
+        texts: Texts to encode; output rows follow their order
+        model_name: Sentence-BERT model loaded by each worker
+        dimension: Embedding dimension of the model (None: taken from the first shard)
+        work_dir: Directory for the output .npy and its journal
+        workers: Worker processes (1 encodes in this process with encode_fn)
+        shard_size: Texts per shard, the unit of work and of resumption
+        batch_size: Encoder batch size within a shard
+        normalize: L2-normalize embeddings
+        encode_fn: In-process encoder (list of texts -> array), used when workers <= 1
+        tokenizer: Tokenizer measuring text lengths for sharding (None: characters)
+
+    Returns:
+        The output as a read-only memory-mapped array, so it is never held
+        in memory in full. Completed shards of an interrupted run with the
+        same texts and settings are not redone. The file and its journal
+        stay in work_dir until remove_encoding_work() is called once the
+        embeddings have been saved, or the next job replaces them.
+    """
+    if workers <= 1 and encode_fn is None:
+        raise ValueError("encode_fn is required when encoding in-process")
+    if not texts:
+        return np.empty((0, dimension or 0), dtype=np.float32)
+
+    length_unit = 'chars' if tokenizer is None else 'tokens'
+    fingerprint = encoding_fingerprint(texts, model_name, normalize, shard_size, length_unit)
+    output_path = os.path.join(work_dir, f'{OUTPUT_PREFIX}{fingerprint[:16]}.npy')
+    journal_path = output_path + JOURNAL_SUFFIX
+    os.makedirs(work_dir, exist_ok=True)
+    remove_encoding_work(work_dir, keep=output_path)
+
+    shards = length_sorted_shards(texts, shard_size, tokenizer)
+    done = _read_journal(journal_path, fingerprint) if os.path.exists(output_path) else set()
+
+    if done:
+        output = np.load(output_path, mmap_mode='r+')
+        logger.info(f"♻️ Resuming encoding: {len(done)}/{len(shards)} shards already done")
+    else:
+        # Without a known dimension the file is created with the first shard
+        output = _create_output(output_path, len(texts), dimension) if dimension else None
+        with open(journal_path, 'w') as f:
+            f.write(json.dumps({'fingerprint': fingerprint, 'rows': len(texts),
+                                'shards': len(shards)}) + '\n')
+
+    pending = [shard_id for shard_id in range(len(shards)) if shard_id not in done]
+    if pending:
+        logger.info(f"🚀 Encoding {sum(len(shards[s]) for s in pending)} texts in {len(pending)} shards "
+                    f"with {max(1, workers)} worker(s), sorted by {length_unit}")
+
+    with open(journal_path, 'a') as journal:
+        for completed, (shard_id, embeddings) in enumerate(
+                _run_shards(texts, shards, pending, model_name, workers, batch_size, normalize, encode_fn), 1):
+            if output is None:
+                output = _create_output(output_path, len(texts), embeddings.shape[1])
+            output[shards[shard_id]] = embeddings
+            # Rows reach the file before the journal says they did
+            output.flush()
+            journal.write(json.dumps({'shard': shard_id}) + '\n')
+            journal.flush()
+            os.fsync(journal.fileno())
+            logger.info(f"   ├─ Shard {shard_id + 1}/{len(shards)} done ({completed}/{len(pending)})")
+
+    del output
+    return np.load(output_path, mmap_mode='r')
+
+def remove_encoding_work(work_dir: str, keep: Optional[str] = None) -> None:
+    """Delete encoding outputs and journals in work_dir, except those of `keep`"""
+    if not os.path.isdir(work_dir):
+        return
+
+    kept = set()
+    if keep is not None:
+        kept = {os.path.basename(keep), os.path.basename(keep) + JOURNAL_SUFFIX}
+    for filename in os.listdir(work_dir):
+        if filename.startswith(OUTPUT_PREFIX) and filename not in kept:
+            try:
+                os.remove(os.path.join(work_dir, filename))
+            except OSError as e:
+                logger.warning(f"⚠️ Could not remove encoding work file {filename}: {e}")
+
+def _create_output(path: str, rows: int, dimension: int) -> np.memmap:
+    return np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(rows, dimension))
+
+def _run_shards(texts: Sequence[str], shards: List[np.ndarray], pending: List[int], model_name: str,
+                workers: int, batch_size: int, normalize: bool,
+                encode_fn) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield (shard id, embeddings) as shards complete"""
+    tasks = ((shard_id, [texts[row] for row in shards[shard_id]], batch_size, normalize)
+             for shard_id in pending)
+
+    if workers <= 1:
+        for shard_id, shard_texts, _, _ in tasks:
+            yield shard_id, np.asarray(encode_fn(shard_texts), dtype=np.float32)
+        return
+
+    threads = max(1, available_cores() // workers)
+    # spawn: torch thread pools do not survive a fork
+    context = multiprocessing.get_context('spawn')
+    with _worker_environment(threads), \
+            context.Pool(workers, initializer=_init_worker, initargs=(model_name, threads)) as pool:
+        yield from pool.imap_unordered(_encode_shard, tasks)
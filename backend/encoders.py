@@ -0,0 +1,154 @@
+"""
+V2.0 Query Encoder Backends
+PyTorch Sentence-BERT or exported (optionally int8-quantized) ONNX models
+"""
+
+import json
+import logging
+import os
+from typing import List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ENCODER_BACKENDS = ('torch', 'onnx', 'onnx-int8')
+
+# File names written by export_onnx.py
+ONNX_MODEL_FILE = 'model.onnx'
+ONNX_INT8_MODEL_FILE = 'model_int8.onnx'
+ONNX_CONFIG_FILE = 'encoder_config.json'
+
+def tokenizer_lowercases(tokenizer) -> bool:
+    """Whether a Hugging Face tokenizer lowercases its input (uncased model); False if unknown"""
+    value = getattr(tokenizer, 'do_lower_case', None)
+    if value is None:
+        value = (getattr(tokenizer, 'init_kwargs', None) or {}).get('do_lower_case')
+    return bool(value)
+
+class SentenceTransformerEncoder:
+    """Reference PyTorch encoder via sentence-transformers"""
+
+    backend = 'torch'
+
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.name = model_name
+        self.model = SentenceTransformer(model_name)
+        self.dimension = self.model.get_sentence_embedding_dimension()
+        # Queries differing only in case embed identically
+        self.lowercase = tokenizer_lowercases(getattr(self.model, 'tokenizer', None))
+
+    def encode(self, texts: List[str], batch_size: int = 32,
+               normalize_embeddings: bool = True) -> np.ndarray:
+        """Encode texts into a (len(texts), dimension) float32 array"""
+        embeddings = self.model.encode(
+            texts,
+            batch_size=batch_size,
+            normalize_embeddings=normalize_embeddings
+        )
+        return np.asarray(embeddings, dtype=np.float32)
+
+class OnnxEncoder:
+    """
+    Sentence-BERT encoder running an exported transformer with ONNX Runtime
+
+    Reproduces the sentence-transformers pipeline for MiniLM: tokenize,
+    run the transformer, mean-pool token embeddings over the attention
+    mask, then L2-normalize.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = False,
+                 intra_op_threads: Optional[int] = None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(model_dir, ONNX_CONFIG_FILE)) as f:
+            encoder_config = json.load(f)
+
+        self.backend = 'onnx-int8' if quantized else 'onnx'
+        self.model_name = encoder_config['model_name']
+        # Distinct name so cached embeddings never mix across backends
+        self.name = f"{self.model_name}:{self.backend}"
+        self.dimension = int(encoder_config['dimension'])
+        self.max_seq_length = int(encoder_config['max_seq_length'])
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+
+        model_file = ONNX_INT8_MODEL_FILE if quantized else ONNX_MODEL_FILE
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file),
+            sess_options=options,
+            providers=['CPUExecutionProvider']
+        )
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.lowercase = tokenizer_lowercases(self.tokenizer)
+
+    def encode(self, texts: List[str], batch_size: int = 32,
+               normalize_embeddings: bool = True) -> np.ndarray:
+        """Encode texts into a (len(texts), dimension) float32 array"""
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+
+        # Batch texts of similar length together to minimise padding
+        order = np.argsort([-len(text) for text in texts], kind='stable')
+
+        for start in range(0, len(texts), batch_size):
+            batch_rows = order[start:start + batch_size]
+            features = self.tokenizer(
+                [texts[row] for row in batch_rows],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors='np'
+            )
+            inputs = {
+                name: value.astype(np.int64)
+                for name, value in features.items() if name in self.input_names
+            }
+            token_embeddings = self.session.run(None, inputs)[0]
+
+            # Mean pooling over real (non-padding) tokens
+            mask = features['attention_mask'][:, :, None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+            embeddings[batch_rows] = pooled
+
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.clip(norms, 1e-12, None)
+
+        return embeddings
+
+def create_encoder(backend: str = 'torch', model_name: str = 'all-MiniLM-L6-v2',
+                   onnx_dir: Optional[str] = None,
+                   intra_op_threads: Optional[int] = None):
+    """
+    Create a query encoder for the configured backend
+
+    Args:
+        backend: 'torch', 'onnx' or 'onnx-int8'
+        model_name: Sentence-transformers model name (torch backend)
+        onnx_dir: Directory produced by export_onnx.py (ONNX backends)
+        intra_op_threads: ONNX Runtime intra-op thread count
+
+    Returns:
+        Encoder exposing encode(texts, batch_size, normalize_embeddings),
+        name, model_name, dimension and lowercase
+    """
+    if backend == 'torch':
+        return SentenceTransformerEncoder(model_name)
+
+    if backend in ('onnx', 'onnx-int8'):
+        if not onnx_dir or not os.path.exists(os.path.join(onnx_dir, ONNX_CONFIG_FILE)):
+            raise FileNotFoundError(
+                f"ONNX model not found in {onnx_dir}; run export_onnx.py first"
+            )
+        return OnnxEncoder(onnx_dir, quantized=(backend == 'onnx-int8'),
+                           intra_op_threads=intra_op_threads)
+
+    raise ValueError(f"Unknown encoder backend '{backend}', expected one of {ENCODER_BACKENDS}")
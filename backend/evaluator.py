@@ -1,12 +1,13 @@
 import pandas as pd
 import numpy as np
 from recommender import ProfessionalAssessmentRecommender
+from dataset import load_sheet
 from typing import List
 
 class RecommendationEvaluator:
     def __init__(self, train_file: str, recommender: ProfessionalAssessmentRecommender):
         """Initialize evaluator with training data"""
-        self.train_df = pd.read_excel(train_file, sheet_name='Train-Set')
+        self.train_df = load_sheet(train_file, 'Train-Set')
         self.recommender = recommender
         
         # Group ground truth by query
@@ -0,0 +1,167 @@
+"""
+V2.0 ONNX Encoder Export
+Exports the Sentence-BERT model to ONNX (fp32 and int8), checks parity
+against PyTorch on the training queries and reports recall vs speedup
+"""
+
+import argparse
+import json
+import os
+import time
+import logging
+from typing import Dict, List
+import numpy as np
+
+from dataset import load_sheet
+from encoders import (
+    ONNX_CONFIG_FILE, ONNX_INT8_MODEL_FILE, ONNX_MODEL_FILE, create_encoder
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def export_model(model_name: str, output_dir: str, opset: int = 14) -> None:
+    """Export the transformer to ONNX and write a dynamically quantized int8 copy"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    logger.info(f"\n📦 Exporting {model_name} to ONNX...")
+    st_model = SentenceTransformer(model_name, device='cpu')
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+
+    sample = tokenizer(['Java developer with collaboration skills'], return_tensors='pt')
+    input_names = list(sample.keys())
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['token_embeddings'] = {0: 'batch', 1: 'sequence'}
+
+    fp32_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=['token_embeddings'],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset
+        )
+    logger.info(f"✅ Saved {fp32_path}")
+
+    int8_path = os.path.join(output_dir, ONNX_INT8_MODEL_FILE)
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    logger.info(f"✅ Saved {int8_path} (dynamic int8)")
+
+    tokenizer.save_pretrained(output_dir)
+    with open(os.path.join(output_dir, ONNX_CONFIG_FILE), 'w') as f:
+        json.dump({
+            'model_name': model_name,
+            'dimension': st_model.get_sentence_embedding_dimension(),
+            'max_seq_length': st_model.max_seq_length
+        }, f, indent=4)
+
+    for path in (fp32_path, int8_path):
+        logger.info(f"   ├─ {os.path.basename(path)}: {os.path.getsize(path) / (1024**2):.1f} MB")
+
+def time_single_queries(encoder, queries: List[str]) -> Dict:
+    """Per-query (batch size 1) encode latency in milliseconds"""
+    encoder.encode(queries[:1])  # warm up
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        encoder.encode([query])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+        'mean_ms': round(float(np.mean(latencies)), 3)
+    }
+
+def parity_report(model_name: str, output_dir: str, dataset_file: str,
+                  data_dir: str) -> Dict:
+    """Compare ONNX backends with PyTorch on the training queries"""
+    from recommender import AssessmentRecommender
+    from run_evaluation import RecommendationEvaluator
+
+    queries = load_sheet(dataset_file, 'Train-Set', columns=['Query'])['Query'].unique().tolist()
+    logger.info(f"\n🔬 Parity check on {len(queries)} training queries")
+
+    encoders = {
+        backend: create_encoder(backend, model_name=model_name, onnx_dir=output_dir)
+        for backend in ('torch', 'onnx', 'onnx-int8')
+    }
+    reference = encoders['torch'].encode(queries)
+
+    report = {}
+    for backend, encoder in encoders.items():
+        embeddings = encoder.encode(queries)
+        cosine = np.sum(embeddings * reference, axis=1)
+
+        # End-to-end Recall@10 through the full recommender pipeline
+        recommender = AssessmentRecommender(data_dir, encoder=encoder)
+        evaluator = RecommendationEvaluator(dataset_file, recommender)
+        recall = evaluator.evaluate_at_k(k=10)['mean_recall@10']
+
+        report[backend] = {
+            'min_cosine_vs_torch': round(float(cosine.min()), 6),
+            'mean_cosine_vs_torch': round(float(cosine.mean()), 6),
+            'recall@10': round(float(recall), 4),
+            'latency': time_single_queries(encoder, queries)
+        }
+
+    torch_recall = report['torch']['recall@10']
+    torch_latency = report['torch']['latency']['mean_ms']
+    for backend, entry in report.items():
+        entry['recall_change'] = round(entry['recall@10'] - torch_recall, 4)
+        entry['speedup'] = round(torch_latency / entry['latency']['mean_ms'], 2)
+
+    logger.info(f"\n{'Backend':<12}{'min cos':>10}{'Recall@10':>11}{'ΔRecall':>9}{'p50 ms':>9}{'Speedup':>9}")
+    for backend, entry in report.items():
+        logger.info(
+            f"{backend:<12}{entry['min_cosine_vs_torch']:>10.4f}{entry['recall@10']:>11.4f}"
+            f"{entry['recall_change']:>+9.4f}{entry['latency']['p50_ms']:>9.2f}{entry['speedup']:>8.2f}x"
+        )
+
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the query encoder to ONNX")
+    parser.add_argument('--model', default='all-MiniLM-L6-v2', help="Sentence-transformers model name")
+    parser.add_argument('--output', default='../data/models/all-MiniLM-L6-v2-onnx',
+                        help="Output directory (use as ONNX_MODEL_DIR)")
+    parser.add_argument('--dataset', default='../data/Gen_AI-Dataset.xlsx', help="Dataset with Train-Set queries")
+    parser.add_argument('--data-dir', default='../data/processed', help="Processed artifacts for the recall check")
+    parser.add_argument('--min-cosine', type=float, default=0.99,
+                        help="Fail if any backend's minimum cosine vs PyTorch is lower")
+    parser.add_argument('--skip-export', action='store_true', help="Only run the parity report")
+    args = parser.parse_args()
+
+    logger.info("\n" + "="*70)
+    logger.info("V2.0 ONNX ENCODER EXPORT")
+    logger.info("="*70)
+
+    if not args.skip_export:
+        export_model(args.model, args.output)
+
+    report = parity_report(args.model, args.output, args.dataset, args.data_dir)
+
+    report_path = os.path.join(args.output, 'parity_report.json')
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=4)
+    logger.info(f"\n💾 Report saved to: {report_path}")
+
+    failing = [b for b, entry in report.items() if entry['min_cosine_vs_torch'] < args.min_cosine]
+    if failing:
+        logger.error(f"❌ Parity below {args.min_cosine} for: {', '.join(failing)}")
+        raise SystemExit(1)
+
+    logger.info(f"✅ All backends within parity threshold ({args.min_cosine})")
@@ -5,6 +5,8 @@ Generates predictions on test set for submission
 
 import pandas as pd
 from recommender import AssessmentRecommender
+from dataset import load_sheet
+from log_config import log_error
 import os
 import logging
 from typing import List
@@ -24,7 +26,7 @@ class PredictionGenerator:
         self.recommender = recommender
         
         logger.info("📊 Loading test set...")
-        self.test_df = pd.read_excel(test_file, sheet_name='Test-Set')
+        self.test_df = load_sheet(test_file, 'Test-Set')
         logger.info(f"✅ Test set loaded: {len(self.test_df)} queries")
     
     def generate_predictions(self, k: int = 10) -> pd.DataFrame:
@@ -33,12 +35,11 @@ class PredictionGenerator:
         
         predictions = []
         
-        for idx, row in self.test_df.iterrows():
-            query = row['Query']
-            
-            # Get recommendations
-            recommendations = self.recommender.get_recommendations(query, k=k)
-            
+        # Get recommendations for all queries in one batched pass
+        queries = self.test_df['Query'].tolist()
+        all_recommendations = self.recommender.get_recommendations_batch(queries, k=k)
+        
+        for idx, (query, recommendations) in enumerate(zip(queries, all_recommendations)):
             # Add each recommendation as a row
             for rec in recommendations:
                 predictions.append({
@@ -100,6 +101,4 @@ if __name__ == "__main__":
         logger.info("="*70 + "\n")
         
     except Exception as e:
-        logger.error(f"Prediction generation failed: {e}")
-        import traceback
-        traceback.print_exc()
+        log_error(logger, "Prediction generation failed", e)
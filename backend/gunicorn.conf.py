@@ -0,0 +1,55 @@
+"""
+V2.0 Gunicorn Configuration
+gunicorn -c gunicorn.conf.py wsgi:app
+gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi_app:app
+"""
+
+import os
+import config as settings  # "config" is a gunicorn setting name
+
+bind = f"{settings.HOST}:{settings.PORT}"
+workers = settings.WEB_CONCURRENCY or 2
+
+# Workers size their thread budget (threads.py) from the worker count
+os.environ['WEB_CONCURRENCY'] = str(workers)
+settings.WEB_CONCURRENCY = workers
+threads = settings.env_int('GUNICORN_THREADS', 4)
+# ...and share it between the request threads of a worker (asgi_app.py
+# replaces this with its executor size under the uvicorn worker)
+settings.REQUEST_THREADS = settings.REQUEST_THREADS or threads
+timeout = settings.env_int('GUNICORN_TIMEOUT', 120)
+graceful_timeout = 30
+keepalive = 5
+
+# Load the model and artifacts once in the master; workers share the pages
+preload_app = settings.env_bool('GUNICORN_PRELOAD', True)
+
+# The apps write their own structured access log line (log_config.py)
+accesslog = None
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+def post_fork(server, worker):
+    """Re-apply the thread budget in each worker when the master applied it (preload_app)"""
+    from threads import current_thread_budget
+    current_thread_budget()
+
+def _serves_asgi(worker) -> bool:
+    """Whether the worker runs asgi_app (the app URI is usually positional, not wsgi_app)"""
+    app_uri = getattr(worker.app, 'app_uri', None) or worker.cfg.wsgi_app or ''
+    return app_uri.startswith('asgi_app') or 'uvicorn' in worker.cfg.worker_class_str.lower()
+
+def post_worker_init(worker):
+    """
+    Start the artifact watcher inside each WSGI worker (asgi_app owns its
+    watcher and starts it on startup); with several workers it also carries
+    /admin/reload to all of them
+    """
+    if _serves_asgi(worker):
+        return
+    if not settings.ARTIFACT_WATCH_ENABLED and workers <= 1:
+        return
+
+    from app import reloader
+    reloader.start_watcher(settings.ARTIFACT_WATCH_INTERVAL_SECONDS,
+                           follow_versions=settings.ARTIFACT_WATCH_ENABLED)
@@ -0,0 +1,234 @@
+"""
+V2.0 FAISS Index Builder
+Builds Flat, IVF-Flat, IVF-PQ and HNSW inner-product indices from an index
+spec, applies incremental catalog updates by item id and persists the
+search parameters applied at load time
+"""
+
+import json
+import logging
+import os
+import re
+from typing import Dict, Optional, Tuple
+import numpy as np
+import faiss
+
+logger = logging.getLogger(__name__)
+
+INDEX_PARAMS_FILE = 'index_params.json'
+
+# FAISS guidance: at least ~39 training points per IVF list, 256 per PQ codebook
+MIN_POINTS_PER_LIST = 39
+MIN_PQ_TRAINING_POINTS = 256
+
+# Default search-time parameters per index family
+DEFAULT_NPROBE = 16
+DEFAULT_EF_SEARCH = 64
+DEFAULT_EF_CONSTRUCTION = 200
+
+# Families without native id support, wrapped in IDMap2 so items keep their ids
+ID_MAPPED_FAMILIES = ('flat', 'hnsw')
+
+_SPEC_PATTERNS = {
+    'flat': re.compile(r'^Flat$', re.IGNORECASE),
+    'ivf': re.compile(r'^IVF(\d+),(Flat|PQ(\d+)(?:x\d+)?)$', re.IGNORECASE),
+    'hnsw': re.compile(r'^HNSW(\d+)$', re.IGNORECASE),
+}
+
+def parse_index_spec(spec: str) -> Tuple[str, re.Match]:
+    """Return the index family ('flat', 'ivf' or 'hnsw') and the parsed spec"""
+    spec = spec.replace(' ', '')
+    for family, pattern in _SPEC_PATTERNS.items():
+        match = pattern.match(spec)
+        if match:
+            return family, match
+    raise ValueError(
+        f"Unsupported index spec '{spec}'. Use Flat, IVF<nlist>,Flat, "
+        f"IVF<nlist>,PQ<m> or HNSW<M>"
+    )
+
+def fit_index_spec(spec: str, n_vectors: int, dimension: int) -> str:
+    """
+    Adapt an index spec to the amount of training data available
+
+    IVF list counts are reduced to what the data can train, and specs that
+    cannot be trained at all fall back to exact Flat search.
+    """
+    family, match = parse_index_spec(spec)
+
+    if family != 'ivf':
+        return 'Flat' if family == 'flat' else f"HNSW{match.group(1)}"
+
+    nlist = int(match.group(1))
+    # Canonical casing expected by faiss.index_factory
+    encoding = 'Flat' if match.group(3) is None else 'PQ' + match.group(2)[2:].lower()
+
+    if match.group(3) is not None:
+        m = int(match.group(3))
+        if dimension % m != 0:
+            raise ValueError(f"PQ sub-quantizers ({m}) must divide the dimension ({dimension})")
+        if n_vectors < MIN_PQ_TRAINING_POINTS:
+            logger.warning(f"⚠️ {n_vectors} vectors are too few to train PQ, falling back to Flat")
+            return 'Flat'
+
+    max_lists = n_vectors // MIN_POINTS_PER_LIST
+    if max_lists < 2:
+        logger.warning(f"⚠️ {n_vectors} vectors are too few for IVF, falling back to Flat")
+        return 'Flat'
+
+    if nlist > max_lists:
+        logger.warning(f"⚠️ Reducing IVF lists from {nlist} to {max_lists} for {n_vectors} vectors")
+        nlist = max_lists
+
+    return f"IVF{nlist},{encoding}"
+
+def default_search_params(spec: str) -> Dict:
+    """Search-time parameters used when none are configured"""
+    family, match = parse_index_spec(spec)
+
+    if family == 'ivf':
+        return {'nprobe': min(int(match.group(1)), DEFAULT_NPROBE)}
+    if family == 'hnsw':
+        return {'efSearch': DEFAULT_EF_SEARCH}
+    return {}
+
+def new_index(dimension: int, spec: str) -> faiss.Index:
+    """Empty inner-product index for an effective spec, ID-mapped where needed"""
+    family = parse_index_spec(spec)[0]
+    if family not in ID_MAPPED_FAMILIES:
+        return faiss.index_factory(dimension, spec, faiss.METRIC_INNER_PRODUCT)
+
+    index = faiss.index_factory(dimension, f'IDMap2,{spec}', faiss.METRIC_INNER_PRODUCT)
+    if family == 'hnsw':
+        faiss.downcast_index(index.index).hnsw.efConstruction = DEFAULT_EF_CONSTRUCTION
+    return index
+
+def build_index(embeddings: np.ndarray, spec: str = 'Flat',
+                search_params: Optional[Dict] = None,
+                ids: Optional[np.ndarray] = None) -> Tuple[faiss.Index, Dict]:
+    """
+    Build and populate an inner-product FAISS index
+
+    Args:
+        embeddings: Normalized float32 vectors, one row per assessment
+        spec: Index spec (Flat, IVF<nlist>,Flat, IVF<nlist>,PQ<m>, HNSW<M>)
+        search_params: Search-time overrides (e.g. {'nprobe': 32})
+        ids: Item id of each row (default: the row positions)
+
+    Returns:
+        The index and its parameter record (effective spec and search params)
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    n_vectors, dimension = embeddings.shape
+    ids = np.arange(n_vectors, dtype=np.int64) if ids is None else np.asarray(ids, dtype=np.int64)
+
+    effective_spec = fit_index_spec(spec, n_vectors, dimension)
+    index = new_index(dimension, effective_spec)
+
+    if not index.is_trained:
+        logger.info(f"Training {effective_spec} index on {n_vectors} vectors...")
+        index.train(embeddings)
+
+    # Every family takes ids, so incremental updates can add and remove by item id
+    index.add_with_ids(embeddings, ids)
+
+    params = default_search_params(effective_spec)
+    params.update(search_params or {})
+    apply_search_params(index, params)
+
+    index_params = {
+        'index_spec': effective_spec,
+        'requested_spec': spec,
+        'metric': 'inner_product',
+        'search_params': params
+    }
+    return index, index_params
+
+def update_index(index: faiss.Index, index_spec: str, remove_ids: np.ndarray,
+                 add_embeddings: np.ndarray, add_ids: np.ndarray,
+                 embeddings: np.ndarray, ids: np.ndarray) -> faiss.Index:
+    """
+    Apply catalog removals and additions to an index by item id
+
+    IVF and ID-mapped Flat indices are updated in place (the IVF coarse
+    quantizer is not retrained). An ID-mapped HNSW graph takes additions in
+    place but cannot remove vectors, so a diff with removals (which include
+    changed items) rebuilds it over every vector of the catalog. Indices
+    from bundles built before ID mapping are rebuilt once as IDMap2.
+
+    Args:
+        index: Current index, loaded without mmap
+        index_spec: Its effective spec
+        remove_ids: Item ids to drop (removed and changed items)
+        add_embeddings: Vectors of added and changed items
+        add_ids: Their item ids
+        embeddings: All vectors of the updated catalog
+        ids: Their item ids
+
+    Returns:
+        The updated index (a new object when rebuilt)
+    """
+    family = parse_index_spec(index_spec)[0]
+    id_mapped = family not in ID_MAPPED_FAMILIES or isinstance(index, faiss.IndexIDMap2)
+    in_place = id_mapped and (family != 'hnsw' or not len(remove_ids))
+
+    if in_place:
+        if len(remove_ids):
+            index.remove_ids(np.asarray(remove_ids, dtype=np.int64))
+        if len(add_ids):
+            index.add_with_ids(np.ascontiguousarray(add_embeddings, dtype=np.float32),
+                               np.asarray(add_ids, dtype=np.int64))
+        return index
+
+    logger.info(f"Rebuilding {index_spec} index over {len(ids)} vectors...")
+    rebuilt = new_index(index.d, index_spec)
+    rebuilt.add_with_ids(np.ascontiguousarray(embeddings, dtype=np.float32),
+                         np.asarray(ids, dtype=np.int64))
+    return rebuilt
+
+def apply_search_params(index: faiss.Index, search_params: Optional[Dict]) -> None:
+    """Apply search-time parameters (nprobe, efSearch) to a loaded index"""
+    if not search_params:
+        return
+
+    description = ','.join(f'{name}={value}' for name, value in search_params.items())
+    faiss.ParameterSpace().set_index_parameters(index, description)
+
+def read_index(path: str, mmap: bool = True) -> faiss.Index:
+    """
+    Read a FAISS index, memory-mapping its vector storage when possible
+
+    A mapped index is read-only and its pages live in the shared page
+    cache, so several server processes reading the same file share one
+    copy. Needs faiss-cpu >= 1.11.0 (IO_FLAG_MMAP_IFC); older builds, and
+    index types that cannot be mapped, are read into memory with a warning.
+    """
+    mmap_flag = getattr(faiss, 'IO_FLAG_MMAP_IFC', None)
+
+    if mmap and mmap_flag is None:
+        logger.warning(f"⚠️ faiss {faiss.__version__} cannot memory-map indices (needs >= 1.11.0), "
+                       f"loading {path} into memory; workers will not share its pages")
+    elif mmap:
+        try:
+            return faiss.read_index(path, mmap_flag | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError as e:
+            if not os.path.exists(path):
+                raise FileNotFoundError(path) from e
+            logger.warning(f"⚠️ Memory-mapped read not supported for {path}, loading into memory: {e}")
+
+    return faiss.read_index(path)
+
+def save_index_params(directory: str, index_params: Dict) -> str:
+    """Write the index parameter record next to the index"""
+    path = os.path.join(directory, INDEX_PARAMS_FILE)
+    with open(path, 'w') as f:
+        json.dump(index_params, f, indent=4)
+    return path
+
+def load_index_params(directory: str) -> Optional[Dict]:
+    """Read the index parameter record, or None for legacy artifacts"""
+    path = os.path.join(directory, INDEX_PARAMS_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,228 @@
+"""
+V2.0 Logging Configuration
+Non-blocking queue-based log handling, a one-line structured access log,
+and rate-limited exception tracebacks, adjustable at runtime
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from typing import Dict, Optional
+
+import config
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+access_logger = logging.getLogger('access')
+
+# Fields gathered while a request is handled, written as its access log line
+_request_fields: contextvars.ContextVar = contextvars.ContextVar('access_fields', default=None)
+
+class _ProcessQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler whose listener thread is started lazily in each process
+
+    Threads do not survive a fork, so a pre-forked worker starts its own
+    listener on its first record. A full queue drops the record instead of
+    blocking the request thread; drops are counted and reported.
+    """
+
+    def __init__(self, target: logging.Handler, max_size: int):
+        super().__init__(queue.Queue(max_size))
+        self.target = target
+        self.max_size = max_size
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self._pid != os.getpid():
+            self._start_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start_listener(self) -> None:
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Records queued by the parent before the fork belong to the parent
+            self.queue = queue.Queue(self.max_size)
+            self._listener = logging.handlers.QueueListener(self.queue, self.target,
+                                                            respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def flush_and_stop(self) -> None:
+        """Drain the queue (called at exit)"""
+        with self._lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+                self._listener = None
+                self._pid = None
+
+class ErrorTraceLimiter:
+    """
+    Token bucket per error site deciding which exceptions get a traceback
+
+    Every error is logged as one line; only up to per_minute tracebacks per
+    site are, and the next one reports how many were suppressed.
+    """
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self._buckets: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, site: str):
+        """(allowed, suppressed since the last allowed traceback) for a site"""
+        if self.per_minute <= 0:
+            return False, 0
+
+        now = time.monotonic()
+        with self._lock:
+            # [tokens, last refill, suppressed]
+            bucket = self._buckets.setdefault(site, [self.per_minute, now, 0])
+            bucket[0] = min(self.per_minute, bucket[0] + (now - bucket[1]) * self.per_minute / 60)
+            bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                suppressed, bucket[2] = bucket[2], 0
+                return True, suppressed
+
+            bucket[2] += 1
+            return False, bucket[2]
+
+_handler: Optional[_ProcessQueueHandler] = None
+_limiter = ErrorTraceLimiter(config.ERROR_TRACE_PER_MINUTE)
+_access_enabled = config.ACCESS_LOG_ENABLED
+
+def configure_logging(level: Optional[str] = None) -> None:
+    """
+    Route all records through one bounded queue to a stderr handler
+
+    Replaces handlers installed by earlier basicConfig calls; calling it
+    again only changes the level.
+    """
+    global _handler
+
+    root = logging.getLogger()
+    root.setLevel((level or config.LOG_LEVEL).upper())
+
+    if _handler is not None:
+        return
+
+    target = logging.StreamHandler()
+    target.setFormatter(logging.Formatter(LOG_FORMAT))
+    _handler = _ProcessQueueHandler(target, config.LOG_QUEUE_SIZE)
+
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+    atexit.register(_handler.flush_and_stop)
+
+def log_error(log: logging.Logger, message: str, error: BaseException, site: Optional[str] = None) -> None:
+    """
+    Log an error in one line, attaching the traceback only while the
+    site's rate limit allows it (site defaults to the message)
+    """
+    allowed, suppressed = _limiter.allow(site or message)
+    if not allowed:
+        log.error("❌ %s: %s", message, error)
+        return
+
+    if suppressed:
+        log.error("❌ %s: %s (%d similar tracebacks suppressed)", message, error, suppressed, exc_info=error)
+    else:
+        log.error("❌ %s: %s", message, error, exc_info=error)
+
+def begin_request() -> Dict:
+    """Start collecting access log fields for the current request"""
+    fields = {}
+    _request_fields.set(fields)
+    return fields
+
+def note(**fields) -> None:
+    """Add fields to the current request's access log line"""
+    current = _request_fields.get()
+    if current is not None:
+        current.update(fields)
+
+def request_fields() -> Dict:
+    """Fields noted so far for the current request"""
+    return _request_fields.get() or {}
+
+def log_access(method: str, path: str, status: int, duration_ms: float) -> None:
+    """Write the access log line of the current request as one JSON object"""
+    fields = _request_fields.get()
+    _request_fields.set(None)
+
+    if not _access_enabled or not access_logger.isEnabledFor(logging.INFO):
+        return
+
+    entry = {'method': method, 'path': path, 'status': status, 'duration_ms': round(duration_ms, 2)}
+    if fields:
+        entry.update(fields)
+    access_logger.info(json.dumps(entry, default=str))
+
+def logging_status() -> Dict:
+    """Current runtime logging settings and queue health"""
+    loggers = {
+        name: logging.getLevelName(logger.level)
+        for name, logger in logging.root.manager.loggerDict.items()
+        if isinstance(logger, logging.Logger) and logger.level != logging.NOTSET
+    }
+    return {
+        'level': logging.getLevelName(logging.getLogger().level),
+        'loggers': loggers,
+        'access_log': _access_enabled,
+        'error_traces_per_minute': _limiter.per_minute,
+        'queue_size': _handler.max_size if _handler is not None else None,
+        'queued': _handler.queue.qsize() if _handler is not None else None,
+        'dropped': _handler.dropped if _handler is not None else None
+    }
+
+def update_logging(settings: Dict) -> Dict:
+    """
+    Apply runtime changes: "level", "loggers" ({name: level}), "access_log"
+    and "error_traces_per_minute". Raises ValueError for unknown levels.
+    """
+    global _access_enabled
+
+    per_minute = _limiter.per_minute
+    if 'error_traces_per_minute' in settings:
+        try:
+            per_minute = float(settings['error_traces_per_minute'])
+        except (TypeError, ValueError):
+            raise ValueError("error_traces_per_minute must be a number") from None
+
+    levels = {}
+    if 'level' in settings:
+        levels[''] = settings['level']
+    loggers = settings.get('loggers') or {}
+    if not isinstance(loggers, dict):
+        raise ValueError("loggers must map logger names to levels")
+    levels.update(loggers)
+
+    for name, level in levels.items():
+        if not isinstance(level, str) or not isinstance(logging.getLevelName(level.upper()), int):
+            raise ValueError(f"Unknown log level: {level}")
+
+    for name, level in levels.items():
+        logging.getLogger(name or None).setLevel(level.upper())
+
+    if 'access_log' in settings:
+        _access_enabled = bool(settings['access_log'])
+
+    _limiter.per_minute = per_minute
+
+    return logging_status()
@@ -0,0 +1,315 @@
+"""
+V2.0 Metrics
+In-process counters and histograms rendered in the Prometheus text
+exposition format, plus the per-phase timer used on the recommendation path
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import config
+from tracing import current_trace
+
+# Latency buckets in seconds (encode/search sit in the low milliseconds)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+# A collector returns (name, type, help, [(labels, value), ...]) families
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+def _escape(value) -> str:
+    """Escape a label value for the text format"""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """{name="value",...} or an empty string"""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+def _format_value(value: float) -> str:
+    """Sample value; integral values are written without a decimal point"""
+    if value == float('inf'):
+        return '+Inf'
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Registry:
+    """Metrics and scrape-time collectors of one process"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric) -> None:
+        with self._lock:
+            self._metrics.append(metric)
+
+    def register_collector(self, collector: Callable[[], Iterable[Family]],
+                           name: Optional[str] = None) -> None:
+        """
+        Add a function whose families are read at scrape time (e.g. cache stats)
+
+        A named collector replaces any earlier one of the same name, so
+        registering again (app startup re-run, second app module) never
+        emits a family twice.
+        """
+        with self._lock:
+            self._collectors[name if name is not None else id(collector)] = collector
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors.values())
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception:
+                # A broken collector must not take the whole scrape down
+                continue
+            for name, metric_type, help_text, samples in families:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                lines.extend(f'{name}{_format_labels(labels)} {_format_value(value)}'
+                             for labels, value in samples if value is not None)
+
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 registry: Optional[Registry] = REGISTRY):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def inc(self, *labelvalues, amount: float = 1) -> None:
+        """Add amount for the given label values (positional, in labelnames order)"""
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues) -> float:
+        with self._lock:
+            return self._values.get(labelvalues, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for labelvalues, value in values:
+            labels = dict(zip(self.labelnames, labelvalues))
+            lines.append(f'{self.name}{_format_labels(labels)} {_format_value(value)}')
+        return lines
+
+class Histogram:
+    """Bucketed distribution (count and sum included) with optional labels"""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS,
+                 registry: Optional[Registry] = REGISTRY):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labelvalues -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def observe(self, value: float, *labelvalues) -> None:
+        """Record one value for the given label values"""
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][position] += 1
+            series[1] += value
+
+    def count(self, *labelvalues) -> int:
+        with self._lock:
+            series = self._series.get(labelvalues)
+            return sum(series[0]) if series is not None else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = sorted((labelvalues, list(counts), total)
+                              for labelvalues, (counts, total) in self._series.items())
+
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labelvalues, counts, total in snapshot:
+            labels = dict(zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for upper, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                bucket_labels = _format_labels({**labels, 'le': _format_value(upper)})
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {cumulative}')
+        return lines
+
+# Recommendation pipeline
+PHASE_SECONDS = Histogram(
+    'recommender_phase_seconds',
+    'Time spent in each recommendation phase',
+    ('path', 'phase')
+)
+RECOMMEND_SECONDS = Histogram(
+    'recommender_request_seconds',
+    'Total recommender time per call',
+    ('path', 'outcome')
+)
+RECOMMENDER_ERRORS = Counter(
+    'recommender_errors_total',
+    'Recommendation calls or queries that failed with an error',
+    ('path',)
+)
+BATCH_QUERIES = Histogram(
+    'recommender_batch_queries',
+    'Queries per get_recommendations_batch call',
+    buckets=BATCH_SIZE_BUCKETS
+)
+MICRO_BATCH_SIZE = Histogram(
+    'micro_batch_size',
+    'Queries per micro-batch flush',
+    buckets=BATCH_SIZE_BUCKETS
+)
+
+# HTTP layer
+HTTP_REQUESTS = Counter(
+    'http_requests_total',
+    'HTTP requests by endpoint and status code',
+    ('endpoint', 'method', 'status')
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_seconds',
+    'HTTP handler latency until the response is returned (streams: until headers)',
+    ('endpoint',)
+)
+
+class PhaseTimer:
+    """
+    Lap timer over one recommender call
+
+    Each lap(phase) records the time since the previous lap (or start) under
+    that phase; finish(outcome) records the whole call. When the request is
+    traced, laps and the call also become spans carrying the lap attributes.
+    With METRICS_ENABLED off and no trace, all bookkeeping is skipped.
+    """
+
+    __slots__ = ('path', 'started', 'last', 'enabled', 'metrics', 'trace', 'epoch_us')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.metrics = config.METRICS_ENABLED
+        self.trace = current_trace()
+        self.enabled = self.metrics or self.trace is not None
+        self.started = self.last = time.perf_counter() if self.enabled else 0.0
+        # perf_counter is monotonic but has no epoch; spans are placed relative to this
+        self.epoch_us = time.time_ns() / 1000 if self.trace is not None else 0.0
+
+    def lap(self, phase: str, **attrs) -> float:
+        """Close the current phase and return its duration in seconds"""
+        if not self.enabled:
+            return 0.0
+        now = time.perf_counter()
+        elapsed = now - self.last
+        if self.metrics:
+            PHASE_SECONDS.observe(elapsed, self.path, phase)
+        if self.trace is not None:
+            self.trace.add_span(phase, self._span_start_us(self.last), elapsed * 1e6, **attrs)
+        self.last = now
+        return elapsed
+
+    def finish(self, outcome: str, **attrs) -> None:
+        """Record the total call time under the given outcome"""
+        if not self.enabled:
+            return
+        elapsed = time.perf_counter() - self.started
+        if self.metrics:
+            RECOMMEND_SECONDS.observe(elapsed, self.path, outcome)
+        if self.trace is not None:
+            self.trace.add_span(f'recommender.{self.path}', self.epoch_us, elapsed * 1e6,
+                                outcome=outcome, **attrs)
+
+    def _span_start_us(self, perf_time: float) -> float:
+        return self.epoch_us + (perf_time - self.started) * 1e6
+
+def observe_request(endpoint: str, method: str, status: int, seconds: float) -> None:
+    """Count one HTTP request and record its latency"""
+    if not config.METRICS_ENABLED:
+        return
+    HTTP_REQUESTS.inc(endpoint, method, str(status))
+    HTTP_REQUEST_SECONDS.observe(seconds, endpoint)
+
+def service_collector(get_engine: Callable, batcher=None, admission=None) -> Callable[[], List[Family]]:
+    """
+    Collector exporting cache, micro-batching and admission counters
+
+    Reads the stats the components already keep, so the hot path pays
+    nothing extra for them.
+    """
+    def collect() -> List[Family]:
+        families = []
+        engine = get_engine()
+
+        if engine is not None:
+            caches = engine.cache_stats()
+            hits, misses, entries = [], [], []
+            for cache in ('embedding_cache', 'result_cache', 'semantic_cache'):
+                stats = caches.get(cache)
+                if stats is None:
+                    continue
+                labels = {'cache': cache}
+                hits.append((labels, stats['hits']))
+                misses.append((labels, stats.get('misses', stats.get('lookups', 0) - stats['hits'])))
+                entries.append((labels, stats['entries']))
+            families += [
+                ('recommender_cache_hits_total', 'counter', 'Cache hits', hits),
+                ('recommender_cache_misses_total', 'counter', 'Cache misses', misses),
+                ('recommender_cache_entries', 'gauge', 'Entries held per cache', entries),
+                ('recommender_catalog_items', 'gauge', 'Items in the loaded FAISS index',
+                 [({'artifact_version': engine.artifact_version}, engine.index.ntotal)])
+            ]
+
+        if batcher is not None:
+            stats = batcher.stats()
+            families += [
+                ('micro_batch_queued', 'gauge', 'Queries waiting for a micro-batch', [({}, stats['queued'])]),
+                ('micro_batch_errors_total', 'counter', 'Micro-batches that failed', [({}, stats['errors'])])
+            ]
+
+        if admission is not None:
+            stats = admission.stats()
+            families += [
+                ('admission_in_flight', 'gauge', 'Requests currently admitted', [({}, stats['in_flight'])]),
+                ('admission_queue_depth', 'gauge', 'Requests waiting for a slot', [({}, stats['queue_depth'])]),
+                ('admission_rejected_total', 'counter', 'Requests rejected by admission control', [
+                    ({'reason': 'queue_full'}, stats['rejected_queue_full']),
+                    ({'reason': 'queue_timeout'}, stats['rejected_queue_timeout'])
+                ]),
+                ('admission_deadline_exceeded_total', 'counter', 'Requests aborted by their deadline',
+                 [({}, stats['deadline_exceeded'])])
+            ]
+
+        return families
+
+    return collect
@@ -9,8 +9,19 @@ import numpy as np
 from sentence_transformers import SentenceTransformer
 import faiss
 import os
+import argparse
+import hashlib
 import logging
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator, Union
+import config
+from index_builder import (build_index, read_index, load_index_params, update_index,
+                           apply_search_params)
+from artifacts import (write_bundle, resolve_bundle_dir, load_manifest, load_metadata,
+                       diff_catalog, EMBEDDINGS_FILE, INDEX_FILE)
+from embedding_store import EmbeddingStore
+from profile_builder import CategoryMatcher, ProfileAggregator
+from dataset import load_sheet, iter_sheet
+from log_config import log_error
 
 # Configure logging
 logging.basicConfig(
@@ -22,10 +33,19 @@ logger = logging.getLogger(__name__)
 class DataPreparationPipeline:
     """Professional data preparation with quality assurance"""
     
-    def __init__(self, data_dir: str = '../data', processed_dir: str = '../data/processed'):
+    def __init__(self, data_dir: str = '../data', processed_dir: str = '../data/processed',
+                 index_spec: str = 'Flat', search_params: Optional[Dict] = None,
+                 model_name: str = 'all-MiniLM-L6-v2',
+                 embedding_store_path: Optional[str] = config.EMBEDDING_STORE_PATH):
         self.data_dir = data_dir
+        self.model_name = model_name
+        self.embedding_store_path = embedding_store_path
         self.processed_dir = processed_dir
+        self.index_spec = index_spec
+        self.search_params = search_params
+        self.index_params = None
         self.raw_dir = f'{data_dir}/raw'
+        self.category_matcher = CategoryMatcher()
         
         # Create directories
         os.makedirs(self.processed_dir, exist_ok=True)
@@ -43,7 +63,7 @@ class DataPreparationPipeline:
         try:
             # Load training set
             file_path = f'{self.data_dir}/Gen_AI-Dataset.xlsx'
-            train_df = pd.read_excel(file_path, sheet_name='Train-Set')
+            train_df = load_sheet(file_path, 'Train-Set')
             
             # Validation
             if train_df.empty:
@@ -64,39 +84,59 @@ class DataPreparationPipeline:
             logger.error(f"❌ Failed to load training data: {e}")
             raise
     
-    def build_assessment_profiles_with_context(self, train_df: pd.DataFrame) -> Dict:
+    def stream_training_data(self, chunk_rows: int = config.PROFILE_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """
+        Read the training sheet in chunks of Query/Assessment_url rows
+        
+        Rows are streamed from the cached Parquet copy of the sheet (or the
+        workbook itself), so memory does not grow with the number of
+        labeled queries.
+        """
+        logger.info("\n📊 STEP 1: Streaming Training Data")
+        logger.info("-" * 70)
+        
+        file_path = f'{self.data_dir}/Gen_AI-Dataset.xlsx'
+        logger.info(f"Reading Train-Set from {file_path} in chunks of {chunk_rows} rows")
+        
+        return iter_sheet(file_path, 'Train-Set', columns=['Query', 'Assessment_url'], chunk_rows=chunk_rows)
+    
+    def build_assessment_profiles_with_context(
+            self, train_data: Union[pd.DataFrame, Iterable[pd.DataFrame]]) -> Dict:
         """
         Build rich assessment profiles using ground truth queries as context
         This is the KEY INNOVATION that achieved 82.4% Recall
+        
+        Accepts a DataFrame or an iterable of chunks; chunks are aggregated
+        as they arrive, keeping only the first queries of each assessment.
         """
         logger.info("\n📋 STEP 2: Building Assessment Profiles with Ground Truth Context")
         logger.info("-" * 70)
         
-        profiles = {}
+        chunks = [train_data] if isinstance(train_data, pd.DataFrame) else train_data
+        aggregator = ProfileAggregator(self.category_matcher)
+        for chunk in chunks:
+            aggregator.add(chunk)
         
-        # Group by assessment URL
-        assessment_groups = train_df.groupby('Assessment_url')
+        if aggregator.rows == 0:
+            raise ValueError("Training data is empty!")
         
-        logger.info(f"Processing {len(assessment_groups)} unique assessments...")
+        logger.info(f"Aggregated {aggregator.rows} training examples into {len(aggregator)} unique assessments...")
         
-        for url, group in assessment_groups:
-            # Extract all queries mentioning this assessment
-            queries = group['Query'].tolist()
-            
+        profiles = {}
+        for url, query_count, context_queries, rank in aggregator.results():
             # Extract name from URL
             name = self._extract_assessment_name(url)
             
             # INNOVATION: Use actual training queries as context
             # This provides ground truth semantic information
-            query_context = ' '.join(queries[:3])  # Use top 3 queries
-            
             profiles[url] = {
                 'url': url,
                 'name': name,
-                'query_context': query_context,  # KEY: Ground truth context
-                'query_count': len(queries),
-                'all_queries': queries,
-                'category': self._categorize_assessment(queries, name)
+                'query_context': ' '.join(context_queries),  # KEY: Ground truth context
+                'query_count': query_count,
+                'category': self.category_matcher.label(
+                    min(rank, self.category_matcher.rank(name.lower()))
+                )
             }
         
         logger.info(f"✅ Built {len(profiles)} assessment profiles with context")
@@ -129,32 +169,6 @@ class DataPreparationPipeline:
         except:
             return 'Unknown Assessment'
     
-    def _categorize_assessment(self, queries: List[str], name: str) -> str:
-        """Categorize assessment based on associated queries and name"""
-        combined_text = ' '.join(queries).lower() + ' ' + name.lower()
-        
-        # Technical category
-        if any(word in combined_text for word in 
-               ['java', 'python', 'sql', 'javascript', 'programming', 
-                'code', 'api', 'database', 'developer', 'engineer', 'technical']):
-            return 'Technical'
-        
-        # Cognitive category
-        elif any(word in combined_text for word in 
-                 ['verbal', 'reasoning', 'numerical', 'logical', 
-                  'cognitive', 'analysis', 'analytical']):
-            return 'Cognitive'
-        
-        # Behavioral category
-        elif any(word in combined_text for word in 
-                 ['personality', 'behavioral', 'leadership', 'motivation',
-                  'communication', 'teamwork', 'interpersonal', 'opq']):
-            return 'Behavioral'
-        
-        # Default
-        else:
-            return 'Assessment'
-    
     def create_embedding_texts(self, profiles: Dict) -> Tuple[List[str], pd.DataFrame]:
         """Create rich text representations for embeddings"""
         logger.info("\n🧠 STEP 3: Creating Embedding Text Representations")
@@ -185,11 +199,14 @@ Keywords: {profile['name'].lower()} {profile['category'].lower()}
                 'duration': 0,
                 'skills': '',
                 'description': profile['name'],
-                'query_count': profile['query_count']
+                'query_count': profile['query_count'],
+                # Lets incremental updates tell which embeddings are stale
+                'content_hash': hashlib.sha256(text.encode()).hexdigest()[:16]
             })
         
-        # Create metadata DataFrame
+        # Create metadata DataFrame; full builds number items by row
         metadata_df = pd.DataFrame(metadata_list)
+        metadata_df['item_id'] = np.arange(len(metadata_df), dtype=np.int64)
         
         logger.info(f"✅ Created {len(texts)} embedding texts")
         logger.info(f"   ├─ Technical: {len(metadata_df[metadata_df['test_type']=='Technical'])}")
@@ -200,34 +217,46 @@ Keywords: {profile['name'].lower()} {profile['category'].lower()}
         return texts, metadata_df
     
     def generate_embeddings(self, texts: List[str]) -> np.ndarray:
-        """Generate high-quality embeddings"""
+        """
+        Generate high-quality embeddings
+        
+        With an embedding store configured, only texts it has not seen for
+        this model are encoded (and the model is only loaded if any are).
+        """
         logger.info("\n🚀 STEP 4: Generating Semantic Embeddings")
         logger.info("-" * 70)
         
+        if self.embedding_store_path:
+            with EmbeddingStore(self.embedding_store_path) as store:
+                embeddings = store.encode(texts, self._encode_texts, self.model_name, normalize=True)
+                store.compact(config.EMBEDDING_STORE_MAX_AGE_DAYS)
+        else:
+            embeddings = self._encode_texts(texts)
+        
+        logger.info(f"✅ Embeddings generated successfully")
+        logger.info(f"   ├─ Shape: {embeddings.shape}")
+        logger.info(f"   ├─ Dimension: {embeddings.shape[1]}")
+        logger.info(f"   ├─ Data type: {embeddings.dtype}")
+        logger.info(f"   └─ Memory: {embeddings.nbytes / (1024**2):.2f} MB")
+        
+        return embeddings
+    
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Encode texts with the Sentence-BERT model (normalized)"""
         # Load model
         logger.info("Loading Sentence-BERT model...")
-        model = SentenceTransformer('all-MiniLM-L6-v2')
-        logger.info(f"✅ Model loaded: all-MiniLM-L6-v2")
-        logger.info(f"   ├─ Dimension: 384")
-        logger.info(f"   ├─ Model size: 22.7M parameters")
-        logger.info(f"   └─ Training data: 1B+ sentence pairs")
+        model = SentenceTransformer(self.model_name)
+        logger.info(f"✅ Model loaded: {self.model_name}")
+        logger.info(f"   ├─ Dimension: {model.get_sentence_embedding_dimension()}")
         
         # Generate embeddings with batching
         logger.info(f"\nGenerating embeddings for {len(texts)} texts...")
-        embeddings = model.encode(
+        return model.encode(
             texts,
             batch_size=32,
             show_progress_bar=True,
             normalize_embeddings=True
         )
-        
-        logger.info(f"✅ Embeddings generated successfully")
-        logger.info(f"   ├─ Shape: {embeddings.shape}")
-        logger.info(f"   ├─ Dimension: {embeddings.shape[1]}")
-        logger.info(f"   ├─ Data type: {embeddings.dtype}")
-        logger.info(f"   └─ Memory: {embeddings.nbytes / (1024**2):.2f} MB")
-        
-        return embeddings
     
     def build_faiss_index(self, embeddings: np.ndarray) -> faiss.Index:
         """Build FAISS index for efficient search"""
@@ -236,50 +265,128 @@ Keywords: {profile['name'].lower()} {profile['category'].lower()}
         
         dimension = embeddings.shape[1]
         
-        # Create index using Inner Product (equivalent to cosine similarity for normalized vectors)
-        index = faiss.IndexFlatIP(dimension)
-        
         logger.info(f"Creating FAISS index...")
-        logger.info(f"   ├─ Index type: IndexFlatIP (exact cosine similarity)")
+        logger.info(f"   ├─ Requested spec: {self.index_spec} (inner product = cosine similarity)")
         logger.info(f"   ├─ Dimension: {dimension}")
         logger.info(f"   ├─ Number of vectors: {len(embeddings)}")
         
-        # Add embeddings to index
-        index.add(embeddings)
+        # Train (if needed) and populate the index described by the spec
+        index, self.index_params = build_index(embeddings, self.index_spec, self.search_params)
         
         logger.info(f"✅ FAISS index built successfully")
+        logger.info(f"   ├─ Index spec: {self.index_params['index_spec']}")
         logger.info(f"   ├─ Total items: {index.ntotal}")
-        logger.info(f"   ├─ Search complexity: O(n)")
-        logger.info(f"   └─ Ready for fast similarity search")
+        logger.info(f"   └─ Search params: {self.index_params['search_params'] or 'exact search'}")
         
         return index
     
     def save_artifacts(self, embeddings: np.ndarray, index: faiss.Index, 
                        metadata_df: pd.DataFrame) -> None:
-        """Save all artifacts"""
+        """Save all artifacts as a new versioned bundle"""
         logger.info("\n💾 STEP 6: Saving Artifacts")
         logger.info("-" * 70)
         
         try:
-            # Save embeddings
-            embeddings_path = f'{self.processed_dir}/embeddings.npy'
-            np.save(embeddings_path, embeddings)
+            # Embeddings, index, Parquet metadata, index params and manifest,
+            # published atomically via the CURRENT pointer
+            bundle_dir = write_bundle(
+                self.processed_dir, embeddings, index, metadata_df,
+                self.index_params, self.model_name
+            )
             logger.info(f"✅ Saved embeddings.npy ({embeddings.nbytes / (1024**2):.2f} MB)")
+            logger.info(f"✅ Saved faiss_index.bin ({self.index_params['index_spec']})")
+            logger.info(f"✅ Saved assessments_metadata.parquet ({len(metadata_df)} rows)")
+            logger.info(f"✅ Saved manifest.json")
+            
+            logger.info(f"\n✨ All artifacts saved to: {bundle_dir}/")
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to save artifacts: {e}")
+            raise
+    
+    def _incremental_blocker(self, manifest: Optional[Dict]) -> Optional[str]:
+        """Why the current bundle cannot be updated incrementally, or None"""
+        if manifest is None:
+            return "No bundle manifest found"
+        if manifest['model_name'] != self.model_name:
+            return f"Bundle was built with {manifest['model_name']}, not {self.model_name}"
+        missing = {'content_hash', 'item_id'} - set(manifest['metadata_columns'])
+        if missing:
+            return f"Bundle metadata lacks {', '.join(sorted(missing))}"
+        return None
+    
+    def run_incremental_update(self) -> None:
+        """
+        Apply catalog changes to the current bundle without a full rebuild
+        
+        Profiles are rebuilt from the input and diffed against the bundle
+        metadata by URL and embedding-text hash. Only added and changed
+        assessments are encoded; the index is updated by item id with the
+        bundle's own index spec and the result is published as a new bundle.
+        Falls back to the full pipeline when the bundle cannot be updated.
+        """
+        try:
+            bundle_dir = resolve_bundle_dir(self.processed_dir)
+            manifest = load_manifest(bundle_dir)
+            blocker = self._incremental_blocker(manifest)
+            if blocker:
+                logger.warning(f"⚠️ {blocker}, running the full pipeline instead")
+                return self.run_full_pipeline()
+            
+            profiles = self.build_assessment_profiles_with_context(self.stream_training_data())
+            texts, metadata_df = self.create_embedding_texts(profiles)
+            
+            logger.info(f"\n🔄 STEP 4: Diffing Against Bundle {manifest['version']}")
+            logger.info("-" * 70)
+            
+            old_metadata = load_metadata(bundle_dir)
+            old_embeddings = np.load(os.path.join(bundle_dir, EMBEDDINGS_FILE))
+            
+            diff = diff_catalog(old_metadata, metadata_df)
+            added, changed, removed = diff['added'], diff['changed'], diff['removed']
+            
+            logger.info(f"   ├─ Added: {int(added.sum())}")
+            logger.info(f"   ├─ Changed: {int(changed.sum())}")
+            logger.info(f"   ├─ Removed: {int(removed.sum())}")
+            logger.info(f"   └─ Unchanged: {int((~added & ~changed).sum())}")
+            
+            if not (added.any() or changed.any() or removed.any()):
+                logger.info("\n✅ Catalog unchanged, keeping the current bundle")
+                return
+            
+            item_ids = diff['item_ids']
+            metadata_df['item_id'] = item_ids
+            
+            stale = added | changed
+            embeddings = np.empty((len(metadata_df), old_embeddings.shape[1]), dtype=np.float32)
+            embeddings[~stale] = old_embeddings[diff['old_rows'][~stale]]
+            if stale.any():
+                embeddings[stale] = self.generate_embeddings([texts[row] for row in np.flatnonzero(stale)])
             
-            # Save FAISS index
-            index_path = f'{self.processed_dir}/faiss_index.bin'
-            faiss.write_index(index, index_path)
-            logger.info(f"✅ Saved faiss_index.bin")
+            logger.info("\n🔍 STEP 5: Updating FAISS Index by Item ID")
+            logger.info("-" * 70)
             
-            # Save metadata
-            metadata_path = f'{self.processed_dir}/assessments_metadata.csv'
-            metadata_df.to_csv(metadata_path, index=False)
-            logger.info(f"✅ Saved assessments_metadata.csv ({len(metadata_df)} rows)")
+            self.index_params = load_index_params(bundle_dir) or {'index_spec': 'Flat', 'search_params': {}}
+            index = read_index(os.path.join(bundle_dir, INDEX_FILE), mmap=False)
+            index = update_index(
+                index, self.index_params['index_spec'],
+                remove_ids=np.concatenate([old_metadata['item_id'].to_numpy(dtype=np.int64)[removed],
+                                           item_ids[changed]]),
+                add_embeddings=embeddings[stale], add_ids=item_ids[stale],
+                embeddings=embeddings, ids=item_ids
+            )
+            apply_search_params(index, self.index_params.get('search_params'))
             
-            logger.info(f"\n✨ All artifacts saved to: {self.processed_dir}/")
+            logger.info(f"✅ Index updated: {index.ntotal} items ({self.index_params['index_spec']})")
+            
+            self.save_artifacts(embeddings, index, metadata_df)
+            
+            logger.info("\n" + "="*70)
+            logger.info("✨ V2.0 INCREMENTAL UPDATE COMPLETE")
+            logger.info("="*70)
             
         except Exception as e:
-            logger.error(f"❌ Failed to save artifacts: {e}")
+            logger.error(f"\n❌ INCREMENTAL UPDATE FAILED: {e}")
             raise
     
     def run_full_pipeline(self) -> None:
@@ -287,11 +394,8 @@ Keywords: {profile['name'].lower()} {profile['category'].lower()}
         try:
             logger.info("\n")
             
-            # Step 1: Load data
-            train_df = self.load_training_data()
-            
-            # Step 2: Build profiles with context
-            profiles = self.build_assessment_profiles_with_context(train_df)
+            # Steps 1-2: Stream data and build profiles with context
+            profiles = self.build_assessment_profiles_with_context(self.stream_training_data())
             
             # Step 3: Create embedding texts
             texts, metadata_df = self.create_embedding_texts(profiles)
@@ -313,11 +417,24 @@ Keywords: {profile['name'].lower()} {profile['category'].lower()}
             logger.info("\n")
             
         except Exception as e:
-            logger.error(f"\n❌ PIPELINE FAILED: {e}")
-            import traceback
-            traceback.print_exc()
+            log_error(logger, "PIPELINE FAILED", e)
             raise
 
 if __name__ == "__main__":
-    pipeline = DataPreparationPipeline()
-    pipeline.run_full_pipeline()
+    parser = argparse.ArgumentParser(description="Build recommender artifacts")
+    parser.add_argument('--index-spec', default=os.getenv('FAISS_INDEX_SPEC', 'Flat'),
+                        help="Flat, IVF<nlist>,Flat, IVF<nlist>,PQ<m> or HNSW<M>")
+    parser.add_argument('--no-embedding-store', action='store_true',
+                        help="Encode every text instead of reusing stored embeddings")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Update the current bundle with catalog changes (keeps its index spec)")
+    args = parser.parse_args()
+    
+    pipeline = DataPreparationPipeline(
+        index_spec=args.index_spec,
+        embedding_store_path=None if args.no_embedding_store else config.EMBEDDING_STORE_PATH
+    )
+    if args.incremental:
+        pipeline.run_incremental_update()
+    else:
+        pipeline.run_full_pipeline()
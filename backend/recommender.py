@@ -6,9 +6,25 @@ Achieved 82.4% Recall@10 using ground truth query context
 import numpy as np
 import pandas as pd
 import faiss
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Tuple, Set
+from typing import List, Dict, Tuple, Set, Optional
 import logging
+import os
+import time
+import config
+from cache import EmbeddingCache, ResultCache
+from artifacts import (
+    EMBEDDINGS_FILE, INDEX_FILE, current_artifact_version, load_manifest,
+    load_metadata, resolve_bundle_dir, verify_checksums
+)
+from semantic_cache import SemanticCache
+from catalog import CatalogStore, Candidate
+from diversity import select_diverse
+from encoders import create_encoder
+from admission import Deadline, DeadlineExceeded
+from threads import apply_thread_budget
+from metrics import BATCH_QUERIES, RECOMMENDER_ERRORS, PhaseTimer
+from log_config import log_error
+from index_builder import apply_search_params, load_index_params, read_index
 
 # Configure logging
 logging.basicConfig(
@@ -20,48 +36,81 @@ logger = logging.getLogger(__name__)
 class AssessmentRecommender:
     """Professional V2.0 Recommender with Championship Performance"""
     
-    def __init__(self, data_dir: str = '../data/processed'):
-        """Initialize recommender with all necessary artifacts"""
+    def __init__(self, data_dir: str = '../data/processed', encode_batch_size: int = 64,
+                 embedding_cache: Optional[EmbeddingCache] = None, encoder=None):
+        """
+        Initialize recommender with all necessary artifacts
+        
+        Args:
+            data_dir: Directory holding the artifact bundles (or legacy
+                flat artifacts)
+            encode_batch_size: Mini-batch size used when encoding queries
+            embedding_cache: Query embedding cache to use (e.g. shared with
+                another instance); one is created from config when omitted
+            encoder: Already loaded query encoder to reuse; one is created
+                from config (ENCODER_BACKEND) when omitted
+        """
         logger.info("\n" + "="*70)
         logger.info("🏆 V2.0 ASSESSMENT RECOMMENDER - INITIALIZING")
         logger.info("="*70)
         
         try:
             self.data_dir = data_dir
+            self.encode_batch_size = encode_batch_size
+            self.embedding_cache = embedding_cache if embedding_cache is not None \
+                else self._create_embedding_cache()
+            self.result_cache = self._create_result_cache()
+            
+            # Current bundle and its version, used in result cache keys
+            self.bundle_dir = resolve_bundle_dir(data_dir)
+            self.manifest = load_manifest(self.bundle_dir)
+            self.artifact_version = self.manifest['version'] if self.manifest \
+                else current_artifact_version(data_dir)
+            self._artifacts_stale = False
+            self._last_artifact_check = time.monotonic()
             
             # Load all artifacts
-            logger.info("\n📦 Loading Pre-Computed Artifacts...")
-            self._load_embeddings(data_dir)
-            self._load_faiss_index(data_dir)
-            self._load_metadata(data_dir)
-            self._initialize_embedding_model()
+            logger.info(f"\n📦 Loading Pre-Computed Artifacts ({self.artifact_version})...")
+            self._load_embeddings(self.bundle_dir)
+            self._load_faiss_index(self.bundle_dir)
+            self._load_metadata(self.bundle_dir)
+            
+            # Per-worker torch/FAISS/BLAS thread counts, before the encoder loads
+            self.thread_budget = apply_thread_budget()
+            self._initialize_embedding_model(encoder)
+            self._validate_manifest()
             
             # Build indices for optimization
             self._build_optimization_indices()
+            self.semantic_cache = self._create_semantic_cache()
             
             logger.info("\n✅ Recommender initialized successfully")
-            logger.info(f"   ├─ Embeddings loaded: {self.embeddings.shape}")
+            logger.info(f"   ├─ Embeddings: loaded lazily on first use")
             logger.info(f"   ├─ FAISS index loaded: {self.index.ntotal} items")
             logger.info(f"   ├─ Metadata loaded: {len(self.metadata)} rows")
-            logger.info(f"   └─ Model loaded: all-MiniLM-L6-v2 (384-dim)")
+            logger.info(f"   └─ Model loaded: {self.model_name} ({self.model.dimension}-dim)")
             logger.info("\n" + "="*70 + "\n")
             
         except Exception as e:
-            logger.error(f"❌ Initialization failed: {e}")
-            import traceback
-            traceback.print_exc()
+            log_error(logger, "Initialization failed", e)
             raise
     
     def _load_embeddings(self, data_dir: str) -> None:
-        """Load pre-computed embeddings"""
+        """
+        Check pre-computed embeddings exist
+        
+        The search path only needs the FAISS index, so the array itself is
+        opened lazily (see the embeddings property).
+        """
         try:
-            embeddings_path = f'{data_dir}/embeddings.npy'
-            self.embeddings = np.load(embeddings_path)
+            embeddings_path = os.path.join(data_dir, EMBEDDINGS_FILE)
+            if not os.path.exists(embeddings_path):
+                raise FileNotFoundError(embeddings_path)
             
-            if self.embeddings.size == 0:
-                raise ValueError("Embeddings array is empty")
+            self._embeddings_path = embeddings_path
+            self._embeddings = None
             
-            logger.info(f"✅ Embeddings loaded: {self.embeddings.shape}")
+            logger.info(f"✅ Embeddings found: {embeddings_path} (loaded on demand)")
             
         except FileNotFoundError:
             logger.error(f"❌ Embeddings file not found: {embeddings_path}")
@@ -70,16 +119,38 @@ class AssessmentRecommender:
             logger.error(f"❌ Failed to load embeddings: {e}")
             raise
     
+    @property
+    def embeddings(self) -> np.ndarray:
+        """Catalog embeddings, memory-mapped read-only on first access"""
+        if self._embeddings is None:
+            embeddings = np.load(self._embeddings_path, mmap_mode='r' if config.ARTIFACT_MMAP else None)
+            
+            if embeddings.size == 0:
+                raise ValueError("Embeddings array is empty")
+            
+            self._embeddings = embeddings
+            logger.info(f"✅ Embeddings loaded: {embeddings.shape}")
+        
+        return self._embeddings
+    
     def _load_faiss_index(self, data_dir: str) -> None:
         """Load FAISS index"""
         try:
-            index_path = f'{data_dir}/faiss_index.bin'
-            self.index = faiss.read_index(index_path)
+            index_path = os.path.join(data_dir, INDEX_FILE)
+            # Memory-mapped so worker processes share one page-cache copy
+            self.index = read_index(index_path, mmap=config.ARTIFACT_MMAP)
             
             if self.index is None:
                 raise ValueError("FAISS index is None")
             
-            logger.info(f"✅ FAISS index loaded: {self.index.ntotal} items")
+            # Apply persisted search parameters (nprobe, efSearch) if present
+            self.index_params = load_index_params(data_dir) or {
+                'index_spec': 'Flat', 'search_params': {}
+            }
+            apply_search_params(self.index, self.index_params.get('search_params'))
+            
+            logger.info(f"✅ FAISS index loaded: {self.index.ntotal} items "
+                        f"({self.index_params['index_spec']}, {self.index_params.get('search_params') or 'exact'})")
             
         except FileNotFoundError:
             logger.error(f"❌ FAISS index file not found: {index_path}")
@@ -89,94 +160,392 @@ class AssessmentRecommender:
             raise
     
     def _load_metadata(self, data_dir: str) -> None:
-        """Load assessment metadata"""
+        """Load assessment metadata and build the columnar catalog store"""
         try:
-            metadata_path = f'{data_dir}/assessments_metadata.csv'
-            self.metadata = pd.read_csv(metadata_path)
+            self.metadata = load_metadata(data_dir)
             
             if len(self.metadata) == 0:
                 raise ValueError("Metadata is empty")
             
+            # Request path reads from arrays only, never from the DataFrame
+            self.catalog = CatalogStore.from_dataframe(self.metadata)
+            
             logger.info(f"✅ Metadata loaded: {len(self.metadata)} assessments")
             
         except FileNotFoundError:
-            logger.error(f"❌ Metadata file not found: {metadata_path}")
+            logger.error(f"❌ Metadata file not found in {data_dir}")
             raise
         except Exception as e:
             logger.error(f"❌ Failed to load metadata: {e}")
             raise
     
-    def _initialize_embedding_model(self) -> None:
+    def _initialize_embedding_model(self, encoder=None) -> None:
         """Initialize embedding model"""
         try:
-            logger.info("Loading Sentence-BERT model...")
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
-            logger.info("✅ Model loaded: all-MiniLM-L6-v2")
+            if encoder is None:
+                logger.info(f"Loading Sentence-BERT model ({config.ENCODER_BACKEND} backend)...")
+                encoder = create_encoder(
+                    backend=config.ENCODER_BACKEND,
+                    model_name=config.ENCODER_MODEL_NAME,
+                    onnx_dir=config.ONNX_MODEL_DIR,
+                    intra_op_threads=self.thread_budget['onnx_intra_op']
+                )
+            
+            self.model = encoder
+            # Backend-qualified name, so cached embeddings never mix backends
+            self.model_name = encoder.name
+            # Cache keys fold case only for an uncased tokenizer
+            self.query_lowercase = bool(getattr(encoder, 'lowercase', False))
+            
+            if encoder.dimension != self.index.d:
+                raise ValueError(
+                    f"Encoder dimension {encoder.dimension} does not match index dimension {self.index.d}"
+                )
+            
+            logger.info(f"✅ Model loaded: {self.model_name}")
             
         except Exception as e:
             logger.error(f"❌ Failed to load embedding model: {e}")
             raise
     
+    def _validate_manifest(self) -> None:
+        """Check loaded artifacts agree with each other and with the bundle manifest"""
+        if self.index.ntotal != len(self.catalog):
+            raise ValueError(
+                f"Index has {self.index.ntotal} vectors but metadata has {len(self.catalog)} rows"
+            )
+        
+        if self.manifest is None:
+            logger.warning("⚠️ Legacy artifact layout without manifest, rebuild with prepare_data.py")
+            return
+        
+        if self.manifest['rows'] != self.index.ntotal:
+            raise ValueError(f"Manifest lists {self.manifest['rows']} rows, index has {self.index.ntotal}")
+        if self.manifest['dimension'] != self.index.d:
+            raise ValueError(f"Manifest dimension {self.manifest['dimension']} != index dimension {self.index.d}")
+        if self.manifest['model_name'] != self.model.model_name:
+            raise ValueError(
+                f"Artifacts were built with {self.manifest['model_name']}, "
+                f"but the encoder is {self.model.model_name}"
+            )
+        
+        if config.ARTIFACT_VERIFY_CHECKSUMS:
+            verify_checksums(self.bundle_dir, self.manifest)
+            logger.info("✅ Bundle checksums verified")
+        
+        logger.info(f"✅ Manifest validated: {self.manifest['version']}")
+    
+    def _create_embedding_cache(self) -> Optional[EmbeddingCache]:
+        """Create the query embedding cache from config (None if disabled)"""
+        if config.EMBEDDING_CACHE_ENTRIES <= 0:
+            return None
+        
+        return EmbeddingCache(
+            max_entries=config.EMBEDDING_CACHE_ENTRIES,
+            max_bytes=config.EMBEDDING_CACHE_MAX_BYTES,
+            ttl_seconds=config.EMBEDDING_CACHE_TTL_SECONDS
+        )
+    
+    def _create_result_cache(self) -> Optional[ResultCache]:
+        """Create the full-response cache from config (None if disabled)"""
+        if config.RESULT_CACHE_ENTRIES <= 0:
+            return None
+        
+        return ResultCache(
+            max_entries=config.RESULT_CACHE_ENTRIES,
+            ttl_seconds=config.RESULT_CACHE_TTL_SECONDS
+        )
+    
+    def _create_semantic_cache(self) -> Optional[SemanticCache]:
+        """Create the near-duplicate query cache from config (None if disabled)"""
+        if not config.SEMANTIC_CACHE_ENABLED:
+            return None
+        
+        return SemanticCache(
+            dimension=self.index.d,
+            threshold=config.SEMANTIC_CACHE_THRESHOLD,
+            max_entries=config.SEMANTIC_CACHE_ENTRIES
+        )
+    
+    def cache_stats(self) -> Dict:
+        """Return hit/miss counters for the recommender caches"""
+        return {
+            'embedding_cache': self.embedding_cache.stats() if self.embedding_cache is not None else None,
+            'result_cache': self.result_cache.stats() if self.result_cache is not None else None,
+            'semantic_cache': self.semantic_cache.stats() if self.semantic_cache is not None else None,
+            'artifact_version': self.artifact_version
+        }
+    
+    def _artifacts_changed(self) -> bool:
+        """Whether artifacts on disk differ from the loaded ones (checked periodically)"""
+        now = time.monotonic()
+        
+        if now - self._last_artifact_check >= config.ARTIFACT_CHECK_INTERVAL_SECONDS:
+            self._last_artifact_check = now
+            changed = current_artifact_version(self.data_dir) != self.artifact_version
+            
+            if changed and not self._artifacts_stale:
+                # Loaded artifacts are now outdated: drop and stop caching results
+                logger.warning("⚠️ Artifacts changed on disk, result caches disabled until reload")
+                for cache in (self.result_cache, self.semantic_cache):
+                    if cache is not None:
+                        cache.clear()
+            
+            self._artifacts_stale = changed
+        
+        return self._artifacts_stale
+    
+    def _semantic_cache_active(self) -> bool:
+        """Whether the semantic cache may be used for the current request"""
+        return self.semantic_cache is not None and not self._artifacts_changed()
+    
+    def _result_cache_key(self, query: str, k: int) -> Optional[Tuple]:
+        """Result cache key for a validated query, or None when caching is off"""
+        if self.result_cache is None or self._artifacts_changed():
+            return None
+        return self.result_cache.make_key(self.artifact_version, query, k, self.query_lowercase)
+    
     def _build_optimization_indices(self) -> None:
         """Build indices for optimization"""
         # Type-based index for diversity
-        self.type_index = {}
-        for idx, row in self.metadata.iterrows():
-            test_type = row['test_type']
-            if test_type not in self.type_index:
-                self.type_index[test_type] = []
-            self.type_index[test_type].append(idx)
+        self.type_index = {
+            label: np.flatnonzero(self.catalog.type_codes == code).tolist()
+            for code, label in enumerate(self.catalog.type_labels)
+        }
         
         logger.info(f"✅ Built type index: {len(self.type_index)} categories")
     
-    def get_recommendations(self, query: str, k: int = 10) -> List[Dict]:
+    def get_recommendations(self, query: str, k: int = 10,
+                            deadline: Optional[Deadline] = None) -> List[Dict]:
         """
         Get top-k assessment recommendations
         
         Args:
             query: Job description or search query
             k: Number of recommendations (5-10)
+            deadline: Optional request deadline, checked between phases
         
         Returns:
             List of recommendation dictionaries with scores
+        
+        Raises:
+            DeadlineExceeded: The deadline passed before a phase started
         """
+        timer = PhaseTimer('single')
         try:
             # Validate inputs
             k = self._validate_k(k)
             query = self._validate_query(query)
             
-            logger.info(f"\n📝 PROCESSING QUERY")
-            logger.info(f"-" * 70)
-            logger.info(f"Query: {query[:70]}...")
-            logger.info(f"Requested: {k} recommendations")
+            logger.debug("Processing query (k=%d): %.70s", k, query)
+            
+            # Serve repeated requests straight from the result cache
+            cache_key = self._result_cache_key(query, k)
+            if cache_key is not None:
+                cached = self.result_cache.get_results(cache_key)
+                if cached is not None:
+                    logger.debug("Served %d recommendations from result cache", len(cached))
+                    timer.lap('result_cache', hit=True)
+                    timer.finish('result_cache_hit', k=k, query_length=len(query))
+                    return cached
+            timer.lap('result_cache', hit=False)
             
             # Phase 1: Encode query
+            if deadline is not None:
+                deadline.check('encode')
             query_embedding = self._encode_query(query)
+            timer.lap('encode', query_length=len(query))
+            
+            # Reuse results of a near-duplicate query answered earlier
+            if self._semantic_cache_active():
+                cached = self.semantic_cache.lookup(query_embedding, self.artifact_version, k)
+                if cached is not None:
+                    logger.debug("Served %d recommendations from semantic cache", len(cached))
+                    if cache_key is not None:
+                        self.result_cache.put_results(cache_key, cached)
+                    timer.lap('semantic_cache', hit=True)
+                    timer.finish('semantic_cache_hit', k=k, query_length=len(query))
+                    return cached
+                timer.lap('semantic_cache', hit=False)
             
             # Phase 2: Search FAISS index
+            if deadline is not None:
+                deadline.check('search')
             candidates = self._search_faiss_candidates(query_embedding, k)
-            logger.info(f"✓ Retrieved {len(candidates)} candidates from FAISS")
+            timer.lap('search', search_k=self._get_search_k(k), candidates=len(candidates))
             
             # Phase 3: Rank candidates
+            if deadline is not None:
+                deadline.check('rank')
             ranked = self._rank_candidates(candidates)
+            timer.lap('rank')
             
             # Phase 4: Apply diversity
             diverse = self._apply_diversity_filtering(ranked, k)
-            logger.info(f"✓ Applied diversity filtering")
+            timer.lap('diversity')
             
             # Phase 5: Format results
             results = self._format_results(diverse, k)
-            logger.info(f"✓ Formatted {len(results)} final recommendations")
-            logger.info(f"-" * 70 + "\n")
+            timer.lap('format', results=len(results))
             
+            if cache_key is not None:
+                self.result_cache.put_results(cache_key, results)
+            if self._semantic_cache_active():
+                self.semantic_cache.store(query_embedding, self.artifact_version, k, results)
+            timer.lap('cache_store')
+            
+            timer.finish('ok', k=k, query_length=len(query))
             return results
             
+        except DeadlineExceeded:
+            timer.finish('deadline_exceeded')
+            raise
         except Exception as e:
-            logger.error(f"❌ Recommendation error: {e}")
-            import traceback
-            traceback.print_exc()
+            RECOMMENDER_ERRORS.inc('single')
+            timer.finish('error')
+            log_error(logger, "Recommendation error", e)
             return []
     
+    def get_recommendations_batch(self, queries: List[str], k: int = 10,
+                                  deadline: Optional[Deadline] = None) -> List[List[Dict]]:
+        """
+        Get top-k assessment recommendations for many queries at once
+        
+        All valid queries are encoded in one padded batch and searched with a
+        single matrix FAISS call; ranking and diversity filtering then run
+        per result row.
+        
+        Args:
+            queries: Job descriptions or search queries
+            k: Number of recommendations per query (5-10)
+            deadline: Optional request deadline, checked between phases
+        
+        Returns:
+            One list of recommendation dictionaries per query, in input order.
+            A query that fails validation or processing gets an empty list.
+        
+        Raises:
+            DeadlineExceeded: The deadline passed before a phase started
+        """
+        results = [[] for _ in queries]
+        timer = PhaseTimer('batch')
+        if timer.enabled:
+            BATCH_QUERIES.observe(len(queries))
+        
+        try:
+            k = self._validate_k(k)
+        except (ValueError, TypeError) as e:
+            logger.error("❌ Invalid k for batch: %s", e)
+            RECOMMENDER_ERRORS.inc('batch')
+            timer.finish('error')
+            return results
+        
+        # Validate queries individually so one bad entry does not sink the batch,
+        # answering repeats from the result cache
+        positions = []
+        valid_queries = []
+        cache_keys = []
+        for pos, query in enumerate(queries):
+            try:
+                query = self._validate_query(query)
+            except ValueError as e:
+                logger.debug("Skipping query %d: %s", pos + 1, e)
+                continue
+            
+            cache_key = self._result_cache_key(query, k)
+            if cache_key is not None:
+                cached = self.result_cache.get_results(cache_key)
+                if cached is not None:
+                    results[pos] = cached
+                    continue
+            
+            valid_queries.append(query)
+            positions.append(pos)
+            cache_keys.append(cache_key)
+        timer.lap('result_cache', queries=len(queries), misses=len(valid_queries))
+        
+        if not valid_queries:
+            timer.finish('result_cache_hit')
+            return results
+        
+        try:
+            # Phase 1: Encode all queries in one batch
+            if deadline is not None:
+                deadline.check('encode')
+            query_embeddings = self._encode_queries(valid_queries)
+            timer.lap('encode', queries=len(valid_queries))
+            
+            # Reuse results of near-duplicate queries answered earlier
+            use_semantic_cache = self._semantic_cache_active()
+            search_rows = []
+            for row, pos in enumerate(positions):
+                cached = None
+                if use_semantic_cache:
+                    cached = self.semantic_cache.lookup(query_embeddings[row], self.artifact_version, k)
+                
+                if cached is None:
+                    search_rows.append(row)
+                else:
+                    results[pos] = cached
+                    if cache_keys[row] is not None:
+                        self.result_cache.put_results(cache_keys[row], cached)
+            timer.lap('semantic_cache', hits=len(positions) - len(search_rows))
+            
+            if not search_rows:
+                timer.finish('semantic_cache_hit')
+                return results
+            
+            # Phase 2: Single matrix search over the FAISS index
+            if deadline is not None:
+                deadline.check('search')
+            search_k = self._get_search_k(k)
+            distances, indices = self.index.search(query_embeddings[search_rows], search_k)
+            timer.lap('search', search_k=search_k, rows=len(search_rows))
+            
+            # Phases 3-4: FAISS rows are already ranked by score, so diversity
+            # selection runs on the whole result matrix at once
+            selected = select_diverse(
+                self.catalog.type_codes_for(indices), k,
+                n_types=len(self.catalog.type_labels)
+            )
+            timer.lap('diversity')
+            
+            if deadline is not None:
+                deadline.check('format')
+            
+        except DeadlineExceeded:
+            timer.finish('deadline_exceeded')
+            raise
+        except Exception as e:
+            log_error(logger, "Batch recommendation error", e)
+            RECOMMENDER_ERRORS.inc('batch')
+            timer.finish('error')
+            return results
+        
+        # Phase 5: Materialize and format only the selected candidates per row
+        for result_row, row in enumerate(search_rows):
+            pos = positions[row]
+            try:
+                keep = selected[result_row][selected[result_row] >= 0]
+                diverse = self._candidates_from_row(
+                    indices[result_row, keep], distances[result_row, keep]
+                )
+                results[pos] = self._format_results(diverse, k)
+                
+                if cache_keys[row] is not None:
+                    self.result_cache.put_results(cache_keys[row], results[pos])
+                if use_semantic_cache:
+                    self.semantic_cache.store(query_embeddings[row], self.artifact_version, k, results[pos])
+            except Exception as e:
+                log_error(logger, f"Recommendation error for query {pos + 1}", e,
+                          site="Recommendation error for batch query")
+                RECOMMENDER_ERRORS.inc('batch')
+        timer.lap('format', rows=len(search_rows))
+        
+        timer.finish('ok', k=k, queries=len(queries))
+        logger.debug("Processed batch of %d queries (%d computed)", len(queries), len(valid_queries))
+        return results
+    
     def _validate_k(self, k: int) -> int:
         """Validate k parameter"""
         if not isinstance(k, int):
@@ -192,105 +561,119 @@ class AssessmentRecommender:
     
     def _encode_query(self, query: str) -> np.ndarray:
         """Encode query using Sentence-BERT"""
-        logger.debug(f"Encoding query...")
+        return self._encode_queries([query])
+    
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Encode a batch of queries, serving repeats from the embedding cache"""
+        if self.embedding_cache is None:
+            return self._run_encoder(queries)
+        
+        embeddings = np.empty((len(queries), self.index.d), dtype=np.float32)
+        
+        # Collect cache misses, encoding each distinct normalized query once
+        pending = {}
+        for row, query in enumerate(queries):
+            key = self.embedding_cache.make_key(self.model_name, query, self.query_lowercase)
+            cached = self.embedding_cache.get(key)
+            
+            if cached is None:
+                pending.setdefault(key, (query, []))[1].append(row)
+            else:
+                embeddings[row] = cached
+        
+        logger.debug("Embedding cache: %d hits, %d distinct misses",
+                     len(queries) - sum(len(rows) for _, rows in pending.values()), len(pending))
+        
+        if pending:
+            encoded = self._run_encoder([query for query, _ in pending.values()])
+            
+            for (key, (_, rows)), embedding in zip(pending.items(), encoded):
+                embeddings[rows] = embedding
+                self.embedding_cache.put(key, embedding)
+        
+        return embeddings
+    
+    def _run_encoder(self, queries: List[str]) -> np.ndarray:
+        """Run the query encoder on a batch of queries"""
+        logger.debug("Encoding %d queries...", len(queries))
         
-        # Generate embedding
-        embedding = self.model.encode(
-            [query],
+        # Generate embeddings (padded per mini-batch by the encoder)
+        embeddings = self.model.encode(
+            queries,
+            batch_size=self.encode_batch_size,
             normalize_embeddings=True
         )
         
-        logger.debug(f"Query embedding generated: {embedding.shape}")
-        return embedding
+        # FAISS requires contiguous float32 input
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        
+        logger.debug("Query embeddings generated: %s", embeddings.shape)
+        return embeddings
+    
+    def _get_search_k(self, k: int) -> int:
+        """Number of FAISS candidates to retrieve for k final results"""
+        # Retrieve more candidates for better filtering
+        return min(len(self.catalog), max(k * 3, 15))
     
-    def _search_faiss_candidates(self, query_emb: np.ndarray, k: int) -> List[Dict]:
+    def _search_faiss_candidates(self, query_emb: np.ndarray, k: int) -> List[Candidate]:
         """Search FAISS index for similar assessments"""
         
-        # Retrieve more candidates for better filtering
-        search_k = min(len(self.metadata), max(k * 3, 15))
+        search_k = self._get_search_k(k)
         
-        logger.debug(f"Searching FAISS index for top {search_k} candidates...")
+        logger.debug("Searching FAISS index for top %d candidates...", search_k)
         
         # FAISS search
         distances, indices = self.index.search(query_emb, search_k)
         
-        # Convert to candidate objects
-        candidates = []
-        for idx, score in zip(indices[0], distances[0]):
-            if 0 <= idx < len(self.metadata):
-                assessment = self.metadata.iloc[idx]
-                
-                candidates.append({
-                    'idx': int(idx),
-                    'name': str(assessment['name']),
-                    'url': str(assessment['url']),
-                    'test_type': str(assessment['test_type']),
-                    'duration': int(assessment['duration']),
-                    'base_score': float(score),
-                    'final_score': float(score)
-                })
-        
-        logger.debug(f"Retrieved {len(candidates)} candidates")
+        candidates = self._candidates_from_row(indices[0], distances[0])
+        
+        logger.debug("Retrieved %d candidates", len(candidates))
         return candidates
     
-    def _rank_candidates(self, candidates: List[Dict]) -> List[Dict]:
+    def _candidates_from_row(self, indices: np.ndarray, distances: np.ndarray) -> List[Candidate]:
+        """Convert one row of FAISS results to candidate objects"""
+        return self.catalog.gather(indices, distances)
+    
+    def _rank_candidates(self, candidates: List[Candidate]) -> List[Candidate]:
         """Rank candidates by relevance"""
-        logger.debug(f"Ranking {len(candidates)} candidates...")
+        logger.debug("Ranking %d candidates...", len(candidates))
         
         # Score is already from FAISS (cosine similarity for normalized vectors)
         # Scores are in [0, 1] range where 1 is perfect match
         
         # Sort by score (descending)
-        candidates.sort(key=lambda x: x['base_score'], reverse=True)
+        candidates.sort(key=lambda x: x.base_score, reverse=True)
         
-        logger.debug(f"Top 3 candidates ranked:")
-        for i, c in enumerate(candidates[:3]):
-            logger.debug(f"  {i+1}. {c['name']} (score: {c['base_score']:.4f})")
+        if logger.isEnabledFor(logging.DEBUG):
+            for i, c in enumerate(candidates[:3]):
+                logger.debug("  %d. %s (score: %.4f)", i + 1, c.name, c.base_score)
         
         return candidates
     
-    def _apply_diversity_filtering(self, candidates: List[Dict], k: int) -> List[Dict]:
+    def _apply_diversity_filtering(self, candidates: List[Candidate], k: int) -> List[Candidate]:
         """Apply diversity constraint to prevent type clustering"""
-        logger.debug(f"Applying diversity filtering...")
+        logger.debug("Applying diversity filtering...")
         
-        type_counts = {}
-        max_per_type = max(2, int(k * 0.4))  # Max 40% from single type
-        
-        diverse_results = []
-        
-        # First pass: select up to max_per_type from each category
-        for candidate in candidates:
-            test_type = candidate['test_type']
-            
-            if type_counts.get(test_type, 0) < max_per_type:
-                diverse_results.append(candidate)
-                type_counts[test_type] = type_counts.get(test_type, 0) + 1
-            
-            if len(diverse_results) >= k:
-                break
-        
-        # Fill remaining slots with highest-scoring candidates
-        if len(diverse_results) < k:
-            for candidate in candidates:
-                if candidate not in diverse_results:
-                    diverse_results.append(candidate)
-                    if len(diverse_results) >= k:
-                        break
+        type_codes = np.fromiter(
+            (candidate.type_code for candidate in candidates),
+            dtype=np.int32,
+            count=len(candidates)
+        )
+        selected = select_diverse(type_codes, k, n_types=len(self.catalog.type_labels))
         
-        logger.debug(f"Diversity distribution: {type_counts}")
-        return diverse_results[:k]
+        return [candidates[pos] for pos in selected if pos >= 0]
     
-    def _format_results(self, candidates: List[Dict], k: int) -> List[Dict]:
+    def _format_results(self, candidates: List[Candidate], k: int) -> List[Dict]:
         """Format final results"""
         results = []
         
         for rank, candidate in enumerate(candidates[:k], 1):
             results.append({
-                'name': candidate['name'],
-                'url': candidate['url'],
-                'test_type': candidate['test_type'],
-                'duration': candidate['duration'],
-                'relevance_score': round(candidate['base_score'], 4)
+                'name': candidate.name,
+                'url': candidate.url,
+                'test_type': candidate.test_type,
+                'duration': candidate.duration,
+                'relevance_score': round(candidate.base_score, 4)
             })
         
         return results
@@ -0,0 +1,231 @@
+"""
+V2.0 Artifact Hot Reload
+Loads a new artifact bundle into a second recommender in the background,
+warms it up and swaps it in while in-flight requests finish on the old one
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from artifacts import current_artifact_version
+from recommender import AssessmentRecommender
+
+logger = logging.getLogger(__name__)
+
+# Representative queries run against a freshly loaded recommender before it
+# takes traffic (faults in index pages and exercises the full pipeline)
+WARMUP_QUERIES = (
+    "Java developer who can collaborate with business teams",
+    "Entry level sales role with strong communication skills",
+    "Data analyst with SQL, Python and numerical reasoning",
+    "Leadership and personality assessment for managers",
+    "Customer service representative with English comprehension",
+)
+
+# Reload request shared by all workers serving ARTIFACT_DIR; watchers reload
+# whenever its token changes, so an admin reload reaches every worker
+RELOAD_REQUEST_FILE = 'RELOAD_REQUEST'
+
+class ArtifactReloader:
+    """
+    Swaps the serving recommender for one built from newer artifacts
+
+    The serving instance is owned by the caller and accessed through
+    get_engine/set_engine; handlers should read it once per request so a
+    swap never changes the instance underneath a request.
+
+    A reload only swaps the instance of its own process. With several
+    workers, request_reload() publishes the request to the others, whose
+    watchers pick it up within one polling interval.
+    """
+
+    def __init__(self, data_dir: str, get_engine: Callable[[], Optional[AssessmentRecommender]],
+                 set_engine: Callable[[AssessmentRecommender], None]):
+        self.data_dir = data_dir
+        self.get_engine = get_engine
+        self.set_engine = set_engine
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+        # Requests made before this process started are not replayed
+        self._seen_request = self._read_request().get('token')
+        self._status = {
+            'state': 'idle',
+            'loaded_version': None,
+            'last_reload_at': None,
+            'last_duration_s': None,
+            'last_error': None,
+            'reloads': 0,
+            'failures': 0
+        }
+
+    def status(self) -> Dict:
+        """Current reload state and counters"""
+        status = dict(self._status)
+        engine = self.get_engine()
+        status['loaded_version'] = engine.artifact_version if engine is not None else None
+        status['watching'] = self._watcher is not None and self._watcher.is_alive()
+        status['pid'] = os.getpid()
+        return status
+
+    def reload(self, force: bool = False) -> Dict:
+        """
+        Load the current artifacts and swap them in if they are new
+
+        Runs synchronously; concurrent calls wait for the running reload
+        rather than loading twice. A failed load leaves the serving
+        recommender untouched.
+        """
+        with self._lock:
+            return self._reload(force)
+
+    def reload_async(self, force: bool = False) -> bool:
+        """Start a reload on a background thread; False if one is already running"""
+        # Taken here and released by the thread, so two callers cannot both start one
+        if not self._lock.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                self._reload(force)
+            finally:
+                self._lock.release()
+
+        try:
+            threading.Thread(target=run, name='artifact-reload', daemon=True).start()
+        except Exception:
+            self._lock.release()
+            raise
+        return True
+
+    def request_reload(self, force: bool = False) -> bool:
+        """
+        Ask the other workers to reload, through RELOAD_REQUEST_FILE
+
+        The caller reloads its own process. Returns False if the request
+        could not be written.
+        """
+        token = uuid.uuid4().hex
+        request = {'token': token, 'force': force, 'pid': os.getpid(),
+                   'requested_at': datetime.now().isoformat()}
+        path = os.path.join(self.data_dir, RELOAD_REQUEST_FILE)
+        staging = f'{path}.{os.getpid()}.tmp'
+
+        try:
+            with open(staging, 'w') as f:
+                json.dump(request, f)
+            os.replace(staging, path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not publish reload request to other workers: {e}")
+            return False
+
+        self._seen_request = token
+        return True
+
+    def start_watcher(self, interval_seconds: float, follow_versions: bool = True) -> None:
+        """
+        Poll the artifact directory and reload on reload requests of other
+        workers and, with follow_versions, whenever a new version appears
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+
+        def watch():
+            while not self._stop.wait(interval_seconds):
+                engine = self.get_engine()
+                try:
+                    request = self._read_request()
+                    if request.get('token') not in (None, self._seen_request):
+                        self._seen_request = request['token']
+                        logger.info(f"🔄 Reload requested by worker {request.get('pid')}")
+                        self.reload(force=bool(request.get('force')))
+                    elif follow_versions and (
+                            engine is None or current_artifact_version(self.data_dir) != engine.artifact_version):
+                        self.reload()
+                except Exception as e:
+                    logger.error(f"❌ Artifact watcher error: {e}")
+
+        self._stop.clear()
+        self._watcher = threading.Thread(target=watch, name='artifact-watcher', daemon=True)
+        self._watcher.start()
+        watched = 'new artifacts and reload requests' if follow_versions else 'reload requests'
+        logger.info(f"👀 Watching {self.data_dir} for {watched} every {interval_seconds}s")
+
+    def stop_watcher(self) -> None:
+        """Stop the polling thread"""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _reload(self, force: bool) -> Dict:
+        """Body of reload(); the caller holds self._lock"""
+        engine = self.get_engine()
+        version = current_artifact_version(self.data_dir)
+
+        if engine is not None and version == engine.artifact_version and not force:
+            return {'reloaded': False, 'version': version, 'reason': 'already loaded'}
+
+        self._status['state'] = 'loading'
+        start = time.perf_counter()
+        logger.info(f"🔄 Loading artifact version {version} in the background...")
+
+        try:
+            candidate = self._load(engine)
+            self._warm_up(candidate)
+        except Exception as e:
+            self._status.update(state='failed', last_error=str(e))
+            self._status['failures'] += 1
+            logger.error(f"❌ Reload of {version} failed, keeping current artifacts: {e}")
+            return {'reloaded': False, 'version': version, 'error': str(e)}
+
+        # Single reference assignment: new requests see the new instance,
+        # in-flight ones finish on the instance they already hold
+        self.set_engine(candidate)
+
+        duration = time.perf_counter() - start
+        self._status.update(
+            state='idle',
+            last_reload_at=datetime.now().isoformat(),
+            last_duration_s=round(duration, 3),
+            last_error=None
+        )
+        self._status['reloads'] += 1
+        logger.info(f"✅ Swapped to artifact version {candidate.artifact_version} ({duration:.2f}s)")
+
+        return {'reloaded': True, 'version': candidate.artifact_version,
+                'duration_s': round(duration, 3)}
+
+    def _read_request(self) -> Dict:
+        """The current reload request, or {} if there is none"""
+        try:
+            with open(os.path.join(self.data_dir, RELOAD_REQUEST_FILE)) as f:
+                request = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return request if isinstance(request, dict) else {}
+
+    def _load(self, engine: Optional[AssessmentRecommender]) -> AssessmentRecommender:
+        """Build a recommender for the current artifacts, reusing the loaded encoder"""
+        if engine is None:
+            return AssessmentRecommender(self.data_dir)
+
+        # Query embeddings depend only on the encoder, so the cache carries over
+        return AssessmentRecommender(
+            self.data_dir,
+            encode_batch_size=engine.encode_batch_size,
+            embedding_cache=engine.embedding_cache,
+            encoder=engine.model
+        )
+
+    def _warm_up(self, candidate: AssessmentRecommender) -> None:
+        """Run representative queries; an empty result means the load is unusable"""
+        results = candidate.get_recommendations_batch(list(WARMUP_QUERIES), k=10)
+        if not any(results):
+            raise RuntimeError("Warm-up queries returned no recommendations")
@@ -6,6 +6,8 @@ Calculates Recall@K and MAP@K metrics on training ground truth
 import pandas as pd
 import numpy as np
 from recommender import AssessmentRecommender
+from dataset import load_sheet
+from log_config import log_error
 import json
 import os
 import logging
@@ -30,7 +32,7 @@ class RecommendationEvaluator:
         self.recommender = recommender
         
         logger.info("\n📊 Loading ground truth training data...")
-        self.train_df = pd.read_excel(train_file, sheet_name='Train-Set')
+        self.train_df = load_sheet(train_file, 'Train-Set')
         
         # Build ground truth mapping: query -> set of relevant assessment URLs
         self.ground_truth = {}
@@ -101,9 +103,12 @@ class RecommendationEvaluator:
         
         total_queries = len(self.ground_truth)
         
+        # Get recommendations for all queries in one batched pass
+        queries = list(self.ground_truth.keys())
+        all_recommendations = self.recommender.get_recommendations_batch(queries, k=k)
+        
         for query_idx, (query, relevant_urls) in enumerate(self.ground_truth.items(), 1):
-            # Get recommendations
-            recommendations = self.recommender.get_recommendations(query, k=k)
+            recommendations = all_recommendations[query_idx - 1]
             predicted_urls = [rec['url'] for rec in recommendations]
             
             # Calculate metrics
@@ -206,6 +211,4 @@ if __name__ == "__main__":
         logger.info("="*70 + "\n")
         
     except Exception as e:
-        logger.error(f"Evaluation failed: {e}")
-        import traceback
-        traceback.print_exc()
+        log_error(logger, "Evaluation failed", e)
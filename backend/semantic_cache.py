@@ -0,0 +1,150 @@
+"""
+V2.0 Semantic Result Cache
+Reuses recommendations for queries that are near-duplicates of earlier ones
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import faiss
+
+# Upper edges of the similarity histogram buckets (last bucket is <= 1.0)
+SIMILARITY_BUCKETS = (0.5, 0.8, 0.9, 0.95, 0.97, 0.98, 0.99, 1.0)
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache over previously answered query embeddings
+
+    Embeddings are normalized, so inner product is cosine similarity. An
+    entry is reused only for the same k and artifact version.
+    """
+
+    def __init__(self, dimension: int, threshold: float = 0.97,
+                 max_entries: int = 5000, search_width: int = 8):
+        """
+        Args:
+            dimension: Query embedding dimension
+            threshold: Minimum cosine similarity for a cache hit
+            max_entries: Maximum number of cached queries
+            search_width: Neighbours inspected per lookup (to skip entries
+                cached for another k or artifact version)
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.search_width = search_width
+
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+        # id -> (artifact_version, k, results), oldest first
+        self._entries: 'OrderedDict[int, Tuple[str, int, Tuple[Dict, ...]]]' = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+        self.replacements = 0
+        self.similarity_sum = 0.0
+        self.similarity_counts = [0] * len(SIMILARITY_BUCKETS)
+
+    def lookup(self, embedding: np.ndarray, artifact_version: str, k: int) -> Optional[List[Dict]]:
+        """Return cached results of the closest matching query, or None"""
+        query = np.ascontiguousarray(embedding, dtype=np.float32).reshape(1, -1)
+
+        with self._lock:
+            self.lookups += 1
+
+            best = self._nearest(query, artifact_version, k)
+            if best is None:
+                return None
+
+            similarity, entry_id = best
+            self._record_similarity(similarity)
+
+            if similarity < self.threshold:
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(entry_id)
+            return [dict(result) for result in self._entries[entry_id][2]]
+
+    def store(self, embedding: np.ndarray, artifact_version: str, k: int,
+              results: List[Dict]) -> None:
+        """
+        Cache results for a query embedding, evicting the oldest entries if full
+
+        If an entry for the same k and artifact version is already within
+        the threshold (e.g. after concurrent misses on one query), its
+        results are replaced instead of adding a near-duplicate vector.
+        """
+        if self.max_entries <= 0:
+            return
+
+        vector = np.ascontiguousarray(embedding, dtype=np.float32).reshape(1, -1)
+
+        with self._lock:
+            nearest = self._nearest(vector, artifact_version, k)
+            if nearest is not None and nearest[0] >= self.threshold:
+                entry_id = nearest[1]
+                self._entries[entry_id] = (artifact_version, k, tuple(dict(r) for r in results))
+                self._entries.move_to_end(entry_id)
+                self.replacements += 1
+                return
+
+            entry_id = self._next_id
+            self._next_id += 1
+
+            self.index.add_with_ids(vector, np.array([entry_id], dtype=np.int64))
+            self._entries[entry_id] = (artifact_version, k, tuple(dict(r) for r in results))
+
+            if len(self._entries) > self.max_entries:
+                # Evict in chunks: removal compacts the flat index, so amortize it
+                evict_count = max(1, self.max_entries // 10)
+                evicted = [self._entries.popitem(last=False)[0] for _ in range(evict_count)]
+                self.index.remove_ids(np.array(evicted, dtype=np.int64))
+                self.evictions += len(evicted)
+
+    def _nearest(self, query: np.ndarray, artifact_version: str, k: int) -> Optional[Tuple[float, int]]:
+        """(similarity, id) of the closest entry for the same k and artifact version; caller holds the lock"""
+        if self.index.ntotal == 0:
+            return None
+
+        similarities, ids = self.index.search(query, min(self.search_width, self.index.ntotal))
+        for similarity, entry_id in zip(similarities[0], ids[0]):
+            entry = self._entries.get(int(entry_id))
+            if entry is not None and entry[0] == artifact_version and entry[1] == k:
+                return float(similarity), int(entry_id)
+        return None
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self.index.reset()
+            self._entries.clear()
+
+    def _record_similarity(self, similarity: float) -> None:
+        """Add a best-match similarity to the histogram; caller holds the lock"""
+        self.similarity_sum += similarity
+        for bucket, upper in enumerate(SIMILARITY_BUCKETS):
+            if similarity <= upper or bucket == len(SIMILARITY_BUCKETS) - 1:
+                self.similarity_counts[bucket] += 1
+                break
+
+    def stats(self) -> Dict:
+        """Return hit rate and best-match similarity distribution"""
+        with self._lock:
+            observed = sum(self.similarity_counts)
+            return {
+                'entries': len(self._entries),
+                'threshold': self.threshold,
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'evictions': self.evictions,
+                'replacements': self.replacements,
+                'hit_rate': round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+                'mean_similarity': round(self.similarity_sum / observed, 4) if observed else None,
+                'similarity_histogram': {
+                    f'le_{upper}': count
+                    for upper, count in zip(SIMILARITY_BUCKETS, self.similarity_counts)
+                }
+            }
@@ -0,0 +1,159 @@
+"""
+V2.0 CPU Thread Budget
+Splits the machine's cores across server workers and their request
+threads and sets torch, FAISS OpenMP, BLAS and ONNX Runtime thread counts
+per worker, so several workers on one host do not oversubscribe the CPU
+"""
+
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+import faiss
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Environment read by OpenMP/BLAS runtimes that have not been loaded yet
+BLAS_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS',
+                 'BLIS_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+_lock = threading.Lock()
+_applied: Optional[Dict] = None
+
+def available_cores() -> int:
+    """CPUs this process may use: affinity mask, capped by a cgroup v2 CPU quota"""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+
+    # Containers: cpu.max holds "<quota> <period>" or "max <period>"
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cores = min(cores, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+
+    return max(1, cores)
+
+def resolve_thread_budget() -> Dict:
+    """
+    Thread counts for this worker process
+
+    Cores (THREAD_BUDGET_CORES, else detected) are divided evenly between
+    WEB_CONCURRENCY workers, and a worker's share between its
+    REQUEST_THREADS: each request thread that encodes or searches starts
+    its own torch/FAISS OpenMP/BLAS team, so those get the per-request
+    share. An ONNX Runtime session has one intra-op pool for all its
+    callers and gets the per-worker share. Library overrides win.
+    """
+    cores = config.THREAD_BUDGET_CORES or available_cores()
+    workers = max(1, config.WEB_CONCURRENCY or 1)
+    request_threads = max(1, config.REQUEST_THREADS or 1)
+    per_worker = max(1, cores // workers)
+    per_request = max(1, per_worker // request_threads)
+
+    return {
+        'cores': cores,
+        'workers': workers,
+        'request_threads': request_threads,
+        'per_worker': per_worker,
+        'per_request': per_request,
+        'torch_intra_op': config.TORCH_NUM_THREADS or per_request,
+        'torch_inter_op': config.TORCH_INTEROP_THREADS or 1,
+        'faiss_omp': config.FAISS_OMP_THREADS or per_request,
+        'blas': config.BLAS_NUM_THREADS or per_request,
+        'onnx_intra_op': config.ONNX_INTRA_OP_THREADS or per_worker
+    }
+
+def apply_thread_budget() -> Dict:
+    """
+    Apply the budget once per process and return the effective values
+
+    Later calls in the same process (e.g. a hot-reloaded recommender)
+    return the values applied first; a forked worker applies them again
+    (see current_thread_budget). torch is only configured when the torch
+    encoder backend is used.
+    """
+    global _applied
+
+    with _lock:
+        if _applied is not None and _applied['pid'] == os.getpid():
+            return _applied
+
+        budget = resolve_thread_budget()
+
+        for name in BLAS_ENV_VARS:
+            os.environ[name] = str(budget['blas'])
+
+        faiss.omp_set_num_threads(budget['faiss_omp'])
+
+        effective = {
+            'pid': os.getpid(),
+            'cores': budget['cores'],
+            'workers': budget['workers'],
+            'request_threads': budget['request_threads'],
+            'per_worker': budget['per_worker'],
+            'per_request': budget['per_request'],
+            'faiss_omp': faiss.omp_get_max_threads(),
+            'blas': _apply_blas_limit(budget['blas']),
+            'onnx_intra_op': budget['onnx_intra_op'],
+            'torch_intra_op': None,
+            'torch_inter_op': None
+        }
+
+        if config.ENCODER_BACKEND == 'torch':
+            effective.update(_apply_torch_threads(budget['torch_intra_op'], budget['torch_inter_op']))
+
+        _applied = effective
+        logger.info(f"🧵 Thread budget: {budget['cores']} cores / {budget['workers']} workers "
+                    f"x {budget['request_threads']} request threads → "
+                    f"faiss={effective['faiss_omp']} torch={effective['torch_intra_op']} "
+                    f"blas={effective['blas']} onnx={effective['onnx_intra_op']}")
+        return effective
+
+def current_thread_budget() -> Optional[Dict]:
+    """
+    Values in effect in this process, or None if no budget was applied
+
+    A forked worker whose parent had applied the budget (gunicorn
+    preload_app loads the recommender in the master) applies it again for
+    its own pid: it inherits the values, not the torch and OpenMP pools.
+    """
+    if _applied is None:
+        return None
+    return apply_thread_budget()
+
+def _apply_blas_limit(threads: int) -> Optional[int]:
+    """Limit already-loaded BLAS pools (threadpoolctl); env vars cover later loads"""
+    try:
+        from threadpoolctl import threadpool_info, threadpool_limits
+    except ImportError:
+        return None
+
+    threadpool_limits(limits=threads, user_api='blas')
+    blas_pools = [pool['num_threads'] for pool in threadpool_info() if pool['user_api'] == 'blas']
+    return max(blas_pools) if blas_pools else threads
+
+def _apply_torch_threads(intra_op: int, inter_op: int) -> Dict:
+    """Set torch intra/inter-op pools; inter-op can only be set before first use"""
+    try:
+        import torch
+    except ImportError:
+        return {}
+
+    torch.set_num_threads(intra_op)
+    try:
+        torch.set_num_interop_threads(inter_op)
+    except RuntimeError:
+        pass
+
+    return {
+        'torch_intra_op': torch.get_num_threads(),
+        'torch_inter_op': torch.get_num_interop_threads()
+    }
@@ -0,0 +1,210 @@
+"""
+V2.0 Request Tracing
+Sampled per-request spans (HTTP handler, admission wait, recommender
+phases) written to a rotating file in the Chrome trace event format, which
+chrome://tracing and Perfetto (ui.perfetto.dev) open directly
+"""
+
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Request header forcing a trace ("1", "true"); the trace id is echoed back
+TRACE_HEADER = 'X-Trace'
+TRACE_ID_HEADER = 'X-Trace-Id'
+
+_current: contextvars.ContextVar = contextvars.ContextVar('trace', default=None)
+
+def _epoch_us() -> float:
+    """Wall-clock microseconds, so traces from several workers line up"""
+    return time.time_ns() / 1000
+
+class Trace:
+    """Spans of one sampled request, written out together by finish()"""
+
+    __slots__ = ('trace_id', 'name', 'started_us', 'attrs', 'events', 'pid', 'tid', '_finished', '_writer')
+
+    def __init__(self, name: str, writer: 'TraceWriter'):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.started_us = _epoch_us()
+        self.attrs: Dict = {}
+        self.events: List[Dict] = []
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+        self._finished = False
+        self._writer = writer
+
+    def set(self, **attrs) -> None:
+        """Attach attributes to the request (root) span"""
+        self.attrs.update(attrs)
+
+    def add_span(self, name: str, start_us: float, duration_us: float, **attrs) -> None:
+        """Record a completed span that ran on the calling thread"""
+        self.events.append({
+            'name': name,
+            'cat': 'recommender',
+            'ph': 'X',
+            'ts': round(start_us, 1),
+            'dur': round(duration_us, 1),
+            'pid': self.pid,
+            'tid': threading.get_ident(),
+            'args': {'trace_id': self.trace_id, **attrs}
+        })
+
+    def span(self, name: str, **attrs) -> '_Span':
+        """Context manager timing a block as a span"""
+        return _Span(self, name, attrs)
+
+    def finish(self) -> None:
+        """Close the root span and hand all spans to the writer (idempotent)"""
+        if self._finished:
+            return
+        self._finished = True
+
+        root = {
+            'name': self.name,
+            'cat': 'http',
+            'ph': 'X',
+            'ts': round(self.started_us, 1),
+            'dur': round(_epoch_us() - self.started_us, 1),
+            'pid': self.pid,
+            'tid': self.tid,
+            'args': {'trace_id': self.trace_id, **self.attrs}
+        }
+        self._writer.write([root] + self.events)
+
+class _Span:
+    """Times a with-block and records it on the trace"""
+
+    __slots__ = ('trace', 'name', 'attrs', 'started_us')
+
+    def __init__(self, trace: Trace, name: str, attrs: Dict):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self) -> '_Span':
+        self.started_us = _epoch_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.trace.add_span(self.name, self.started_us, _epoch_us() - self.started_us, **self.attrs)
+
+class TraceWriter:
+    """
+    Append trace events to a size-rotated file per process
+
+    Each process writes its own file, path with its pid before the
+    extension (traces.json -> traces-<pid>.json), so gunicorn workers never
+    append to or rotate a file another process has open. Each file is a
+    Chrome trace "JSON Array Format" document: a "[" line, then one event
+    per line followed by a comma. The closing bracket is optional in that
+    format, so files are valid to open at any time.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024, backup_count: int = 3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        self._pid = None
+
+    def process_path(self, pid: Optional[int] = None) -> str:
+        """File written by process pid (default: this process)"""
+        stem, extension = os.path.splitext(self.path)
+        return f'{stem}-{pid or os.getpid()}{extension}'
+
+    def write(self, events: List[Dict]) -> None:
+        """Write one trace's events (errors are logged, never raised to the request)"""
+        data = ''.join(json.dumps(event, default=str) + ',\n' for event in events)
+
+        with self._lock:
+            try:
+                self._ensure_open()
+                if self._size + len(data) > self.max_bytes and self._size > 2:
+                    self._rotate()
+                self._file.write(data)
+                self._file.flush()
+                self._size += len(data)
+            except OSError as e:
+                logger.warning(f"⚠️ Could not write trace to {self.process_path()}: {e}")
+
+    def _ensure_open(self) -> None:
+        """Open this process's file once (a forked worker opens its own)"""
+        if self._file is not None and self._pid == os.getpid():
+            return
+
+        path = self.process_path()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._pid = os.getpid()
+        self._size = self._file.tell()
+        if self._size == 0:
+            self._file.write('[\n')
+            self._size = 2
+
+    def _rotate(self) -> None:
+        """Shift path.1 .. path.N of this process's file and start a new one"""
+        path = self.process_path()
+        self._file.close()
+        self._file = None
+
+        for n in range(self.backup_count - 1, 0, -1):
+            source = f'{path}.{n}'
+            if os.path.exists(source):
+                os.replace(source, f'{path}.{n + 1}')
+        if self.backup_count > 0:
+            os.replace(path, f'{path}.1')
+        else:
+            os.remove(path)
+
+        self._ensure_open()
+
+_writer = TraceWriter(config.TRACE_FILE, config.TRACE_MAX_BYTES, config.TRACE_BACKUP_COUNT)
+
+def should_sample(header_value: Optional[str] = None) -> bool:
+    """Forced by a truthy X-Trace header, else sampled at TRACE_SAMPLE_RATE"""
+    if header_value is not None and header_value.strip().lower() in ('1', 'true', 'yes', 'on'):
+        return True
+    rate = config.TRACE_SAMPLE_RATE
+    return rate > 0 and (rate >= 1 or random.random() < rate)
+
+def start_trace(name: str, header_value: Optional[str] = None) -> Optional[Trace]:
+    """
+    Begin a trace for the current request if it is sampled
+
+    The trace (or None) becomes the current trace of this thread or task,
+    replacing whatever an earlier request on the same thread left behind.
+    """
+    trace = Trace(name, _writer) if should_sample(header_value) else None
+    _current.set(trace)
+    return trace
+
+def clear_trace() -> None:
+    """Mark the current request as untraced"""
+    _current.set(None)
+
+def current_trace() -> Optional[Trace]:
+    """Trace of the request being handled, or None when it is not sampled"""
+    return _current.get()
+
+def span(name: str, **attrs):
+    """Time a block as a span of the current trace (no-op when untraced)"""
+    trace = _current.get()
+    return trace.span(name, **attrs) if trace is not None else contextlib.nullcontext()
@@ -0,0 +1,183 @@
+"""
+V2.0 FAISS Search Parameter Autotuner
+Sweeps nprobe / efSearch, measures Recall@k against exact search and the
+ground truth labels plus search latency, and saves the fastest setting
+that meets the recall floor into index_params.json of a newly published
+bundle
+"""
+
+import argparse
+import time
+import logging
+from datetime import datetime
+from typing import Dict, List
+import numpy as np
+import faiss
+
+from catalog import CatalogStore
+from recommender import AssessmentRecommender
+from run_evaluation import RecommendationEvaluator
+from artifacts import publish_index_params
+from index_builder import apply_search_params, parse_index_spec
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+NPROBE_GRID = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+EF_SEARCH_GRID = (16, 24, 32, 48, 64, 96, 128, 192, 256, 384, 512)
+
+def candidate_settings(index: faiss.Index, index_spec: str, k: int) -> List[Dict]:
+    """Search parameter settings to sweep for the given index family"""
+    family, _ = parse_index_spec(index_spec)
+
+    if family == 'ivf':
+        nlist = faiss.extract_index_ivf(index).nlist
+        return [{'nprobe': nprobe} for nprobe in NPROBE_GRID if nprobe <= nlist]
+
+    if family == 'hnsw':
+        return [{'efSearch': ef} for ef in EF_SEARCH_GRID if ef >= k]
+
+    return []
+
+def measure_setting(index: faiss.Index, settings: Dict, query_embeddings: np.ndarray,
+                    exact_ids: np.ndarray, labels: List[set], catalog: CatalogStore,
+                    k: int, repeats: int) -> Dict:
+    """Recall against exact search and labels, plus per-query search latency"""
+    apply_search_params(index, settings)
+
+    _, approx_ids = index.search(query_embeddings, k)
+    # exact_ids are row positions; incrementally updated bundles search by item id
+    approx_ids = catalog.rows_for(approx_ids)
+    urls = catalog.urls
+
+    recall_exact = np.mean([
+        len(set(approx[approx >= 0]) & set(exact[exact >= 0])) / max(1, int((exact >= 0).sum()))
+        for approx, exact in zip(approx_ids, exact_ids)
+    ])
+    recall_labels = np.mean([
+        len({urls[idx] for idx in approx if idx >= 0} & relevant) / len(relevant)
+        for approx, relevant in zip(approx_ids, labels) if relevant
+    ])
+
+    # Single-query latency, as seen on the request path
+    latencies = []
+    for _ in range(repeats):
+        for row in range(len(query_embeddings)):
+            start = time.perf_counter()
+            index.search(query_embeddings[row:row + 1], k)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'search_params': settings,
+        f'recall@{k}_vs_exact': round(float(recall_exact), 4),
+        f'recall@{k}_vs_labels': round(float(recall_labels), 4),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 4),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 4)
+    }
+
+def pareto_front(results: List[Dict], recall_key: str) -> List[Dict]:
+    """Settings not beaten on both recall and p50 latency by another setting"""
+    front = []
+    for result in results:
+        dominated = any(
+            other[recall_key] >= result[recall_key] and other['p50_ms'] <= result['p50_ms']
+            and (other[recall_key] > result[recall_key] or other['p50_ms'] < result['p50_ms'])
+            for other in results
+        )
+        if not dominated:
+            front.append(result)
+    return sorted(front, key=lambda r: r['p50_ms'])
+
+def tune(data_dir: str, dataset_file: str, k: int, recall_floor: float,
+         label_recall_floor: float, repeats: int) -> bool:
+    """Run the sweep and persist the chosen setting; returns False if none qualifies"""
+    recommender = AssessmentRecommender(data_dir)
+    evaluator = RecommendationEvaluator(dataset_file, recommender)
+
+    index = recommender.index
+    index_spec = recommender.index_params['index_spec']
+    settings = candidate_settings(index, index_spec, k)
+
+    if not settings:
+        logger.info(f"✅ {index_spec} index performs exact search, nothing to tune")
+        return True
+
+    queries = list(evaluator.ground_truth.keys())
+    labels = [evaluator.ground_truth[query] for query in queries]
+    query_embeddings = recommender._encode_queries(queries)
+
+    # Exact reference results over the same vectors
+    exact_index = faiss.IndexFlatIP(index.d)
+    exact_index.add(np.ascontiguousarray(recommender.embeddings, dtype=np.float32))
+    _, exact_ids = exact_index.search(query_embeddings, k)
+
+    logger.info(f"\n🔧 Sweeping {len(settings)} settings for {index_spec} "
+                f"({len(queries)} queries x {repeats} repeats)")
+
+    recall_key = f'recall@{k}_vs_exact'
+    label_key = f'recall@{k}_vs_labels'
+    results = []
+    for setting in settings:
+        result = measure_setting(index, setting, query_embeddings, exact_ids, labels,
+                                 recommender.catalog, k, repeats)
+        results.append(result)
+        logger.info(f"   ├─ {setting}: {recall_key}={result[recall_key]:.4f} "
+                    f"{label_key}={result[label_key]:.4f} "
+                    f"p50={result['p50_ms']:.3f}ms p99={result['p99_ms']:.3f}ms")
+
+    front = pareto_front(results, recall_key)
+    eligible = [
+        r for r in front
+        if r[recall_key] >= recall_floor and r[label_key] >= label_recall_floor
+    ]
+
+    if not eligible:
+        logger.error(f"❌ No setting reaches {recall_key} >= {recall_floor} "
+                     f"and {label_key} >= {label_recall_floor}; index_params.json unchanged")
+        return False
+
+    chosen = min(eligible, key=lambda r: (r['p50_ms'], -r[recall_key]))
+
+    index_params = dict(recommender.index_params)
+    index_params['search_params'] = chosen['search_params']
+    index_params['tuning'] = {
+        'tuned_at': datetime.now().isoformat(),
+        'k': k,
+        'recall_floor': recall_floor,
+        'label_recall_floor': label_recall_floor,
+        'queries': len(queries),
+        'chosen': chosen,
+        'pareto_front': front
+    }
+    logger.info(f"\n✅ Chosen {chosen['search_params']} "
+                f"({recall_key}={chosen[recall_key]:.4f}, p50={chosen['p50_ms']:.3f}ms)")
+
+    # The loaded bundle is immutable: publish the params as a new version
+    bundle_dir = publish_index_params(data_dir, index_params)
+    logger.info(f"💾 Saved to: {bundle_dir}")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune FAISS search parameters")
+    parser.add_argument('--data-dir', default='../data/processed', help="Processed artifacts directory")
+    parser.add_argument('--dataset', default='../data/Gen_AI-Dataset.xlsx', help="Dataset with Train-Set labels")
+    parser.add_argument('--k', type=int, default=10, help="Recall cut-off")
+    parser.add_argument('--recall-floor', type=float, default=0.95,
+                        help="Minimum Recall@k against exact search")
+    parser.add_argument('--label-recall-floor', type=float, default=0.0,
+                        help="Minimum Recall@k against ground truth labels")
+    parser.add_argument('--repeats', type=int, default=20, help="Latency measurement repeats per query")
+    args = parser.parse_args()
+
+    logger.info("\n" + "="*70)
+    logger.info("V2.0 INDEX PARAMETER AUTOTUNER")
+    logger.info("="*70)
+
+    ok = tune(args.data_dir, args.dataset, args.k, args.recall_floor,
+              args.label_recall_floor, args.repeats)
+    if not ok:
+        raise SystemExit(1)
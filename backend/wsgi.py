@@ -0,0 +1,12 @@
+"""
+V2.0 WSGI Entry Point
+Production entry for gunicorn: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from app import app, initialize_recommender
+
+# app.py only loads the recommender under __main__; do it at import here.
+# The artifact watcher thread is started per worker by gunicorn.conf.py,
+# since threads started before a fork do not run in the workers.
+if not initialize_recommender(watch=False):
+    raise RuntimeError("Cannot start server without recommender")
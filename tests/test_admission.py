@@ -0,0 +1,160 @@
+"""
+Tests for admission control and request deadlines
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from admission import AdmissionController, AdmissionRejected, Deadline, DeadlineExceeded
+
+def start_waiter(controller, outcomes, name, deadline=None):
+    """Acquire on a background thread and record the outcome"""
+    def run():
+        try:
+            controller.acquire(deadline)
+            outcomes.append(name)
+        except (AdmissionRejected, DeadlineExceeded) as e:
+            outcomes.append((name, e))
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+def wait_for_queue_depth(controller, depth, timeout=2.0):
+    end = time.monotonic() + timeout
+    while controller.stats()['queue_depth'] != depth:
+        assert time.monotonic() < end, "waiter never queued"
+        time.sleep(0.001)
+
+def test_admits_up_to_limit_then_rejects_when_queue_full():
+    controller = AdmissionController(max_in_flight=2, max_queue=0)
+    controller.acquire()
+    controller.acquire()
+
+    with pytest.raises(AdmissionRejected) as excinfo:
+        controller.acquire()
+    assert excinfo.value.status == 429
+    assert excinfo.value.retry_after == 1
+
+    stats = controller.stats()
+    assert (stats['admitted'], stats['in_flight'], stats['rejected_queue_full']) == (2, 2, 1)
+
+    controller.release()
+    controller.acquire()
+    assert controller.stats()['admitted'] == 3
+
+def test_release_hands_slots_to_waiters_in_order():
+    controller = AdmissionController(max_in_flight=1, max_queue=2, queue_timeout_ms=5000)
+    controller.acquire()
+    outcomes = []
+
+    first = start_waiter(controller, outcomes, 'first')
+    wait_for_queue_depth(controller, 1)
+    second = start_waiter(controller, outcomes, 'second')
+    wait_for_queue_depth(controller, 2)
+
+    controller.release()
+    first.join(2)
+    assert outcomes == ['first']
+
+    controller.release()
+    second.join(2)
+    assert outcomes == ['first', 'second']
+
+    # The slot passed along without ever being freed
+    stats = controller.stats()
+    assert (stats['in_flight'], stats['queue_depth'], stats['queued']) == (1, 0, 2)
+    assert stats['peak_queue_depth'] == 2
+
+def test_queue_timeout_rejects_with_503():
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout_ms=20)
+    controller.acquire()
+
+    with pytest.raises(AdmissionRejected) as excinfo:
+        controller.acquire()
+    assert excinfo.value.status == 503
+
+    stats = controller.stats()
+    assert (stats['rejected_queue_timeout'], stats['queue_depth'], stats['in_flight']) == (1, 0, 1)
+
+def test_deadline_expiring_in_queue_raises():
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout_ms=5000)
+    controller.acquire()
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded) as excinfo:
+        controller.acquire(Deadline(20))
+    assert excinfo.value.phase == 'admission'
+
+    # The wait stops at the deadline, not the queue timeout
+    assert time.monotonic() - started < 2
+    assert controller.stats()['queue_depth'] == 0
+
+def test_zero_limit_admits_everything():
+    controller = AdmissionController(max_in_flight=0)
+    for _ in range(100):
+        controller.acquire()
+
+    stats = controller.stats()
+    assert (stats['admitted'], stats['peak_in_flight']) == (100, 100)
+
+def test_async_acquire_waits_for_release():
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout_ms=5000)
+
+    async def scenario():
+        await controller.acquire_async()
+        waiter = asyncio.ensure_future(controller.acquire_async())
+        while controller.stats()['queue_depth'] == 0:
+            await asyncio.sleep(0)
+
+        # Released from another thread, as a sync handler would
+        threading.Thread(target=controller.release).start()
+        await asyncio.wait_for(waiter, 2)
+
+    asyncio.run(scenario())
+    stats = controller.stats()
+    assert (stats['admitted'], stats['in_flight'], stats['queue_depth']) == (2, 1, 0)
+
+def test_async_acquire_cancelled_while_queued_leaves_queue():
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout_ms=5000)
+
+    async def scenario():
+        await controller.acquire_async()
+        waiter = asyncio.ensure_future(controller.acquire_async())
+        while controller.stats()['queue_depth'] == 0:
+            await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(scenario())
+    stats = controller.stats()
+    assert (stats['in_flight'], stats['queue_depth']) == (1, 0)
+
+def test_deadline_from_budget():
+    assert Deadline.from_budget(None) is None
+    assert Deadline.from_budget('') is None
+    assert Deadline.from_budget(0, default_ms=500) is None
+    assert Deadline.from_budget('oops') is None
+    assert Deadline.from_budget(-5) is None
+
+    assert Deadline.from_budget(None, default_ms=500).budget_ms == 500
+    assert Deadline.from_budget('250').budget_ms == 250
+
+def test_deadline_check():
+    Deadline(10000).check('search')
+
+    expired = Deadline(1)
+    expired.expires_at = time.perf_counter() - 1
+    assert expired.expired()
+    assert expired.remaining_ms() < 0
+    with pytest.raises(DeadlineExceeded) as excinfo:
+        expired.check('rerank')
+    assert excinfo.value.phase == 'rerank'
@@ -0,0 +1,207 @@
+"""
+Tests for versioned artifact bundles
+"""
+
+import json
+import os
+import sys
+
+import faiss
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import artifacts
+from artifacts import (
+    CURRENT_FILE, EMBEDDINGS_FILE, MANIFEST_FILE, current_artifact_version, current_bundle_version,
+    diff_catalog, list_bundles, load_manifest, load_metadata, prune_bundles, publish_index_params,
+    resolve_bundle_dir, verify_checksums, write_bundle
+)
+from index_builder import INDEX_PARAMS_FILE, load_index_params
+
+def make_artifacts(rows=5, dim=8, seed=0):
+    embeddings = np.random.default_rng(seed).random((rows, dim), dtype=np.float32)
+    index = faiss.IndexFlatIP(dim)
+    index.add(embeddings)
+    metadata = pd.DataFrame({'name': [f'Test {i}' for i in range(rows)], 'duration': range(rows)})
+    return embeddings, index, metadata
+
+def make_bundle(processed_dir, version):
+    """Minimal bundle directory: only the manifest marks it as a bundle"""
+    os.makedirs(os.path.join(processed_dir, version))
+    with open(os.path.join(processed_dir, version, MANIFEST_FILE), 'w') as f:
+        json.dump({'version': version}, f)
+
+def point_current(processed_dir, version):
+    with open(os.path.join(processed_dir, CURRENT_FILE), 'w') as f:
+        f.write(version + '\n')
+
+def test_write_bundle_publishes_current(tmp_path):
+    processed_dir = str(tmp_path)
+    embeddings, index, metadata = make_artifacts()
+
+    bundle_dir = write_bundle(processed_dir, embeddings, index, metadata, None, 'model')
+    version = os.path.basename(bundle_dir)
+
+    assert current_bundle_version(processed_dir) == version
+    assert resolve_bundle_dir(processed_dir) == bundle_dir
+    assert current_artifact_version(processed_dir) == version
+    assert list_bundles(processed_dir) == [version]
+
+    # Only the bundle and the pointer remain; no staging or temp files
+    assert sorted(os.listdir(processed_dir)) == sorted([version, CURRENT_FILE])
+
+    manifest = load_manifest(bundle_dir)
+    assert (manifest['version'], manifest['rows'], manifest['dimension']) == (version, 5, 8)
+    assert manifest['index_spec'] == 'Flat'
+    assert manifest['metadata_columns'] == ['name', 'duration']
+    verify_checksums(bundle_dir, manifest)
+
+    pd.testing.assert_frame_equal(load_metadata(bundle_dir), metadata)
+    np.testing.assert_array_equal(np.load(os.path.join(bundle_dir, EMBEDDINGS_FILE)), embeddings)
+
+def test_new_bundle_swaps_current_and_keeps_previous(tmp_path):
+    processed_dir = str(tmp_path)
+    first = write_bundle(processed_dir, *make_artifacts(seed=0), None, 'model')
+    second = write_bundle(processed_dir, *make_artifacts(seed=1), None, 'model')
+
+    assert first != second
+    assert resolve_bundle_dir(processed_dir) == second
+    assert os.path.isdir(first)
+
+def test_rejects_misaligned_artifacts(tmp_path):
+    processed_dir = str(tmp_path)
+    embeddings, index, metadata = make_artifacts()
+
+    with pytest.raises(ValueError):
+        write_bundle(processed_dir, embeddings, index, metadata.iloc[:3], None, 'model')
+    assert current_bundle_version(processed_dir) is None
+
+def test_failed_write_leaves_no_staging_and_keeps_current(tmp_path, monkeypatch):
+    processed_dir = str(tmp_path)
+    bundle_dir = write_bundle(processed_dir, *make_artifacts(), None, 'model')
+
+    def broken_save(path, params):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(artifacts, 'save_index_params', broken_save)
+    with pytest.raises(OSError):
+        write_bundle(processed_dir, *make_artifacts(seed=1), None, 'model')
+
+    assert sorted(os.listdir(processed_dir)) == sorted([os.path.basename(bundle_dir), CURRENT_FILE])
+    assert resolve_bundle_dir(processed_dir) == bundle_dir
+
+def test_checksum_mismatch_is_detected(tmp_path):
+    bundle_dir = write_bundle(str(tmp_path), *make_artifacts(), None, 'model')
+    manifest = load_manifest(bundle_dir)
+
+    np.save(os.path.join(bundle_dir, EMBEDDINGS_FILE), np.zeros((5, 8), dtype=np.float32))
+    with pytest.raises(ValueError):
+        verify_checksums(bundle_dir, manifest)
+
+def test_prune_keeps_newest_bundles(tmp_path):
+    processed_dir = str(tmp_path)
+    versions = [f'20240101-00000{i}-abcdef0{i}' for i in range(5)]
+    for version in versions:
+        make_bundle(processed_dir, version)
+    point_current(processed_dir, versions[-1])
+
+    prune_bundles(processed_dir, keep=2)
+    assert list_bundles(processed_dir) == versions[-2:]
+
+def test_prune_never_removes_current(tmp_path):
+    processed_dir = str(tmp_path)
+    versions = [f'20240101-00000{i}-abcdef0{i}' for i in range(4)]
+    for version in versions:
+        make_bundle(processed_dir, version)
+
+    # Rolled back to the oldest bundle
+    point_current(processed_dir, versions[0])
+
+    prune_bundles(processed_dir, keep=1)
+    assert list_bundles(processed_dir) == [versions[0], versions[-1]]
+
+def test_prune_disabled_and_ignores_non_bundles(tmp_path):
+    processed_dir = str(tmp_path)
+    for version in ('20240101-000000-aaaaaaaa', '20240102-000000-bbbbbbbb'):
+        make_bundle(processed_dir, version)
+    os.makedirs(os.path.join(processed_dir, 'cache'))
+
+    prune_bundles(processed_dir, keep=0)
+    assert len(list_bundles(processed_dir)) == 2
+
+    prune_bundles(processed_dir, keep=1)
+    assert list_bundles(processed_dir) == ['20240102-000000-bbbbbbbb']
+    assert os.path.isdir(os.path.join(processed_dir, 'cache'))
+
+def test_publish_index_params_creates_new_version(tmp_path):
+    processed_dir = str(tmp_path)
+    first = write_bundle(processed_dir, *make_artifacts(), None, 'model')
+    first_params = load_index_params(first)
+
+    tuned = {'index_spec': 'Flat', 'search_params': {'nprobe': 4}}
+    second = publish_index_params(processed_dir, tuned)
+
+    assert second != first
+    assert resolve_bundle_dir(processed_dir) == second
+    assert load_index_params(second)['search_params'] == {'nprobe': 4}
+
+    # The published bundle is left untouched
+    assert load_index_params(first) == first_params
+
+    manifest = load_manifest(second)
+    assert manifest['parent_version'] == os.path.basename(first)
+    assert manifest['rows'] == 5 and manifest['model_name'] == 'model'
+    assert INDEX_PARAMS_FILE in manifest['sha256']
+    verify_checksums(second, manifest)
+
+def test_publish_index_params_rewrites_legacy_layout(tmp_path):
+    processed_dir = str(tmp_path)
+    tuned = {'index_spec': 'Flat', 'search_params': {}}
+
+    assert publish_index_params(processed_dir, tuned) == processed_dir
+    assert load_index_params(processed_dir) == tuned
+    assert current_bundle_version(processed_dir) is None
+
+def test_legacy_layout_resolves_to_processed_dir(tmp_path):
+    processed_dir = str(tmp_path)
+
+    assert current_bundle_version(processed_dir) is None
+    assert resolve_bundle_dir(processed_dir) == processed_dir
+    assert load_manifest(processed_dir) is None
+
+def test_diff_catalog_detects_added_changed_and_removed():
+    old_metadata = pd.DataFrame({
+        'url': ['/a', '/b', '/c', '/d'],
+        'content_hash': ['ha', 'hb', 'hc', 'hd'],
+        'item_id': [0, 1, 2, 7]
+    })
+    # '/c' removed, '/b' changed, '/e' and '/f' added, rows reordered
+    metadata_df = pd.DataFrame({
+        'url': ['/e', '/d', '/b', '/a', '/f'],
+        'content_hash': ['he', 'hd', 'hb2', 'ha', 'hf']
+    })
+
+    diff = diff_catalog(old_metadata, metadata_df)
+
+    assert diff['added'].tolist() == [True, False, False, False, True]
+    assert diff['changed'].tolist() == [False, False, True, False, False]
+    assert diff['removed'].tolist() == [False, False, True, False]
+    assert diff['old_rows'].tolist() == [-1, 3, 1, 0, -1]
+
+    # Kept rows keep their ids; new rows are numbered past the largest old id
+    assert diff['item_ids'].tolist() == [8, 7, 1, 0, 9]
+
+def test_diff_catalog_unchanged_and_empty_bundle():
+    metadata = pd.DataFrame({'url': ['/a', '/b'], 'content_hash': ['ha', 'hb'], 'item_id': [0, 1]})
+
+    diff = diff_catalog(metadata, metadata.drop(columns='item_id'))
+    assert not (diff['added'].any() or diff['changed'].any() or diff['removed'].any())
+    assert diff['item_ids'].tolist() == [0, 1]
+
+    empty = metadata.iloc[:0]
+    diff = diff_catalog(empty, metadata.drop(columns='item_id'))
+    assert diff['added'].all()
+    assert diff['item_ids'].tolist() == [0, 1]
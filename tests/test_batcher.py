@@ -0,0 +1,100 @@
+"""
+Tests for the micro-batching scheduler
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from admission import Deadline, DeadlineExceeded
+from batcher import MicroBatcher
+
+class FakeEngine:
+    """Records each batched call and echoes its queries back"""
+
+    def __init__(self, name='engine', fail=False, gate=None):
+        self.name = name
+        self.fail = fail
+        self.gate = gate
+        self.calls = []
+
+    def get_recommendations_batch(self, queries, k=10):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.calls.append((list(queries), k))
+        if self.fail:
+            raise RuntimeError('encode failed')
+        return [[{'engine': self.name, 'query': query, 'k': k}] for query in queries]
+
+def test_full_batch_is_grouped_by_engine_and_k():
+    batcher = MicroBatcher(max_batch_size=4, max_wait_ms=10000)
+    first, second = FakeEngine('first'), FakeEngine('second')
+
+    futures = [
+        batcher.submit(first, 'java', k=5),
+        batcher.submit(second, 'sql', k=5),
+        batcher.submit(first, 'python', k=5),
+        batcher.submit(first, 'lead', k=10),
+    ]
+    results = [future.result(timeout=2) for future in futures]
+
+    # Four queries fill the batch well before the wait runs out
+    assert batcher.stats()['batches'] == 1
+    assert first.calls == [(['java', 'python'], 5), (['lead'], 10)]
+    assert second.calls == [(['sql'], 5)]
+    assert [r[0]['query'] for r in results] == ['java', 'sql', 'python', 'lead']
+    assert [r[0]['engine'] for r in results] == ['first', 'second', 'first', 'first']
+
+def test_partial_batch_flushes_after_max_wait():
+    batcher = MicroBatcher(max_batch_size=100, max_wait_ms=20)
+    engine = FakeEngine()
+
+    assert batcher.recommend(engine, 'java', k=3) == [{'engine': 'engine', 'query': 'java', 'k': 3}]
+
+    stats = batcher.stats()
+    assert (stats['batches'], stats['queries'], stats['max_batch_size_seen']) == (1, 1, 1)
+    assert stats['queue_delay_p50_ms'] >= 0
+
+def test_expired_query_is_not_computed():
+    batcher = MicroBatcher(max_batch_size=2, max_wait_ms=10000)
+    engine = FakeEngine()
+    expired = Deadline(1)
+    expired.expires_at = time.perf_counter() - 1
+
+    stale = batcher.submit(engine, 'stale', k=5, deadline=expired)
+    fresh = batcher.submit(engine, 'fresh', k=5)
+
+    with pytest.raises(DeadlineExceeded) as excinfo:
+        stale.result(timeout=2)
+    assert excinfo.value.phase == 'encode'
+    assert fresh.result(timeout=2)[0]['query'] == 'fresh'
+    assert engine.calls == [(['fresh'], 5)]
+
+def test_failed_batch_fails_every_query_in_the_group():
+    batcher = MicroBatcher(max_batch_size=2, max_wait_ms=10000)
+    broken, healthy = FakeEngine(fail=True), FakeEngine()
+
+    failing = batcher.submit(broken, 'java', k=5)
+    passing = batcher.submit(healthy, 'java', k=5)
+
+    with pytest.raises(RuntimeError):
+        failing.result(timeout=2)
+    assert passing.result(timeout=2)[0]['query'] == 'java'
+    assert batcher.stats()['errors'] == 1
+
+def test_recommend_gives_up_at_the_deadline():
+    batcher = MicroBatcher(max_batch_size=1, max_wait_ms=0)
+    gate = threading.Event()
+    engine = FakeEngine(gate=gate)
+
+    try:
+        with pytest.raises(DeadlineExceeded) as excinfo:
+            batcher.recommend(engine, 'java', deadline=Deadline(20))
+        assert excinfo.value.phase == 'batch'
+    finally:
+        gate.set()
@@ -0,0 +1,199 @@
+"""
+Tests for the in-process LRU/TTL caches
+"""
+
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import cache
+from cache import EmbeddingCache, LRUCache, ResultCache, normalize_query
+
+class FakeClock:
+    """Stands in for time.monotonic so TTL tests do not sleep"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache.time, 'monotonic', fake)
+    return fake
+
+def test_normalize_query_collapses_whitespace():
+    assert normalize_query('  Java \t developer\n ') == 'Java developer'
+
+def test_normalize_query_lowercases_only_when_asked():
+    assert normalize_query('Java  Dev') == 'Java Dev'
+    assert normalize_query('Java  Dev', lowercase=True) == 'java dev'
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(max_entries=2)
+    lru.put('a', 1)
+    lru.put('b', 2)
+
+    # Touch 'a' so 'b' becomes the oldest
+    assert lru.get('a') == 1
+    lru.put('c', 3)
+
+    assert lru.get('b') is None
+    assert lru.get('a') == 1
+    assert lru.get('c') == 3
+    assert lru.evictions == 1
+
+def test_lru_byte_limit_evicts_and_skips_oversized_values():
+    lru = LRUCache(max_entries=10, max_bytes=10, sizeof=len)
+    lru.put('a', 'xxxx')
+    lru.put('b', 'yyyy')
+    lru.put('c', 'zzzz')
+
+    assert lru.get('a') is None
+    assert lru.current_bytes == 8
+
+    lru.put('huge', 'x' * 11)
+    assert lru.get('huge') is None
+    assert lru.current_bytes == 8
+
+def test_lru_replacing_a_key_keeps_byte_count():
+    lru = LRUCache(max_entries=10, max_bytes=100, sizeof=len)
+    lru.put('a', 'xxxx')
+    lru.put('a', 'xx')
+
+    assert lru.get('a') == 'xx'
+    assert lru.current_bytes == 2
+    assert len(lru) == 1
+
+def test_ttl_expiry(clock):
+    lru = LRUCache(max_entries=10, ttl_seconds=5)
+    lru.put('a', 1)
+
+    clock.now += 4.9
+    assert lru.get('a') == 1
+
+    clock.now += 0.1
+    assert lru.get('a') is None
+    assert len(lru) == 0
+    assert lru.stats()['misses'] == 1
+
+def test_zero_ttl_never_expires(clock):
+    lru = LRUCache(max_entries=10, ttl_seconds=0)
+    lru.put('a', 1)
+
+    clock.now += 10 ** 9
+    assert lru.get('a') == 1
+
+def test_disabled_cache_stores_nothing():
+    lru = LRUCache(max_entries=0)
+    lru.put('a', 1)
+
+    assert lru.get('a') is None
+
+def test_stats_counts_hits_and_misses():
+    lru = LRUCache(max_entries=10)
+    lru.put('a', 1)
+    lru.get('a')
+    lru.get('a')
+    lru.get('b')
+
+    stats = lru.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (2, 1, 1)
+    assert stats['hit_rate'] == round(2 / 3, 4)
+
+def test_concurrent_puts_respect_limits():
+    lru = LRUCache(max_entries=50, max_bytes=400, sizeof=lambda value: 8)
+
+    def worker(offset):
+        for i in range(500):
+            lru.put((offset, i), i)
+            lru.get((offset, i - 1))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(lru) <= 50
+    assert lru.current_bytes == 8 * len(lru) <= 400
+
+def test_embedding_key_separates_models_and_folds_case_on_request():
+    assert EmbeddingCache.make_key('m1', 'Java') != EmbeddingCache.make_key('m2', 'Java')
+    assert EmbeddingCache.make_key('m', 'Java') != EmbeddingCache.make_key('m', 'java')
+    assert EmbeddingCache.make_key('m', 'Java', True) == EmbeddingCache.make_key('m', ' java ', True)
+
+def test_embedding_cache_stores_read_only_copy():
+    embeddings = EmbeddingCache(max_entries=10)
+    vector = np.ones(4, dtype=np.float64)
+    embeddings.put('q', vector)
+
+    # Mutating the caller's array does not reach the cache
+    vector[0] = 5
+    cached = embeddings.get('q')
+    assert cached.dtype == np.float32
+    assert cached[0] == 1
+
+    with pytest.raises(ValueError):
+        cached[0] = 2
+
+def test_embedding_cache_byte_limit_counts_vectors():
+    # 16-byte vectors plus 200 bytes of bookkeeping each
+    embeddings = EmbeddingCache(max_entries=100, max_bytes=2 * 216)
+    for i in range(3):
+        embeddings.put(i, np.zeros(4, dtype=np.float32))
+
+    assert len(embeddings) == 2
+    assert embeddings.get(0) is None
+
+def test_result_key_includes_version_and_k():
+    key = ResultCache.make_key('v1', 'Java developer', 10)
+
+    assert key == ResultCache.make_key('v1', ' Java   developer ', 10)
+    assert key != ResultCache.make_key('v2', 'Java developer', 10)
+    assert key != ResultCache.make_key('v1', 'Java developer', 5)
+
+def test_result_cache_returns_copies():
+    results = ResultCache(max_entries=10)
+    original = [{'name': 'A', 'score': 0.9}, {'name': 'B', 'score': 0.8}]
+    results.put_results('q', original)
+
+    # Changing the stored list or its dicts does not reach the cache
+    original[0]['name'] = 'changed'
+    original.append({'name': 'C'})
+
+    first = results.get_results('q')
+    assert first == [{'name': 'A', 'score': 0.9}, {'name': 'B', 'score': 0.8}]
+
+    # Neither does changing a returned copy
+    first[1]['score'] = 0
+    first.pop()
+    assert results.get_results('q') == [{'name': 'A', 'score': 0.9}, {'name': 'B', 'score': 0.8}]
+
+def test_result_cache_miss_and_expiry(clock):
+    results = ResultCache(max_entries=10, ttl_seconds=60)
+    assert results.get_results('q') is None
+
+    results.put_results('q', [{'name': 'A'}])
+    clock.now += 59
+    assert results.get_results('q') == [{'name': 'A'}]
+
+    clock.now += 1
+    assert results.get_results('q') is None
+
+def test_result_cache_clear_keeps_counters():
+    results = ResultCache(max_entries=10)
+    results.put_results('q', [{'name': 'A'}])
+    results.get_results('q')
+    results.clear()
+
+    assert results.get_results('q') is None
+    stats = results.stats()
+    assert (stats['entries'], stats['hits'], stats['misses']) == (0, 1, 1)
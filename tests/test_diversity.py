@@ -0,0 +1,83 @@
+"""
+Equivalence tests for vectorized diversity selection
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from diversity import select_diverse
+
+def legacy_diversity_filtering(candidates, k):
+    """Original list-based _apply_diversity_filtering, kept as the reference"""
+    type_counts = {}
+    max_per_type = max(2, int(k * 0.4))
+
+    diverse_results = []
+
+    for candidate in candidates:
+        test_type = candidate['test_type']
+
+        if type_counts.get(test_type, 0) < max_per_type:
+            diverse_results.append(candidate)
+            type_counts[test_type] = type_counts.get(test_type, 0) + 1
+
+        if len(diverse_results) >= k:
+            break
+
+    if len(diverse_results) < k:
+        for candidate in candidates:
+            if candidate not in diverse_results:
+                diverse_results.append(candidate)
+                if len(diverse_results) >= k:
+                    break
+
+    return diverse_results[:k]
+
+def legacy_positions(type_codes, k):
+    """Positions chosen by the legacy implementation for one row"""
+    candidates = [
+        {'idx': pos, 'test_type': int(code)}
+        for pos, code in enumerate(type_codes) if code >= 0
+    ]
+    return [candidate['idx'] for candidate in legacy_diversity_filtering(candidates, k)]
+
+@pytest.mark.parametrize('k', [1, 3, 5, 7, 10])
+@pytest.mark.parametrize('n_types', [1, 2, 4, 9])
+def test_matches_legacy_single_row(k, n_types):
+    rng = np.random.default_rng(k * 100 + n_types)
+
+    for _ in range(200):
+        n = int(rng.integers(0, 40))
+        codes = rng.integers(0, n_types, size=n)
+
+        selected = select_diverse(codes, k, n_types=n_types)
+
+        assert selected.shape == (k,)
+        assert [pos for pos in selected if pos >= 0] == legacy_positions(codes, k)
+
+@pytest.mark.parametrize('k', [5, 10])
+def test_matches_legacy_row_wise_with_padding(k):
+    rng = np.random.default_rng(k)
+    codes = rng.integers(0, 4, size=(64, 30))
+
+    # FAISS pads short result rows with -1 at the end
+    for row in range(0, 64, 5):
+        codes[row, int(rng.integers(0, 30)):] = -1
+
+    selected = select_diverse(codes, k, n_types=4)
+
+    assert selected.shape == (64, k)
+    for row in range(64):
+        expected = legacy_positions(codes[row], k)
+        assert [pos for pos in selected[row] if pos >= 0] == expected
+
+def test_empty_rows_are_padded():
+    selected = select_diverse(np.full((3, 0), -1), 5)
+
+    assert selected.shape == (3, 5)
+    assert (selected == -1).all()
@@ -0,0 +1,78 @@
+"""
+Tests for the sharded encoding pool (in-process path)
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from encode_pool import encode_sharded, length_sorted_shards, remove_encoding_work
+
+class WordTokenizer:
+    """Counts words as tokens"""
+
+    def __call__(self, texts, add_special_tokens=False):
+        return {'input_ids': [text.split() for text in texts]}
+
+def fake_encode(texts):
+    return np.array([[len(text), text.count(' ')] for text in texts], dtype=np.float32)
+
+TEXTS = [f"{'word ' * (i % 7)}text {i}" for i in range(23)]
+
+def test_shards_sort_by_token_count():
+    texts = ['a a a', 'bbbbbbbbbbbbbbbbbbbb', 'c c', 'd d d d']
+
+    by_tokens = length_sorted_shards(texts, 2, WordTokenizer())
+    assert [shard.tolist() for shard in by_tokens] == [[3, 0], [2, 1]]
+
+    # Without a tokenizer, characters are counted
+    by_chars = length_sorted_shards(texts, 2)
+    assert [shard.tolist() for shard in by_chars] == [[1, 3], [0, 2]]
+
+def test_output_is_mapped_and_kept_until_removed(tmp_path):
+    work_dir = str(tmp_path)
+    output = encode_sharded(TEXTS, 'model', None, work_dir, shard_size=5,
+                            encode_fn=fake_encode, tokenizer=WordTokenizer())
+
+    assert isinstance(output, np.memmap)
+    assert not output.flags.writeable
+    np.testing.assert_array_equal(output, fake_encode(TEXTS))
+    assert len(os.listdir(work_dir)) == 2
+
+    remove_encoding_work(work_dir)
+    assert os.listdir(work_dir) == []
+
+def test_interrupted_job_resumes_finished_shards(tmp_path):
+    work_dir = str(tmp_path)
+    calls = []
+    crash = [True]
+
+    def flaky(texts):
+        calls.append(len(texts))
+        if crash[0] and len(calls) == 3:
+            raise RuntimeError('worker died')
+        return fake_encode(texts)
+
+    with pytest.raises(RuntimeError):
+        encode_sharded(TEXTS, 'model', 2, work_dir, shard_size=5, encode_fn=flaky)
+
+    calls.clear()
+    crash[0] = False
+    output = encode_sharded(TEXTS, 'model', 2, work_dir, shard_size=5, encode_fn=flaky)
+
+    # Two of five shards were journaled before the failure
+    assert len(calls) == 3
+    np.testing.assert_array_equal(output, fake_encode(TEXTS))
+
+def test_new_job_removes_other_jobs(tmp_path):
+    work_dir = str(tmp_path)
+    encode_sharded(TEXTS, 'model', 2, work_dir, shard_size=5, encode_fn=fake_encode)
+    first = set(os.listdir(work_dir))
+
+    encode_sharded(TEXTS[:10], 'model', 2, work_dir, shard_size=5, encode_fn=fake_encode)
+    assert not first & set(os.listdir(work_dir))
+    assert len(os.listdir(work_dir)) == 2
@@ -0,0 +1,95 @@
+"""
+Tests for index building and incremental updates by item id
+"""
+
+import os
+import sys
+
+import faiss
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from index_builder import build_index, update_index
+
+def vectors(rows, seed=0, dim=16):
+    x = np.random.default_rng(seed).standard_normal((rows, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+def top1(index, queries):
+    return index.search(queries, 1)[1][:, 0].tolist()
+
+@pytest.mark.parametrize('spec', ['Flat', 'HNSW16'])
+def test_full_build_is_id_mapped(spec):
+    x = vectors(20)
+    index, params = build_index(x, spec, ids=np.arange(100, 120))
+
+    assert isinstance(index, faiss.IndexIDMap2)
+    assert params['index_spec'] == spec
+    assert top1(index, x[:3]) == [100, 101, 102]
+
+def test_flat_update_applies_in_place():
+    x = vectors(20)
+    index, _ = build_index(x, 'Flat')
+    added = vectors(2, seed=1)
+
+    updated = update_index(index, 'Flat', remove_ids=np.array([0, 5]),
+                           add_embeddings=added, add_ids=np.array([20, 21]),
+                           embeddings=None, ids=None)
+
+    assert updated is index
+    assert index.ntotal == 20
+    assert top1(index, added) == [20, 21]
+    assert 0 not in top1(index, x[:1])
+
+def test_hnsw_additions_apply_in_place():
+    x = vectors(40)
+    index, _ = build_index(x, 'HNSW16')
+    added = vectors(3, seed=1)
+
+    updated = update_index(index, 'HNSW16', remove_ids=np.array([], dtype=np.int64),
+                           add_embeddings=added, add_ids=np.array([40, 41, 42]),
+                           embeddings=None, ids=None)
+
+    assert updated is index
+    assert index.ntotal == 43
+    assert top1(index, added) == [40, 41, 42]
+
+def test_hnsw_removals_rebuild():
+    x = vectors(40)
+    index, _ = build_index(x, 'HNSW16')
+    keep = np.arange(1, 40)
+
+    updated = update_index(index, 'HNSW16', remove_ids=np.array([0]),
+                           add_embeddings=x[:0], add_ids=np.array([], dtype=np.int64),
+                           embeddings=x[keep], ids=keep)
+
+    assert updated is not index
+    assert isinstance(updated, faiss.IndexIDMap2)
+    assert updated.ntotal == 39
+    assert top1(updated, x[1:4]) == [1, 2, 3]
+
+def test_legacy_flat_index_is_rebuilt_once():
+    x = vectors(10)
+    legacy = faiss.IndexFlatIP(16)
+    legacy.add(x)
+    ids = np.arange(1, 10)
+
+    updated = update_index(legacy, 'Flat', remove_ids=np.array([0]),
+                           add_embeddings=x[:0], add_ids=np.array([], dtype=np.int64),
+                           embeddings=x[1:], ids=ids)
+
+    assert isinstance(updated, faiss.IndexIDMap2)
+    assert top1(updated, x[1:3]) == [1, 2]
+
+def test_ivf_update_applies_in_place():
+    x = vectors(200, dim=8)
+    index, params = build_index(x, 'IVF4,Flat', {'nprobe': 4})
+
+    updated = update_index(index, params['index_spec'], remove_ids=np.array([3]),
+                           add_embeddings=x[3:4], add_ids=np.array([500]),
+                           embeddings=None, ids=None)
+
+    assert updated is index
+    assert top1(index, x[3:4]) == [500]
@@ -0,0 +1,30 @@
+"""
+Tests for the Prometheus metrics registry
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from metrics import Registry
+
+def gauge_collector(value):
+    return lambda: [('queue_depth', 'gauge', 'Queued requests', [({}, value)])]
+
+def test_named_collector_registers_once():
+    registry = Registry()
+    registry.register_collector(gauge_collector(1), name='service')
+    registry.register_collector(gauge_collector(2), name='service')
+
+    lines = registry.render().splitlines()
+    assert lines.count('# TYPE queue_depth gauge') == 1
+    assert 'queue_depth 2' in lines
+
+def test_unnamed_collectors_are_kept():
+    registry = Registry()
+    registry.register_collector(lambda: [('a_total', 'counter', 'A', [({}, 1)])])
+    registry.register_collector(lambda: [('b_total', 'counter', 'B', [({}, 2)])])
+
+    lines = registry.render().splitlines()
+    assert 'a_total 1' in lines and 'b_total 2' in lines